@@ -1 +1,43 @@
-from depq.depq import DEPQ
+import sys
+
+# Names are only imported on first access so that "import depq" stays
+# cheap for short-lived processes, see run_import_check.py
+_attributes = {
+    'DEPQ': 'depq.depq',
+    'Snapshot': 'depq.depq',
+    'Journal': 'depq.journal',
+}
+
+__all__ = sorted(_attributes)
+
+_submodules = ('aio', 'bucket', 'cache', 'client', 'depq', 'fair',
+               'journal', 'pool', 'protocol', 'search', 'server', 'sim',
+               'stats', 'watch', 'window')
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # Module level __getattr__ (PEP 562) is unavailable, so every name
+    # of __all__ is imported up front
+    for _name in _attributes:
+        __import__(_attributes[_name])
+        globals()[_name] = getattr(sys.modules[_attributes[_name]], _name)
+else:
+    def _import(module):
+        # __import__ avoids loading importlib just for import_module
+        __import__(module)
+        return sys.modules[module]
+
+    def __getattr__(name):
+        if name in _attributes:
+            value = getattr(_import(_attributes[name]), name)
+        elif name in _submodules:
+            value = _import('depq.' + name)
+        else:
+            raise AttributeError(
+                "module 'depq' has no attribute '{}'".format(name)
+            )
+
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_attributes) | set(_submodules))
@@ -0,0 +1,55 @@
+import asyncio
+import os
+
+from depq.depq import _hand_back
+
+
+async def parallel_drain(depq, fn, max_inflight=None, leftovers=None):
+    """Async generator counterpart of DEPQ.parallel_drain. fn(item) must
+    return an awaitable, e.g. fn is a coroutine function; blocking
+    calls can be wrapped with loop.run_in_executor. Runs exactly
+    max_inflight (default os.cpu_count()) of them as tasks, popping an
+    item with popfirst() only when a slot frees up, and yields
+    tuple(item, result) as they complete. If a call raises, the
+    exception is raised by the generator. Closing it early cancels the
+    tasks in flight and waits for them: items of tasks that accepted
+    cancellation are put back into DEPQ, while tuple(item, task) of
+    tasks that finished anyway is appended to leftovers, or reported by
+    a RuntimeWarning if that is None, so no call runs twice."""
+
+    if max_inflight is None:
+        max_inflight = os.cpu_count() or 1
+    if max_inflight <= 0:
+        raise ValueError('max_inflight must be > 0')
+
+    inflight = {}
+
+    try:
+        while True:
+
+            while len(inflight) < max_inflight:
+                try:
+                    item, priority = depq.popfirst()
+                except IndexError:
+                    break
+                task = asyncio.ensure_future(fn(item))
+                inflight[task] = item, priority
+
+            if not inflight:
+                return
+
+            done, _ = await asyncio.wait(
+                inflight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                item, _ = inflight.pop(task)
+                yield item, task.result()
+
+    finally:
+        if inflight:
+            for task in inflight:
+                task.cancel()
+            await asyncio.wait(inflight)
+        _hand_back(depq, inflight, [
+            task for task in inflight if not task.cancelled()
+        ], leftovers)
@@ -0,0 +1,731 @@
+from collections import defaultdict, deque
+from itertools import chain
+from operator import index, itemgetter
+
+from depq.depq import DEPQ, Lock, _count
+
+_item = itemgetter(0)
+_priority = itemgetter(1)
+
+
+class _IntegerDEPQ(DEPQ):
+    """Common parts of the integer priority backends. Entries are
+    tuple(item, priority) kept in a list of deque buckets. Bit i of the
+    int bitmap self._occupied is set iff bucket i is not empty, so the
+    lowest and highest occupied buckets are found by int.bit_length()
+    in C. Buckets are ordered: every priority in bucket i is lower than
+    every priority in bucket i + 1."""
+
+    backend = None
+
+    def __init__(self, iterable=None, maxlen=None, key=None,
+                 backend=None, priority_range=None, unique=False,
+                 ranked=False):
+
+        if key is not None:
+            raise ValueError('Integer backends do not support key')
+        if unique:
+            raise ValueError('Integer backends do not support unique')
+        if ranked:
+            raise ValueError('Integer backends do not support ranked')
+
+        self._setup(priority_range)
+        self._reset()
+        self.items = defaultdict(int)
+        self._maxlen = maxlen
+        self._key = None
+        self._index = None
+        self._ranks = None
+        self.lock = Lock()
+        self.journal = None
+        self._frozen = 0
+        self._shared = 0
+        self._owned = None
+
+        if iterable is not None:
+            self.extend(iterable)
+
+    def insert(self, item, priority):
+        """Adds item to the end of its priority bucket. Performance: O(1)"""
+
+        entry = (item, priority)
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            slot = self._slot(priority)
+            bucket = self._own(slot)
+            bucket.append(entry)
+            if len(bucket) == 1:
+                self._occupied |= 1 << slot
+            self._length += 1
+
+            try:
+                self.items[item] += 1
+            except TypeError:
+                self.items[repr(item)] += 1
+
+            maxlen = self._maxlen
+            if maxlen is not None and maxlen < self._length:
+                self._poplast()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('i', item, priority))
+
+    def insert_many(self, iterable):
+        """Inserts are already O(1), so items are added one by one, but
+        under a single lock acquisition. Performance: O(m) for m items"""
+
+        entries = [(item[0], item[1]) for item in iterable]
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            entries = self._insert_many(entries)
+
+            journal = self.journal
+            if journal is not None and entries:
+                journal.append(('n', entries))
+
+    def _insert_many(self, entries):
+        """Appends entries to their buckets and trims to maxlen once.
+        Returns entries. Lock must already be held"""
+
+        # Every priority is checked before anything is added
+        slots = list(map(self._slot, map(_priority, entries)))
+        own = self._own
+        self_items = self.items
+
+        for entry, slot in zip(entries, slots):
+            bucket = own(slot)
+            bucket.append(entry)
+            if len(bucket) == 1:
+                self._occupied |= 1 << slot
+            self._length += 1
+
+            try:
+                self_items[entry[0]] += 1
+            except TypeError:
+                self_items[repr(entry[0])] += 1
+
+        maxlen = self._maxlen
+        if maxlen is not None:
+            while maxlen < self._length:
+                self._poplast()
+
+        return entries
+
+    def addfirst(self, item, new_priority=None):
+        """Adds item to DEPQ as highest priority. The default
+        starting priority is 0, the default new priority is
+        self.high(). Performance: O(1)"""
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            if self._length:
+                slot, position = self._first_position()
+                priority = self._buckets[slot][position][1]
+                if new_priority is not None:
+                    if new_priority < priority:
+                        raise ValueError('Priority must be >= '
+                                         'highest priority.')
+                    priority = new_priority
+            else:
+                priority = 0 if new_priority is None else new_priority
+
+            slot = self._slot(priority)
+            bucket = self._own(slot)
+            bucket.appendleft((item, priority))
+            if len(bucket) == 1:
+                self._occupied |= 1 << slot
+            self._length += 1
+
+            try:
+                self.items[item] += 1
+            except TypeError:
+                self.items[repr(item)] += 1
+
+            maxlen = self._maxlen
+            if maxlen is not None and maxlen < self._length:
+                self._poplast()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('f', item, priority))
+
+    def addlast(self, item, new_priority=None):
+        """Adds item to DEPQ as lowest priority. The default
+        starting priority is 0, the default new priority is
+        self.low(). Performance: O(1)"""
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            maxlen = self._maxlen
+            if maxlen is not None and maxlen == self._length:
+                return
+
+            if self._length:
+                slot, position = self._last_position()
+                priority = self._buckets[slot][position][1]
+                if new_priority is not None:
+                    if new_priority > priority:
+                        raise ValueError('Priority must be <= '
+                                         'lowest priority.')
+                    priority = new_priority
+            else:
+                priority = 0 if new_priority is None else new_priority
+
+            slot = self._slot(priority)
+            bucket = self._own(slot)
+            bucket.append((item, priority))
+            if len(bucket) == 1:
+                self._occupied |= 1 << slot
+            self._length += 1
+
+            try:
+                self.items[item] += 1
+            except TypeError:
+                self.items[repr(item)] += 1
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('l', item, priority))
+
+    def popfirst(self):
+        """Removes item with highest priority from DEPQ. Returns
+        tuple(item, priority). Performance: O(1)"""
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            tup = self._popfirst()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('p',))
+
+            return tup
+
+    def _popfirst(self):
+        if not self._length:
+            raise IndexError('DEPQ is already empty')
+        return self._take(*self._first_position())
+
+    def _poplast(self):
+        """For avoiding lock during inserting to keep maxlen"""
+        if not self._length:
+            raise IndexError('DEPQ is already empty')
+        return self._take(*self._last_position())
+
+    def _take(self, slot, position):
+        """Removes entry at position of bucket and forgets its item"""
+
+        bucket = self._own(slot)
+        tup = bucket[position]
+        del bucket[position]
+        if not bucket:
+            self._occupied ^= 1 << slot
+        self._length -= 1
+
+        self_items = self.items
+
+        try:
+            self_items[tup[0]] -= 1
+            if self_items[tup[0]] == 0:
+                del self_items[tup[0]]
+        except TypeError:
+            r = repr(tup[0])
+            self_items[r] -= 1
+            if self_items[r] == 0:
+                del self_items[r]
+
+        return tup
+
+    def _peek(self, first):
+        with self.lock:
+            if not self._length:
+                raise IndexError('DEPQ is empty')
+            return self._end(first)
+
+    def _end(self, first):
+        if first:
+            slot, position = self._first_position()
+        else:
+            slot, position = self._peek_last_position()
+        return self._buckets[slot][position]
+
+    def _peek_last_position(self):
+        """Like _last_position but never changes DEPQ"""
+        return self._last_position()
+
+    def first(self):
+        """Gets item with highest priority. Performance: O(1)"""
+        return self._peek(True)[0]
+
+    def last(self):
+        """Gets item with lowest priority. Performance: O(1)"""
+        return self._peek(False)[0]
+
+    def high(self):
+        """Gets highest priority. Performance: O(1)"""
+        return self._peek(True)[1]
+
+    def low(self):
+        """Gets lowest priority. Performance: O(1)"""
+        return self._peek(False)[1]
+
+    def size(self):
+        """Gets length of DEPQ. Performance: O(1)"""
+        return self._length
+
+    def is_empty(self):
+        """Returns True if DEPQ is empty, else False. Performance: O(1)"""
+        return self._length == 0
+
+    def clear(self):
+        """Empties DEPQ. Performance: O(number of buckets)"""
+
+        with self.lock:
+
+            # Always new buckets, a snapshot may share the old ones
+            self._rebase(())
+            self._reset()
+            self.items.clear()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('c',))
+
+    def set_maxlen(self, length):
+        """Sets maxlen"""
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            self._maxlen = length
+            while self._length > length:
+                self._poplast()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('m', length))
+
+    def remove(self, item, count=1):
+        """Removes occurrences of given item in ascending priority. Default
+        number of removals is 1. Returns a list of tuple(item, priority).
+        Performance: O(n)"""
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            removed = self._remove(item, count)
+
+            journal = self.journal
+            if journal is not None and removed:
+                journal.append(('r', item, len(removed)))
+
+            return removed
+
+    def _remove(self, item, count):
+
+        try:
+            count = int(count)
+        except ValueError as ex:
+            ex.args = ('{} cannot be represented as an '
+                       'integer'.format(count),)
+            raise
+        except TypeError as ex:
+            ex.args = ('{} cannot be represented as an '
+                       'integer'.format(count),)
+            raise
+
+        removed = []
+        self_items = self.items
+
+        try:
+            item_freq = self_items.get(item, 0)
+            item_repr = item
+        except TypeError:
+            item_repr = repr(item)
+            item_freq = self_items.get(item_repr, 0)
+
+        if item_freq == 0:
+            return removed
+
+        if count == -1:
+            count = item_freq
+
+        buckets = self._buckets
+        occupied = self._occupied
+
+        # Ascending buckets, each one from its lowest priority end
+        while occupied and len(removed) < count:
+            slot = (occupied & -occupied).bit_length() - 1
+            occupied ^= 1 << slot
+
+            bucket = buckets[slot]
+            matches = [tup for tup in reversed(self._ordered(bucket))
+                       if item == tup[0]]
+            if not matches:
+                continue
+
+            matches = matches[:count - len(removed)]
+            removed.extend(matches)
+
+            taken = set(map(id, matches))
+            kept = self._new_bucket(tup for tup in bucket
+                                    if id(tup) not in taken)
+            buckets[slot] = kept
+            if not kept:
+                self._occupied ^= 1 << slot
+
+        self._length -= len(removed)
+
+        if item_freq <= len(removed):
+            del self_items[item_repr]
+        else:
+            self_items[item_repr] -= len(removed)
+
+        return removed
+
+    def _matches(self, item):
+        entries = list(self._entries(self._buckets))
+        return [tup for tup in reversed(entries) if item == tup[0]]
+
+    def reprioritize(self, func, monotonic=False):
+        """Replaces the priority of every item with func(item, priority)
+        under a single lock acquisition. Entries are redistributed into
+        buckets in their current order, so items with equal new
+        priorities keep their relative order whether func is monotonic
+        or not. Performance: O(n + number of buckets)"""
+
+        with self.lock:
+
+            entries = list(self._entries(self._buckets))
+            priorities = [func(tup[0], tup[1]) for tup in entries]
+
+            # Validate everything before anything is changed
+            self._rebase(priorities)
+            for priority in priorities:
+                self._slot(priority)
+
+            length = self._length
+            self._reset()
+            buckets = self._buckets
+            slot_of = self._slot
+
+            for tup, priority in zip(entries, priorities):
+                buckets[slot_of(priority)].append((tup[0], priority))
+
+            occupied = 0
+            for slot, bucket in enumerate(buckets):
+                if bucket:
+                    occupied |= 1 << slot
+            self._occupied = occupied
+            self._length = length
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('a', priorities, monotonic))
+
+    def _reset(self):
+        self._buckets = [deque() for _ in range(self._bucket_count)]
+        self._occupied = 0
+        self._length = 0
+        # All buckets are new, none is shared with a snapshot
+        self._frozen = 0
+        self._owned = None
+
+    def _thaw(self):
+        """Gives DEPQ its own list of buckets, shared with live
+        snapshots until now. The buckets themselves are copied one by
+        one as they are written, see _own. Lock must already be held.
+        Performance: O(number of buckets)"""
+        self._buckets = list(self._buckets)
+        self._owned = set()
+        self._frozen = 0
+
+    def _own(self, slot):
+        """Gets bucket slot to change in place, first copying it if a
+        live snapshot may share it. Lock must already be held"""
+
+        owned = self._owned
+        if owned is None:
+            return self._buckets[slot]
+
+        bucket = self._buckets[slot]
+        if id(bucket) not in owned:
+            bucket = self._buckets[slot] = deque(bucket)
+            owned.add(id(bucket))
+        return bucket
+
+    def _new_bucket(self, entries=()):
+        """Builds a bucket that DEPQ owns from entries"""
+        bucket = deque(entries)
+        if self._owned is not None:
+            self._owned.add(id(bucket))
+        return bucket
+
+    def _entries(self, buckets):
+        """Iterates entries of buckets in priority order"""
+        ordered = self._ordered
+        return chain.from_iterable(ordered(bucket)
+                                   for bucket in reversed(buckets))
+
+    def _pairs(self, state):
+        return self._entries(state['_buckets'])
+
+    def _columns(self):
+        entries = list(self._entries(self._buckets))
+        return list(map(_item, entries)), list(map(_priority, entries))
+
+    def to_json(self):
+        with self.snapshot() as snapshot:
+            return {
+                'data': list(snapshot),
+                'items': dict(snapshot.items),
+                '_maxlen': snapshot.state['_maxlen'],
+                'backend': self.backend,
+                'priority_range': snapshot.state.get('_priority_range'),
+            }
+
+    def __getstate__(self):
+        # Buckets are copied outside of lock from a frozen view
+        with self.snapshot() as snapshot:
+            state = snapshot.state
+            state['_buckets'] = [deque(bucket)
+                                 for bucket in state['_buckets']]
+            state['items'] = snapshot.items
+            return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        state.pop('unique', None)
+        state.pop('ranked', None)
+        self.__dict__.update(state)
+        # Journal snapshots hold no items, they are never shared
+        if 'items' not in state:
+            self.items = _count(list(map(_item,
+                                         self._entries(self._buckets))))
+        self.lock = Lock()
+        self.journal = None
+        self._frozen = 0
+        self._shared = 0
+        self._owned = None
+        self._index = None
+        self._ranks = None
+
+    def __iter__(self):
+        with self.lock:
+            return self._entries(self._buckets)
+
+    def __getitem__(self, index):
+        with self.lock:
+
+            length = self._length
+            position = index + length if index < 0 else index
+            if not 0 <= position < length:
+                raise IndexError('DEPQ has no index {}'.format(index))
+
+            return self._entry_at(position)
+
+    def _entry_at(self, position):
+        for bucket in reversed(self._buckets):
+            if position < len(bucket):
+                return self._ordered(bucket)[position]
+            position -= len(bucket)
+
+    def _rank(self, priority):
+        """Counts entries of buckets at or above priority. Performance:
+        O(n)"""
+        rank = 0
+        for entry in self._entries(self._buckets):
+            if entry[1] < priority:
+                break
+            rank += 1
+        return rank
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        with self.lock:
+            return 'DEPQ([{}])'.format(
+                ', '.join(str(tup) for tup in self._entries(self._buckets))
+            )
+
+
+class BucketDEPQ(_IntegerDEPQ):
+    """DEPQ(backend='bucket', priority_range=(low, high)) keeps one FIFO
+    bucket per integer priority from low to high inclusive, for e.g.
+    severity levels. insert, both pops and peeks are O(1) instead of
+    the O(log n) search of the default backend."""
+
+    backend = 'bucket'
+
+    def _setup(self, priority_range):
+
+        if priority_range is None:
+            raise ValueError('backend="bucket" requires '
+                             'priority_range=(low, high)')
+
+        low, high = (index(priority) for priority in priority_range)
+        if low > high:
+            raise ValueError('priority_range must be (low, high) '
+                             'with low <= high')
+
+        self._priority_range = (low, high)
+        self._offset = low
+        self._bucket_count = high - low + 1
+
+    def _slot(self, priority):
+        slot = index(priority) - self._offset
+        if not 0 <= slot < self._bucket_count:
+            raise ValueError('Priority {} is outside of priority_range '
+                             '{}'.format(priority, self._priority_range))
+        return slot
+
+    def _rebase(self, priorities):
+        pass
+
+    def _first_position(self):
+        return self._occupied.bit_length() - 1, 0
+
+    def _last_position(self):
+        occupied = self._occupied
+        return (occupied & -occupied).bit_length() - 1, -1
+
+    @staticmethod
+    def _ordered(bucket):
+        return bucket
+
+
+class RadixDEPQ(_IntegerDEPQ):
+    """DEPQ(backend='radix') is a radix heap for monotone non-negative
+    integer priorities such as timestamps: every priority must be >= the
+    last lowest priority that was reached by popping from the low end.
+    Bucket i holds priorities whose highest bit differing from that
+    lowest priority is bit i - 1, so insert is O(1) and poplast is
+    amortized O(log C) for priorities up to C. popfirst, first and
+    high scan the top bucket instead of being O(1), and so do last and
+    low with the lowest bucket: peeking never moves that base."""
+
+    backend = 'radix'
+
+    def _setup(self, priority_range):
+        if priority_range is not None:
+            raise ValueError('backend="radix" has no priority_range')
+        self._bucket_count = 1
+        self._last = 0
+
+    def _slot(self, priority):
+
+        priority = index(priority)
+        if priority < self._last:
+            raise ValueError('Priority must be >= {} as radix backend '
+                             'priorities are monotone'.format(self._last))
+
+        slot = (priority ^ self._last).bit_length()
+        buckets = self._buckets
+        while len(buckets) <= slot:
+            buckets.append(self._new_bucket())
+        return slot
+
+    def _rebase(self, priorities):
+        for priority in priorities:
+            if index(priority) < 0:
+                raise ValueError('Radix backend priorities must be >= 0')
+        self._last = min(priorities) if priorities else 0
+
+    def _first_position(self):
+
+        slot = self._occupied.bit_length() - 1
+        if slot == 0:
+            return 0, 0
+
+        # The first entry with the highest priority is the oldest one
+        high = None
+        position = 0
+        for i, tup in enumerate(self._buckets[slot]):
+            if high is None or tup[1] > high:
+                high = tup[1]
+                position = i
+
+        return slot, position
+
+    def _last_position(self):
+        if not self._occupied & 1:
+            self._settle()
+        return 0, -1
+
+    def _peek_last_position(self):
+
+        occupied = self._occupied
+        if occupied & 1:
+            return 0, -1
+
+        slot = (occupied & -occupied).bit_length() - 1
+
+        # The last entry with the lowest priority is the newest one
+        low = None
+        position = 0
+        for i, tup in enumerate(self._buckets[slot]):
+            if low is None or tup[1] <= low:
+                low = tup[1]
+                position = i
+
+        return slot, position
+
+    def _settle(self):
+        """Makes lowest priority the new base and redistributes its
+        bucket into lower ones, which always leaves bucket 0 filled"""
+
+        if self._frozen:
+            self._thaw()
+
+        buckets = self._buckets
+        occupied = self._occupied
+        slot = (occupied & -occupied).bit_length() - 1
+
+        bucket = buckets[slot]
+        buckets[slot] = self._new_bucket()
+        occupied ^= 1 << slot
+
+        last = min(map(_priority, bucket))
+        self._last = last
+
+        own = self._own
+        for tup in bucket:
+            slot = (tup[1] ^ last).bit_length()
+            own(slot).append(tup)
+            occupied |= 1 << slot
+
+        self._occupied = occupied
+
+    @staticmethod
+    def _ordered(bucket):
+        # Stable, so equal priorities keep their insertion order
+        return sorted(bucket, key=_priority, reverse=True)
+
+
+BACKENDS = {
+    'bucket': BucketDEPQ,
+    'radix': RadixDEPQ,
+}
@@ -0,0 +1,208 @@
+from collections import namedtuple
+from functools import update_wrapper
+from itertools import count
+from threading import RLock
+
+from depq.depq import DEPQ
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # pragma: no cover
+    from collections import MutableMapping
+
+CacheInfo = namedtuple('CacheInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+def _lru(key, value, hits, tick):
+    return tick
+
+
+def _lfu(key, value, hits, tick):
+    # Among equally used keys the least recently used one goes first
+    return hits, tick
+
+
+POLICIES = {
+    'lru': _lru,
+    'lfu': _lfu,
+}
+
+
+class PriorityCache(MutableMapping):
+    """Mapping of at most maxsize keys that evicts the key with the
+    lowest score once it is full.
+
+    Scores are policy(key, value, hits, tick), where hits is how often
+    key was read and tick increases with every read or write, so
+    'lru' is lambda key, value, hits, tick: tick and 'lfu' is (hits,
+    tick). A callable such as hits / len(value) gives a cost or size
+    aware policy. Scores live in a unique DEPQ, so touching a key
+    moves its entry by bisection within the blocks of the DEPQ, in
+    O(log n) comparisons instead of an O(n) remove and insert, and
+    eviction is poplast(). A read takes about 10us with 10000 keys and
+    13us (lru) to 21us (lfu) with 500000, see run_cache_check.py. Reads through cache[key] or get() count
+    towards cache_info(); 'in' and peek() neither count nor touch.
+    maxsize=None never evicts."""
+
+    def __init__(self, maxsize=128, policy='lfu'):
+
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError('maxsize must be > 0')
+
+        if not callable(policy):
+            try:
+                policy = POLICIES[policy]
+            except KeyError:
+                raise ValueError('Unknown policy {!r}'.format(policy))
+
+        self.maxsize = maxsize
+        self.policy = policy
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> [value, hits]
+        self._data = {}
+        self._scores = DEPQ(unique=True)
+        self._ticks = count()
+        self._lock = RLock()
+
+    def __getitem__(self, key):
+        """Gets value of key and rescores it. Performance: O(log n)
+        comparisons"""
+
+        with self._lock:
+
+            try:
+                entry = self._data[key]
+            except KeyError:
+                self.misses += 1
+                raise
+
+            self.hits += 1
+            entry[1] += 1
+            self._scores.insert(key, self.policy(
+                key, entry[0], entry[1], next(self._ticks)
+            ))
+            return entry[0]
+
+    def __setitem__(self, key, value):
+        """Adds or replaces value of key, evicting the lowest scored key
+        if the cache is full. Performance: O(log n) comparisons"""
+
+        with self._lock:
+
+            data = self._data
+            entry = data.get(key)
+
+            if entry is None:
+                maxsize = self.maxsize
+                if maxsize is not None and len(data) >= maxsize:
+                    del data[self._scores.poplast()[0]]
+                    self.evictions += 1
+                entry = data[key] = [value, 0]
+            else:
+                entry[0] = value
+
+            self._scores.insert(key, self.policy(
+                key, value, entry[1], next(self._ticks)
+            ))
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+            self._scores.remove(key)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(list(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def peek(self, key, default=None):
+        """Gets value of key without counting or rescoring it"""
+        entry = self._data.get(key)
+        return default if entry is None else entry[0]
+
+    def score_of(self, key):
+        """Gets current score of key. Raises KeyError if key is not in
+        cache. Performance: O(1)"""
+        return self._scores.priority_of(key)
+
+    def victim(self):
+        """Gets tuple(key, score) evicted next, without evicting it"""
+        with self._lock:
+            return self._scores.last(), self._scores.low()
+
+    def cache_info(self):
+        """Returns CacheInfo(hits, misses, evictions, maxsize, currsize)"""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._data))
+
+    def clear(self):
+        """Removes every key and resets statistics"""
+        with self._lock:
+            self._data.clear()
+            self._scores.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __repr__(self):
+        return 'PriorityCache(maxsize={!r}, currsize={})'.format(
+            self.maxsize, len(self._data)
+        )
+
+
+def _make_key(args, kwargs, typed, mark=(object(),)):
+    key = args
+    if kwargs:
+        key += mark
+        for item in kwargs.items():
+            key += item
+    if typed:
+        key += tuple(type(arg) for arg in args)
+        if kwargs:
+            key += tuple(type(value) for value in kwargs.values())
+    return key
+
+
+def priority_cache(maxsize=128, policy='lfu', typed=False):
+    """Decorator memoizing a function in a PriorityCache, like
+    functools.lru_cache but evicting by policy. Arguments must be
+    hashable. The wrapper has cache, cache_info() and cache_clear()."""
+
+    def decorating_function(user_function):
+
+        cache = PriorityCache(maxsize, policy)
+        lock = cache._lock
+        data = cache._data
+
+        def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs, typed)
+            with lock:
+                if key in data:
+                    return cache[key]
+                cache.misses += 1
+            # Called unlocked so recursive and slow functions don't block
+            # other callers; a concurrent miss may compute twice
+            result = user_function(*args, **kwargs)
+            with lock:
+                cache[key] = result
+            return result
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.cache_info
+        wrapper.cache_clear = cache.clear
+        return update_wrapper(wrapper, user_function)
+
+    if callable(maxsize) and not isinstance(maxsize, int):
+        # Used as @priority_cache without arguments
+        user_function, maxsize = maxsize, 128
+        return decorating_function(user_function)
+
+    return decorating_function
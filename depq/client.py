@@ -0,0 +1,296 @@
+import socket
+from itertools import count
+from threading import Lock, Semaphore
+
+from depq import protocol
+from depq.protocol import HEADER, OK, ProtocolError, decode, pack
+
+# Errors raised again by the client under their own type
+_ERRORS = {
+    'IndexError': IndexError,
+    'KeyError': KeyError,
+    'TypeError': TypeError,
+    'ValueError': ValueError,
+}
+
+
+# Pipelined requests are written in chunks of about this many bytes
+_WRITE_SIZE = 1 << 16
+
+
+class ServerError(Exception):
+    """Raised for any other error the server sent back"""
+
+
+def _error(value):
+    name, message = value
+    try:
+        return _ERRORS[name](message)
+    except KeyError:
+        return ServerError('{}: {}'.format(name, message))
+
+
+class _Connection(object):
+
+    def __init__(self, address, timeout):
+
+        if isinstance(address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+        except Exception:
+            sock.close()
+            raise
+
+        self.sock = sock
+        self.ids = count()
+        self.buffer = bytearray()
+
+    def request(self, calls):
+        """Sends every tuple(code, args) of calls and reads responses.
+        Returns a list of tuple(status, value)"""
+
+        responses = []
+        ids = []
+        frames = []
+        size = 0
+
+        for code, args in calls:
+            request_id = next(self.ids) & 0xFFFFFFFF
+            frame = pack(request_id, code, args)
+            ids.append(request_id)
+            frames.append(frame)
+            size += len(frame)
+
+            # Writes stay below what socket buffers hold, or a server
+            # that stops reading while we don't read either deadlocks
+            if size >= _WRITE_SIZE:
+                self._exchange(frames, ids, responses)
+                size = 0
+
+        if frames:
+            self._exchange(frames, ids, responses)
+
+        return responses
+
+    def _exchange(self, frames, ids, responses):
+        self.sock.sendall(b''.join(frames))
+        for request_id in ids:
+            responses.append(self._receive(request_id))
+        del frames[:]
+        del ids[:]
+
+    def _receive(self, expected_id):
+        header = self._read(HEADER.size)
+        size, request_id, status = HEADER.unpack(header)
+        if request_id != expected_id:
+            raise ProtocolError('Response out of order')
+        value, _ = decode(self._read(size))
+        return status, value
+
+    def _read(self, size):
+        buffer = self.buffer
+        recv = self.sock.recv
+        while len(buffer) < size:
+            chunk = recv(max(65536, size - len(buffer)))
+            if not chunk:
+                raise ConnectionError('Server closed the connection')
+            buffer += chunk
+        data = bytes(buffer[:size])
+        del buffer[:size]
+        return data
+
+    def close(self):
+        self.sock.close()
+
+
+class Client(object):
+    """Thread safe client of a depq.server.DEPQServer at address, a
+    path for a Unix socket or a tuple(host, port) for TCP.
+
+    Up to pool_size connections are opened on demand and reused, so
+    threads only wait for each other once all of them are busy. Batch
+    with insert_many and popfirst_n, or pipeline: calls made on a
+    Pipeline are sent in a single write and their responses read in
+    one go, saving a round trip per call."""
+
+    def __init__(self, address, pool_size=4, timeout=None):
+
+        if pool_size <= 0:
+            raise ValueError('pool_size must be > 0')
+
+        self.address = address
+        self.timeout = timeout
+        self._idle = []
+        self._slots = Semaphore(pool_size)
+        self._lock = Lock()
+        self._closed = False
+
+    def queue(self, name):
+        """Gets a RemoteDEPQ for DEPQ called name on the server"""
+        return RemoteDEPQ(name, self._call)
+
+    def pipeline(self):
+        """Gets a Pipeline, see Pipeline.queue and Pipeline.execute"""
+        return Pipeline(self)
+
+    def _call(self, code, args):
+        status, value = self._request([(code, args)])[0]
+        if status != OK:
+            raise _error(value)
+        return value
+
+    def _request(self, calls):
+
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._closed:
+                    raise ValueError('Client is closed.')
+                connection = self._idle.pop() if self._idle else None
+
+            if connection is None:
+                connection = _Connection(self.address, self.timeout)
+
+            try:
+                responses = connection.request(calls)
+            except BaseException:
+                # State of the stream is unknown, never reuse it
+                connection.close()
+                raise
+
+            with self._lock:
+                if self._closed:
+                    connection.close()
+                else:
+                    self._idle.append(connection)
+
+            return responses
+
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes idle connections, busy ones once they are returned"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RemoteDEPQ(object):
+    """Proxy of a DEPQ on the server. Items and priorities must be
+    None, bools, ints, floats, str, bytes or tuples and lists of them;
+    lists come back as lists and tuples as tuples."""
+
+    def __init__(self, name, call):
+        self.name = name
+        self._call = call
+
+    def insert(self, item, priority):
+        return self._call(protocol.INSERT, (self.name, item, priority))
+
+    def insert_many(self, pairs):
+        """Adds every tuple(item, priority) of pairs in one request"""
+        return self._call(protocol.INSERT_MANY,
+                          (self.name, [tuple(pair[:2]) for pair in pairs]))
+
+    def popfirst(self):
+        return self._call(protocol.POPFIRST, (self.name,))
+
+    def poplast(self):
+        return self._call(protocol.POPLAST, (self.name,))
+
+    def popfirst_n(self, n):
+        """Pops up to n items with highest priority in one request.
+        Returns a list of tuple(item, priority), shorter if DEPQ ran
+        empty"""
+        return self._call(protocol.POPFIRST_N, (self.name, n))
+
+    def poplast_n(self, n):
+        """Like popfirst_n, from the low end"""
+        return self._call(protocol.POPLAST_N, (self.name, n))
+
+    def first(self):
+        return self._call(protocol.FIRST, (self.name,))
+
+    def last(self):
+        return self._call(protocol.LAST, (self.name,))
+
+    def high(self):
+        return self._call(protocol.HIGH, (self.name,))
+
+    def low(self):
+        return self._call(protocol.LOW, (self.name,))
+
+    def size(self):
+        return self._call(protocol.SIZE, (self.name,))
+
+    def remove(self, item, count=1):
+        return self._call(protocol.REMOVE, (self.name, item, count))
+
+    def count(self, item):
+        return self._call(protocol.COUNT, (self.name, item))
+
+    def clear(self):
+        return self._call(protocol.CLEAR, (self.name,))
+
+    def __repr__(self):
+        return 'RemoteDEPQ({!r})'.format(self.name)
+
+
+class Pipeline(object):
+    """Collects calls made on its queue() proxies, which return None,
+    until execute() sends them all at once"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def queue(self, name):
+        return RemoteDEPQ(name, self._call)
+
+    def _call(self, code, args):
+        self.calls.append((code, args))
+
+    def execute(self, raise_on_error=True):
+        """Sends collected calls in one write and returns their results
+        in order. The first error is raised once every response has been
+        read, unless raise_on_error is False, in which case exceptions
+        take the place of results."""
+
+        calls, self.calls = self.calls, []
+        if not calls:
+            return []
+
+        results = []
+        error = None
+        for status, value in self.client._request(calls):
+            if status != OK:
+                value = _error(value)
+                if error is None:
+                    error = value
+            results.append(value)
+
+        if raise_on_error and error is not None:
+            raise error
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
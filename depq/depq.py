@@ -1,94 +1,509 @@
-import json
-from collections import defaultdict, deque
+# json is only imported on use, see run_import_check.py
+from collections import Counter, defaultdict, deque
+from itertools import chain, islice, repeat
+from operator import ge, itemgetter
 from threading import Lock
 
-
-class DEPQ:
-
-    def __init__(self, iterable=None, maxlen=None):
-
-        self.data = deque()
+# Strips the precomputed sort key from entries of a keyed DEPQ
+_pair = itemgetter(0, 1)
+# Sort key of an entry is always its last element
+_sort_key = itemgetter(-1)
+_item = itemgetter(0)
+_priority = itemgetter(1)
+# Largest magnitude up to which every int converts to a double exactly
+_EXACT_FLOAT_INT = 2 ** 53
+
+
+def _count(items):
+    """Counts list of items like DEPQ.items, unhashable ones by repr"""
+    # Hashable items are counted in C without a Python call each
+    try:
+        return defaultdict(int, Counter(items))
+    except TypeError:
+        counts = defaultdict(int)
+        for item in items:
+            try:
+                counts[item] += 1
+            except TypeError:
+                counts[repr(item)] += 1
+        return counts
+
+
+def _hand_back(depq, inflight, started, leftovers):
+    """Puts items of calls in flight that never started back into depq
+    and hands the started ones to leftovers, for parallel_drain"""
+    started = set(started)
+    for call, (item, priority) in inflight.items():
+        if call not in started:
+            depq.insert(item, priority)
+        elif leftovers is not None:
+            leftovers.append((item, call))
+    if started and leftovers is None:
+        import warnings
+        warnings.warn('parallel_drain closed with {} started calls whose '
+                      'results were not yielded'.format(len(started)),
+                      RuntimeWarning, stacklevel=3)
+
+
+class DEPQ(object):
+
+    # Entries of the default backend are kept in blocks of _load up to
+    # twice as many, see insert
+    _load = 512
+
+    def __new__(cls, *args, **kwargs):
+        """DEPQ(backend='bucket') and DEPQ(backend='radix') return the
+        integer priority backends of depq.bucket, which are subclasses."""
+        backend = kwargs.get('backend', 'deque')
+        if cls is DEPQ and backend != 'deque':
+            from depq.bucket import BACKENDS
+            try:
+                cls = BACKENDS[backend]
+            except KeyError:
+                raise ValueError('Unknown backend {!r}'.format(backend))
+        return object.__new__(cls)
+
+    def __init__(self, iterable=None, maxlen=None, key=None,
+                 backend='deque', priority_range=None, unique=False,
+                 ranked=False):
+        """If key is not None, key(priority) is computed once per item
+        and all ordering comparisons use that value instead of priority,
+        which pays off when priorities have expensive rich comparisons.
+        Entries are then stored as tuple(item, priority, sort key) but
+        every public method still returns tuple(item, priority).
+
+        backend='deque' is the default sorted list of deques which
+        accepts any comparable priorities, see insert. See depq.bucket
+        for backend='bucket' with priority_range=(low, high) and
+        backend='radix'.
+
+        If unique is True, every (hashable) item is in DEPQ at most once
+        and an item -> entry index gives O(1) priority_of(item). Adding
+        an item that is already present moves it to its new priority.
+
+        If ranked is True, sort keys are also kept in a depq.stats
+        RankIndex so rank_of, quantile and median are O(log n), at the
+        cost of an extra O(log n) update on every mutation."""
+
+        if priority_range is not None:
+            raise ValueError('priority_range requires an integer backend')
+
+        self._blocks = []
+        self._length = 0
         self.items = defaultdict(int)
         self._maxlen = maxlen
+        self._key = key
+        self._index = {} if unique else None
+        self._ranks = None
         self.lock = Lock()
+        self.journal = None
+        self._frozen = 0
+        self._shared = 0
+        self._owned = None
+
+        if ranked:
+            from depq.stats import RankIndex
+            self._ranks = RankIndex(key is not None)
 
         if iterable is not None:
             self.extend(iterable)
 
     def insert(self, item, priority):
-        """Adds item to DEPQ with given priority by performing a binary
-        search on the concurrently rotating deque. Amount rotated R of
-        DEPQ of length n would be n <= R <= 3n/2. Performance: O(n)"""
+        """Adds item to DEPQ with given priority. Entries are kept in
+        descending order in a list of deques, or blocks, of _load to
+        2 * _load entries each. A binary search over the lowest sort key
+        of each block and then within one finds the position, and the
+        gap is opened in that block only, whose pointers deque moves in
+        C. A block that outgrows 2 * _load entries is split in two.
+        Inserting at either end skips both searches. Performance:
+        O(log n) comparisons plus O(n / _load) pointer moves in C"""
+
+        # Decorate once outside of lock; searches only compare sort keys
+        key = self._key
+        if key is None:
+            entry = (item, priority)
+        else:
+            entry = (item, priority, key(priority))
 
         with self.lock:
 
-            self_data = self.data
-            rotate = self_data.rotate
+            if self._frozen:
+                self._thaw()
+
+            index = self._index
             self_items = self.items
             maxlen = self._maxlen
 
-            try:
-
-                if priority <= self_data[-1][1]:
-                    self_data.append((item, priority))
-                elif priority > self_data[0][1]:
-                    self_data.appendleft((item, priority))
-                else:
-
-                    length = len(self_data) + 1
-                    mid = length // 2
-                    shift = 0
-
-                    while True:
-
-                        if priority <= self_data[0][1]:
-                            rotate(-mid)
-                            shift += mid
-                            mid //= 2
-                            if mid == 0:
-                                mid += 1
-
-                        else:
-                            rotate(mid)
-                            shift -= mid
-                            mid //= 2
-                            if mid == 0:
-                                mid += 1
-
-                        if self_data[-1][1] >= priority > self_data[0][1]:
-                            self_data.appendleft((item, priority))
-
-                            # When returning to original position, never shift
-                            # more than half length of DEPQ i.e. if length is
-                            # 100 and we rotated -75, rotate -25, not 75
-                            if shift > length // 2:
-                                shift = length % shift
-                                rotate(-shift)
-                            else:
-                                rotate(shift)
-
-                            break
+            if index is not None:
+                # A unique DEPQ finds the old entry of a present item by
+                # its sort key as well
+                if item in index:
+                    self._unlink(index[item])
+                self._place(entry)
+                self_items[item] = 1
+                index[item] = entry
 
+            else:
+                self._place(entry)
                 try:
                     self_items[item] += 1
                 except TypeError:
                     self_items[repr(item)] += 1
 
-            except IndexError:
-                self_data.append((item, priority))
-                try:
-                    self_items[item] = 1
-                except TypeError:
-                    self_items[repr(item)] = 1
+            ranks = self._ranks
+            if ranks is not None:
+                ranks.add(entry)
 
-            if maxlen is not None and maxlen < len(self_data):
+            if maxlen is not None and maxlen < self._length:
                 self._poplast()
 
+            journal = self.journal
+            if journal is not None:
+                journal.append(('i', item, priority))
+
+    def _entry(self, item, priority):
+        """Builds stored tuple, decorated with sort key if DEPQ has one"""
+        key = self._key
+        if key is None:
+            return item, priority
+        return item, priority, key(priority)
+
+    def _search(self, sort_key, equal=False):
+        """Gets tuple(block, position) of the first entry whose sort key
+        is < sort_key, or <= sort_key if equal is True, i.e. the number
+        of blocks and 0 if there is none. Lock must already be held.
+        Performance: O(log n) comparisons"""
+
+        blocks = self._blocks
+
+        # Lowest entry of a block decides if the position is past it.
+        # Comparisons are written out, an operator call each would
+        # cost more than the comparison itself
+        low, high = 0, len(blocks)
+        if equal:
+            while low < high:
+                mid = (low + high) // 2
+                if blocks[mid][-1][-1] > sort_key:
+                    low = mid + 1
+                else:
+                    high = mid
+        else:
+            while low < high:
+                mid = (low + high) // 2
+                if blocks[mid][-1][-1] >= sort_key:
+                    low = mid + 1
+                else:
+                    high = mid
+
+        if low == len(blocks):
+            return low, 0
+
+        block = blocks[low]
+        position, high = 0, len(block) - 1
+        if equal:
+            while position < high:
+                mid = (position + high) // 2
+                if block[mid][-1] > sort_key:
+                    position = mid + 1
+                else:
+                    high = mid
+        else:
+            while position < high:
+                mid = (position + high) // 2
+                if block[mid][-1] >= sort_key:
+                    position = mid + 1
+                else:
+                    high = mid
+
+        return low, position
+
+    def _place(self, entry):
+        """Inserts entry after every entry with a sort key >= its own.
+        Lock must already be held"""
+
+        blocks = self._blocks
+        sort_key = entry[-1]
+
+        if not blocks or sort_key <= blocks[-1][-1][-1]:
+            self._push(entry, False)
+        elif sort_key > blocks[0][0][-1]:
+            self._push(entry, True)
+        else:
+            b, position = self._search(sort_key)
+            block = self._own(b)
+            block.insert(position, entry)
+            self._length += 1
+            if len(block) > 2 * self._load:
+                self._split(b)
+
+    def _push(self, entry, first):
+        """Puts entry before every other one if first is True, else after
+        them. Lock must already be held"""
+
+        blocks = self._blocks
+        self._length += 1
+
+        if not blocks:
+            blocks.append(self._new_block([entry]))
+            return
+
+        if first:
+            b = 0
+            block = self._own(0)
+            block.appendleft(entry)
+        else:
+            b = len(blocks) - 1
+            block = self._own(b)
+            block.append(entry)
+
+        if len(block) > 2 * self._load:
+            self._split(b)
+
+    def _split(self, b):
+        """Moves the upper half of block b, which must be owned, to a new
+        block after it"""
+        block = self._blocks[b]
+        upper = self._new_block(islice(block, self._load, None))
+        for _ in range(len(upper)):
+            block.pop()
+        self._blocks.insert(b + 1, upper)
+
+    def _locate(self, entry):
+        """Gets tuple(block, position) of entry, which must be in DEPQ,
+        by its sort key, then searching only among entries with an
+        equal one. Lock must already be held. Performance: O(log n)
+        comparisons"""
+
+        blocks = self._blocks
+        b, position = self._search(entry[-1], True)
+
+        # Entry is present, so the search stops within its equal keys,
+        # which may continue into the next blocks
+        while True:
+            try:
+                return b, blocks[b].index(entry, position)
+            except ValueError:
+                b += 1
+                position = 0
+
+    def _delete(self, b, position):
+        """Removes entry at position of block b and returns it"""
+        blocks = self._blocks
+        block = self._own(b)
+        tup = block[position]
+        del block[position]
+        if not block:
+            del blocks[b]
+        self._length -= 1
+        return tup
+
+    def _unlink(self, entry):
+        """Removes entry of a unique DEPQ. Lock must already be held"""
+        self._delete(*self._locate(entry))
+        del self._index[entry[0]]
+        del self.items[entry[0]]
+        if self._ranks is not None:
+            self._ranks.discard(entry)
+
+    def _build(self, entries):
+        """Replaces stored entries by list entries in descending order.
+        Lock must already be held. Performance: O(n)"""
+        self._blocks = [deque(entries[start:start + self._load])
+                        for start in range(0, len(entries), self._load)]
+        self._length = len(entries)
+        # All blocks are new, none is shared with a snapshot
+        self._frozen = 0
+        self._owned = None
+
+    def _own(self, b):
+        """Gets block b to change in place, first copying it if a live
+        snapshot may share it. Lock must already be held.
+        Performance: O(_load) for the first write to a shared block,
+        else O(1)"""
+
+        owned = self._owned
+        if owned is None:
+            return self._blocks[b]
+
+        block = self._blocks[b]
+        if id(block) not in owned:
+            block = self._blocks[b] = deque(block)
+            owned.add(id(block))
+        return block
+
+    def _new_block(self, entries):
+        """Builds a block that DEPQ owns from entries"""
+        block = deque(entries)
+        if self._owned is not None:
+            self._owned.add(id(block))
+        return block
+
+    def _recount(self, entries):
+        """Rebuilds items, index and ranks from list entries in order.
+        Raises ValueError if a unique DEPQ would hold an item twice"""
+
+        if self._index is not None:
+            index = self._index = dict(zip(map(_item, entries), entries))
+            if len(index) != len(entries):
+                raise ValueError('items must be unique')
+            self.items = defaultdict(int, dict.fromkeys(index, 1))
+        else:
+            self.items = _count(list(map(_item, entries)))
+
+        if self._ranks is not None:
+            self._ranks.build(entries)
+
+    def priority_of(self, item):
+        """Gets priority of item, the highest one if item occurs more
+        than once. Raises KeyError if item is not in DEPQ. Performance:
+        O(1) if DEPQ is unique, else O(n)"""
+
+        with self.lock:
+
+            index = self._index
+            if index is not None:
+                try:
+                    return index[item][1]
+                except KeyError as ex:
+                    ex.args = ('{!r} is not in DEPQ'.format(item),)
+                    raise
+
+            # A C level copy is cheaper than scanning while locked and,
+            # unlike a snapshot, doesn't make the next writer copy
+            pairs = list(self._pairs(self._state()))
+
+        for tup in pairs:
+            if item == tup[0]:
+                return tup[1]
+
+        raise KeyError('{!r} is not in DEPQ'.format(item))
+
+    def upsert(self, item, priority):
+        """Inserts item, or moves it to priority if already present. For
+        a unique DEPQ this is insert, which finds both the old and the
+        new position of a present item by bisection, and closes and
+        opens the gap within a block of at most 2 * _load entries.
+        Performance: O(log n) comparisons. Otherwise every occurrence is
+        eliminated first. Performance: O(n)"""
+        if self._index is None:
+            self.elim(item)
+        self.insert(item, priority)
+
     def extend(self, iterable):
         """Adds items from iterable to DEPQ. Performance: O(n)"""
         for item in iterable:
             self.insert(*item[:2])
 
+    def insert_many(self, iterable):
+        """Adds every tuple(item, priority) of iterable under a single
+        lock acquisition, with the same result as calling insert for
+        each in turn. If DEPQ is at maxlen, anything not above low() is
+        rejected in O(1) before the rest are sorted once. A batch that
+        is large next to DEPQ is then merged in by timsort, a small one
+        is placed by bisection. A unique DEPQ places them one by one by
+        bisection. Performance: O(n + m log m) for m items, O(m log n)
+        for a small batch"""
+
+        entry = self._entry
+        entries = [entry(*item[:2]) for item in iterable]
+
+        with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
+            entries = self._insert_many(entries)
+
+            journal = self.journal
+            if journal is not None and entries:
+                journal.append(('n', [tup[:2] for tup in entries]))
+
+    def _insert_many(self, entries):
+        """Adds list of stored entries as insert_many does. Returns those
+        not rejected at once. Lock must already be held"""
+
+        maxlen = self._maxlen
+        index = self._index
+        ranks = self._ranks
+
+        if index is not None:
+            for tup in entries:
+                item = tup[0]
+                if item in index:
+                    self._unlink(index[item])
+                self._place(tup)
+                self.items[item] = 1
+                index[item] = tup
+                if ranks is not None:
+                    ranks.add(tup)
+                if maxlen is not None and maxlen < self._length:
+                    self._poplast()
+            return entries
+
+        blocks = self._blocks
+
+        if maxlen is not None and self._length >= maxlen:
+            if blocks:
+                low = blocks[-1][-1][-1]
+                entries = [tup for tup in entries if tup[-1] > low]
+            else:
+                entries = []
+
+        if not entries:
+            return entries
+
+        # Stable even though reversed, so equal priorities stay in
+        # the order they were added
+        entries.sort(key=_sort_key, reverse=True)
+        if maxlen is not None:
+            del entries[maxlen:]
+
+        if not blocks or entries[0][-1] <= blocks[-1][-1][-1]:
+            push = self._push
+            for tup in entries:
+                push(tup, False)
+
+        elif len(entries) * 32 < self._length:
+            # A few entries are cheaper to place one by one than
+            # rebuilding every block
+            place = self._place
+            for tup in entries:
+                place(tup)
+
+        else:
+            # Timsort finds both descending runs and merges them
+            merged = list(chain.from_iterable(blocks))
+            merged.extend(entries)
+            merged.sort(key=_sort_key, reverse=True)
+            self._build(merged)
+
+        self_items = self.items
+
+        for tup in entries:
+            try:
+                self_items[tup[0]] += 1
+            except TypeError:
+                self_items[repr(tup[0])] += 1
+
+        if ranks is not None:
+            for tup in entries:
+                ranks.add(tup)
+
+        # Evicted ones are uncounted again
+        while maxlen is not None and self._length > maxlen:
+            self._poplast()
+
+        return entries
+
+    def batch(self):
+        """Returns a Batch, used as 'with depq.batch() as tx:', which
+        holds the lock for the whole block so its insert, popfirst,
+        poplast, remove and count calls are atomic, and merges the
+        inserts at once when the block ends. Other methods of DEPQ
+        must not be called inside the block, the lock isn't reentrant.
+        See Batch for how held back inserts are resolved"""
+        return Batch(self)
+
     def addfirst(self, item, new_priority=None):
         """Adds item to DEPQ as highest priority. The default
         starting priority is 0, the default new priority is
@@ -96,20 +511,32 @@ class DEPQ:
 
         with self.lock:
 
-            self_data = self.data
+            if self._frozen:
+                self._thaw()
 
-            try:
-                priority = self_data[0][1]
-                if new_priority is not None:
-                    if new_priority < priority:
-                        raise ValueError('Priority must be >= '
-                                         'highest priority.')
-                    else:
-                        priority = new_priority
-            except IndexError:
-                priority = 0 if new_priority is None else new_priority
-
-            self_data.appendleft((item, priority))
+            blocks = self._blocks
+            index = self._index
+            old = None if index is None else index.get(item)
+
+            if not blocks:
+                entry = self._entry(
+                    item, 0 if new_priority is None else new_priority
+                )
+            elif new_priority is None:
+                # Default priority is read while an old entry is still in
+                entry = (item,) + blocks[0][0][1:]
+            else:
+                entry = self._entry(item, new_priority)
+                head = self._rival(True, old)
+                if head is not None and entry[-1] < head[-1]:
+                    raise ValueError('Priority must be >= '
+                                     'highest priority.')
+
+            if old is not None:
+                self._unlink(old)
+
+            self._push(entry, True)
+            priority = entry[1]
             self_items = self.items
             maxlen = self._maxlen
 
@@ -118,9 +545,19 @@ class DEPQ:
             except TypeError:
                 self_items[repr(item)] += 1
 
-            if maxlen is not None and maxlen < len(self_data):
+            if index is not None:
+                index[item] = entry
+
+            if self._ranks is not None:
+                self._ranks.add(entry)
+
+            if maxlen is not None and maxlen < self._length:
                 self._poplast()
 
+            journal = self.journal
+            if journal is not None:
+                journal.append(('f', item, priority))
+
     def addlast(self, item, new_priority=None):
         """Adds item to DEPQ as lowest priority. The default
         starting priority is 0, the default new priority is
@@ -128,24 +565,36 @@ class DEPQ:
 
         with self.lock:
 
-            self_data = self.data
+            if self._frozen:
+                self._thaw()
+
+            blocks = self._blocks
+            index = self._index
+            old = None if index is None else index.get(item)
+
+            if not blocks:
+                entry = self._entry(
+                    item, 0 if new_priority is None else new_priority
+                )
+            elif new_priority is None:
+                # Default priority is read while an old entry is still in
+                entry = (item,) + blocks[-1][-1][1:]
+            else:
+                entry = self._entry(item, new_priority)
+                tail = self._rival(False, old)
+                if tail is not None and entry[-1] > tail[-1]:
+                    raise ValueError('Priority must be <= '
+                                     'lowest priority.')
+
+            if old is not None:
+                self._unlink(old)
             maxlen = self._maxlen
 
-            if maxlen is not None and maxlen == len(self_data):
+            if maxlen is not None and maxlen == self._length:
                 return
 
-            try:
-                priority = self_data[-1][1]
-                if new_priority is not None:
-                    if new_priority > priority:
-                        raise ValueError('Priority must be <= '
-                                         'lowest priority.')
-                    else:
-                        priority = new_priority
-            except IndexError:
-                priority = 0 if new_priority is None else new_priority
-
-            self_data.append((item, priority))
+            self._push(entry, False)
+            priority = entry[1]
             self_items = self.items
 
             try:
@@ -153,46 +602,105 @@ class DEPQ:
             except TypeError:
                 self_items[repr(item)] += 1
 
+            if index is not None:
+                index[item] = entry
+
+            if self._ranks is not None:
+                self._ranks.add(entry)
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('l', item, priority))
+
+    def _rival(self, first, entry):
+        """Gets entry with highest priority if first is True, else the
+        one with lowest, passing over entry. None if there is no other.
+        Lock must already be held"""
+
+        blocks = self._blocks
+        if first:
+            entries = chain.from_iterable(blocks)
+        else:
+            entries = chain.from_iterable(map(reversed, reversed(blocks)))
+
+        for tup in islice(entries, 2):
+            if tup is not entry:
+                return tup
+        return None
+
     def popfirst(self):
         """Removes item with highest priority from DEPQ. Returns
         tuple(item, priority). Performance: O(1)"""
 
         with self.lock:
 
-            try:
-                tup = self.data.popleft()
-            except IndexError as ex:
-                ex.args = ('DEPQ is already empty',)
-                raise
+            if self._frozen:
+                self._thaw()
 
-            self_items = self.items
+            tup = self._popfirst()
 
-            try:
-                self_items[tup[0]] -= 1
-                if self_items[tup[0]] == 0:
-                    del self_items[tup[0]]
-            except TypeError:
-                r = repr(tup[0])
-                self_items[r] -= 1
-                if self_items[r] == 0:
-                    del self_items[r]
+            journal = self.journal
+            if journal is not None:
+                journal.append(('p',))
+
+            return tup if self._key is None else tup[:2]
+
+    def _popfirst(self):
+        """Removes entry with highest priority. Lock must already be
+        held"""
+
+        if not self._length:
+            raise IndexError('DEPQ is already empty')
+        tup = self._delete(0, 0)
+
+        if self._index is not None:
+            del self._index[tup[0]]
+
+        if self._ranks is not None:
+            self._ranks.discard(tup)
+
+        self_items = self.items
+
+        try:
+            self_items[tup[0]] -= 1
+            if self_items[tup[0]] == 0:
+                del self_items[tup[0]]
+        except TypeError:
+            r = repr(tup[0])
+            self_items[r] -= 1
+            if self_items[r] == 0:
+                del self_items[r]
 
-            return tup
+        return tup
 
     def poplast(self):
         """Removes item with lowest priority from DEPQ. Returns
         tuple(item, priority). Performance: O(1)"""
         with self.lock:
-            return self._poplast()
+
+            if self._frozen:
+                self._thaw()
+
+            tup = self._poplast()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('q',))
+
+            return tup if self._key is None else tup[:2]
 
     def _poplast(self):
         """For avoiding lock during inserting to keep maxlen"""
 
-        try:
-            tup = self.data.pop()
-        except IndexError as ex:
-            ex.args = ('DEPQ is already empty',)
-            raise
+        if not self._length:
+            raise IndexError('DEPQ is already empty')
+        tup = self._delete(-1, -1)
+
+        if self._index is not None:
+            del self._index[tup[0]]
+
+        if self._ranks is not None:
+            self._ranks.discard(tup)
 
         self_items = self.items
 
@@ -212,7 +720,7 @@ class DEPQ:
         """Gets item with highest priority. Performance: O(1)"""
         with self.lock:
             try:
-                return self.data[0][0]
+                return self._blocks[0][0][0]
             except IndexError as ex:
                 ex.args = ('DEPQ is empty',)
                 raise
@@ -221,7 +729,7 @@ class DEPQ:
         """Gets item with lowest priority. Performance: O(1)"""
         with self.lock:
             try:
-                return self.data[-1][0]
+                return self._blocks[-1][-1][0]
             except IndexError as ex:
                 ex.args = ('DEPQ is empty',)
                 raise
@@ -230,7 +738,7 @@ class DEPQ:
         """Gets highest priority. Performance: O(1)"""
         with self.lock:
             try:
-                return self.data[0][1]
+                return self._blocks[0][0][1]
             except IndexError as ex:
                 ex.args = ('DEPQ is empty',)
                 raise
@@ -239,37 +747,64 @@ class DEPQ:
         """Gets lowest priority. Performance: O(1)"""
         with self.lock:
             try:
-                return self.data[-1][1]
+                return self._blocks[-1][-1][1]
             except IndexError as ex:
                 ex.args = ('DEPQ is empty',)
                 raise
 
     def size(self):
         """Gets length of DEPQ. Performance: O(1)"""
-        return len(self.data)
+        return self._length
 
     def clear(self):
         """Empties DEPQ. Performance: O(1)"""
         with self.lock:
-            self.data.clear()
+
+            # Snapshots may still share blocks but never items or index
+            self._build([])
             self.items.clear()
+            if self._index is not None:
+                self._index.clear()
+
+            if self._ranks is not None:
+                self._ranks.clear()
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('c',))
 
     def is_empty(self):
         """Returns True if DEPQ is empty, else False. Performance: O(1)"""
-        return len(self.data) == 0
+        return self._length == 0
 
     @property
     def maxlen(self):
         """Returns maxlen"""
         return self._maxlen
 
+    @property
+    def data(self):
+        """Returns a new deque of the stored entries in priority order,
+        i.e. tuple(item, priority) or with a key tuple(item, priority,
+        sort key). Performance: O(n)"""
+        with self.lock:
+            return deque(chain.from_iterable(self._blocks))
+
     def set_maxlen(self, length):
         """Sets maxlen"""
         with self.lock:
+
+            if self._frozen:
+                self._thaw()
+
             self._maxlen = length
-            while len(self.data) > length:
+            while self._length > length:
                 self._poplast()
 
+            journal = self.journal
+            if journal is not None:
+                journal.append(('m', length))
+
     def count(self, item):
         """Returns number of occurrences of item in DEPQ. Performance: O(1)"""
         try:
@@ -277,6 +812,127 @@ class DEPQ:
         except TypeError:
             return self.items.get(repr(item), 0)
 
+    def contains_many(self, iterable, array=False):
+        """Returns a list of bools, one per item of iterable, telling if
+        it is in DEPQ. All items are looked up under a single lock
+        acquisition. If array is True a NumPy bool array is returned
+        instead. Performance: O(k) for k items"""
+        result = self._lookup_many(iterable, True)
+        if array:
+            import numpy
+            return numpy.array(result, dtype=bool)
+        return result
+
+    def count_many(self, iterable, array=False):
+        """Returns a list with the number of occurrences in DEPQ of each
+        item of iterable, looked up under a single lock acquisition. If
+        array is True a NumPy int array is returned instead.
+        Performance: O(k) for k items"""
+        result = self._lookup_many(iterable, False)
+        if array:
+            import numpy
+            return numpy.array(result, dtype=numpy.intp)
+        return result
+
+    def rank_of(self, priority):
+        """Returns the number of entries with a priority higher than or
+        equal to priority, i.e. the index insert would give an item with
+        it. Performance: O(log n) if DEPQ is ranked, else O(log n)
+        comparisons plus summing the lengths of O(n / _load) blocks"""
+
+        key = self._key
+        sort_key = priority if key is None else key(priority)
+
+        with self.lock:
+            ranks = self._ranks
+            if ranks is not None:
+                return ranks.count_at_least(sort_key)
+            return self._rank(sort_key)
+
+    def _rank(self, sort_key):
+        """For rank_of while lock is held and DEPQ is not ranked"""
+        b, position = self._search(sort_key)
+        return sum(map(len, islice(self._blocks, b))) + position
+
+    def quantile(self, q):
+        """Returns the priority at ascending position int(q * (n - 1)),
+        so quantile(0) is low(), quantile(0.99) the p99 and quantile(1)
+        high(). Priorities need not be numbers and are thus never
+        interpolated. Raises IndexError if DEPQ is empty. Performance:
+        O(log n) if DEPQ is ranked, else O(n / _load)"""
+
+        if not 0 <= q <= 1:
+            raise ValueError('q must be between 0 and 1')
+
+        with self.lock:
+
+            length = len(self)
+            if not length:
+                raise IndexError('DEPQ is empty')
+
+            position = int(q * (length - 1))
+            ranks = self._ranks
+            if ranks is not None:
+                return ranks.value_at(position)
+            return self._entry_at(length - 1 - position)[1]
+
+    def median(self):
+        """Returns the lower median priority, i.e. quantile(0.5)"""
+        return self.quantile(0.5)
+
+    def _entry_at(self, index):
+        """Gets stored entry at index, which may be negative, walking
+        the blocks from the nearer end. Lock must already be held.
+        Performance: O(n / _load)"""
+
+        length = self._length
+        if index >= length or index < -length:
+            raise IndexError('DEPQ has no index {}'.format(index))
+
+        if index < 0:
+            index += length
+        if index < length // 2:
+            for block in self._blocks:
+                if index < len(block):
+                    return block[index]
+                index -= len(block)
+
+        index -= length
+        for block in reversed(self._blocks):
+            if -index <= len(block):
+                return block[index]
+            index += len(block)
+
+    def _lookup_many(self, iterable, contains):
+
+        # Consumed before locking so a slow iterable never blocks others
+        items = list(iterable)
+
+        with self.lock:
+
+            self_items = self.items
+
+            # Hashable items resolve in C without a Python call each
+            try:
+                if contains:
+                    return list(map(self_items.__contains__, items))
+                return list(map(self_items.get, items, repeat(0, len(items))))
+            except TypeError:
+                pass
+
+            result = []
+            for item in items:
+                try:
+                    hash(item)
+                except TypeError:
+                    item = repr(item)
+                if contains:
+                    result.append(item in self_items)
+                else:
+                    result.append(self_items.get(item, 0))
+
+            return result
+
     def remove(self, item, count=1):
         """Removes occurrences of given item in ascending priority. Default
         number of removals is 1. Useful for tasks that no longer require
@@ -285,82 +941,460 @@ class DEPQ:
 
         with self.lock:
 
-            try:
-                count = int(count)
-            except ValueError as ex:
-                ex.args = ('{} cannot be represented as an '
-                           'integer'.format(count),)
-                raise
-            except TypeError as ex:
-                ex.args = ('{} cannot be represented as an '
-                           'integer'.format(count),)
-                raise
+            if self._frozen:
+                self._thaw()
 
-            removed = []
-            self_items = self.items
+            removed = self._remove(item, count)
 
-            try:
-                item_freq = self_items[item]
-                item_repr = item
-                if item_freq == 0:
-                    return removed
-            except TypeError:
-                item_freq = self_items[repr(item)]
-                item_repr = repr(item)
-                if item_freq == 0:
-                    return removed
-
-            if count == -1:
-                count = item_freq
-
-            self_data = self.data
-            rotate = self_data.rotate
-            pop = self_data.pop
-            counter = 0
-
-            for i in range(len(self_data)):
-                if count > counter and item == self_data[-1][0]:
-                    removed.append(pop())
-                    counter += 1
+            journal = self.journal
+            if journal is not None and removed:
+                journal.append(('r', item, len(removed)))
+
+            if self._key is not None:
+                removed = [tup[:2] for tup in removed]
+
+            return removed
+
+    def _remove(self, item, count):
+        """Removes count occurrences of item, all if count is -1, and
+        returns their stored entries. Lock must already be held"""
+
+        try:
+            count = int(count)
+        except ValueError as ex:
+            ex.args = ('{} cannot be represented as an '
+                       'integer'.format(count),)
+            raise
+        except TypeError as ex:
+            ex.args = ('{} cannot be represented as an '
+                       'integer'.format(count),)
+            raise
+
+        removed = []
+        self_items = self.items
+
+        try:
+            item_freq = self_items[item]
+            item_repr = item
+            if item_freq == 0:
+                return removed
+        except TypeError:
+            item_freq = self_items[repr(item)]
+            item_repr = repr(item)
+            if item_freq == 0:
+                return removed
+
+        if count == -1:
+            count = item_freq
+
+        if self._index is not None:
+            # Sole occurrence is found through its sort key
+            if count > 0:
+                entry = self._index[item]
+                self._unlink(entry)
+                removed.append(entry)
+        else:
+            blocks = self._blocks
+
+            # From the lowest block up, each one holding an occurrence
+            # is rebuilt once without those taken from its low end
+            for b in range(len(blocks) - 1, -1, -1):
+                if len(removed) >= count:
+                    break
+                block = blocks[b]
+                positions = [position for position, tup in enumerate(block)
+                             if item == tup[0]]
+                if not positions:
                     continue
-                rotate()
+                taken = positions[len(removed) - count:]
+                removed.extend(block[position]
+                               for position in reversed(taken))
+                taken = set(taken)
+                kept = self._new_block(
+                    tup for position, tup in enumerate(block)
+                    if position not in taken
+                )
+                if kept:
+                    blocks[b] = kept
+                else:
+                    del blocks[b]
+
+            self._length -= len(removed)
 
             if item_freq <= count:
                 del self_items[item_repr]
             else:
                 self_items[item_repr] -= count
 
-            return removed
+            ranks = self._ranks
+            if ranks is not None:
+                for tup in removed:
+                    ranks.discard(tup)
+
+        return removed
+
+    def _matches(self, item):
+        """Gets stored entries of item in ascending priority. Lock must
+        already be held. Performance: O(n)"""
+        return [tup for block in reversed(self._blocks)
+                for tup in reversed(block) if item == tup[0]]
 
     def elim(self, item):
         """Removes all occurrences of item. Returns a list of
         tuple(item, priority). Performance: O(n)"""
         return self.remove(item, -1)
 
-    def to_json(self):
+    def reprioritize(self, func, monotonic=False):
+        """Replaces the priority of every item with func(item, priority)
+        under a single lock acquisition, e.g. for aging or decay. Pass
+        monotonic=True only if func never reorders items, i.e. old
+        priorities p1 >= p2 give new priorities p1' >= p2'; priorities
+        are then rewritten keeping the current order, which is checked
+        in the same pass. Performance: O(n)
+        Otherwise, or if func did reorder items after all, DEPQ is
+        re-sorted once, items with equal new priorities keeping their
+        current relative order. Performance: O(n log n)"""
+
         with self.lock:
-            state = self.__dict__.copy()
-            state['data'] = list(state['data'])
-            del state['lock']
-            return state
+
+            entry = self._entry
+            current = list(chain.from_iterable(self._blocks))
+            priorities = [func(tup[0], tup[1]) for tup in current]
+            entries = [entry(tup[0], priority)
+                       for tup, priority in zip(current, priorities)]
+
+            if monotonic:
+                sort_keys = list(map(_sort_key, entries))
+                monotonic = all(map(ge, sort_keys,
+                                    islice(sort_keys, 1, None)))
+
+            if not monotonic:
+                # Stable even though reversed; already sorted runs are
+                # merged by timsort in linear time
+                entries.sort(key=_sort_key, reverse=True)
+
+            self._build(entries)
+            if self._index is not None:
+                self._index = {tup[0]: tup for tup in entries}
+            if self._ranks is not None:
+                self._ranks.build(entries)
+
+            journal = self.journal
+            if journal is not None:
+                journal.append(('a', priorities, monotonic))
+
+    def watch(self, callback, high_above=None, low_below=None,
+              size_above=None, mode='sync', loop=None):
+        """Subscribes callback(event, value) to high() going above
+        high_above, low() going below low_below or len() going above
+        size_above, instead of polling them. Returns a depq.watch.Watch,
+        see there for when events fire.
+
+        Conditions are checked whenever the lock is released after an
+        operation, in O(1) per watch, and callbacks only run after the
+        lock was released. mode='sync' calls callback in the thread
+        that changed DEPQ and raises its exceptions there, mode='thread'
+        in a thread of the watch, in order, and mode='asyncio' on loop,
+        by default the running one; a coroutine function is scheduled
+        as a task. DEPQ is not slowed down once no watch is left."""
+
+        from depq.watch import Watch, WatchedLock, deliver
+
+        watch = Watch(self, callback, high_above, low_below, size_above,
+                      mode, loop)
+        fired = []
+
+        with self.lock:
+            lock = self.lock
+            if not isinstance(lock, WatchedLock):
+                lock = self.lock = WatchedLock(self, lock)
+            lock.watches.append(watch)
+            watch.check(self, fired)
+
+        deliver(fired)
+        return watch
+
+    def unwatch(self, watch):
+        """Cancels watch returned by watch()"""
+
+        with self.lock:
+            lock = self.lock
+            watches = getattr(lock, 'watches', [])
+            if watch in watches:
+                watches.remove(watch)
+                if not watches:
+                    self.lock = lock.lock
+
+        watch._close()
+
+    def _end(self, first):
+        """Gets entry with highest priority if first is True, else the
+        one with lowest. Lock must already be held"""
+        if first:
+            return self._blocks[0][0]
+        return self._blocks[-1][-1]
+
+    def parallel_drain(self, fn, executor, max_inflight=None,
+                       leftovers=None):
+        """Generator running fn(item) on a concurrent.futures executor
+        for every item popped from DEPQ, yielding tuple(item, result)
+        as calls complete. Exactly max_inflight calls (default
+        os.cpu_count()) are kept running and an item is only popped
+        with popfirst() when a slot frees up, so items inserted while
+        draining, e.g. by fn itself, jump ahead if their priority is
+        higher. Stops once DEPQ is empty and nothing is in flight. If
+        fn raises, the exception is raised by the generator.
+
+        Closing the generator early cancels calls that haven't started
+        and puts their items back into DEPQ. Calls already running or
+        done are not put back, as fn would run twice: tuple(item,
+        future) of each is appended to the list leftovers, or if that
+        is None a RuntimeWarning tells how many there were. See
+        depq.aio.parallel_drain for asyncio."""
+
+        import os
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from functools import partial
+
+        if max_inflight is None:
+            max_inflight = os.cpu_count() or 1
+        if max_inflight <= 0:
+            raise ValueError('max_inflight must be > 0')
+
+        inflight = {}
+
+        try:
+            while True:
+
+                while len(inflight) < max_inflight:
+                    try:
+                        item, priority = self.popfirst()
+                    except IndexError:
+                        break
+                    future = executor.submit(partial(fn, item))
+                    inflight[future] = item, priority
+
+                if not inflight:
+                    return
+
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, _ = inflight.pop(future)
+                    yield item, future.result()
+
+        finally:
+            _hand_back(self, inflight, [
+                future for future in inflight if not future.cancel()
+            ], leftovers)
+
+    def snapshot(self):
+        """Freezes a consistent view of DEPQ without copying it, so
+        serializing the snapshot happens outside of lock. Entries are
+        shared copy-on-write block by block: the first mutation made
+        while the snapshot is alive copies the list of blocks, which is
+        O(n / _load), and every block is copied in O(_load) when it is
+        first written, so no writer pauses for a copy of the whole DEPQ.
+        Items, index and ranks are never shared; Snapshot.items counts
+        the frozen entries instead. Call release() on the returned
+        Snapshot (or use it as a context manager) as soon as possible
+        so later mutations don't copy at all. Performance: O(1)"""
+        with self.lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        """For freezing a view while lock is already held"""
+        self._frozen = 1
+        self._shared += 1
+        return Snapshot(self, self._state(), len(self))
+
+    def _release(self):
+        """Forgets a released snapshot. Lock must already be held"""
+        self._shared -= 1
+        if not self._shared:
+            self._frozen = 0
+            self._owned = None
+
+    def _pairs(self, state):
+        """Iterates tuple(item, priority) of a frozen state in order"""
+        entries = chain.from_iterable(state['_blocks'])
+        if state['_key'] is None:
+            return entries
+        return map(_pair, entries)
+
+    def _thaw(self):
+        """Gives DEPQ its own list of blocks, shared with live snapshots
+        until now. The blocks themselves are copied one by one as they
+        are written, see _own. Lock must already be held.
+        Performance: O(n / _load)"""
+        self._blocks = list(self._blocks)
+        self._owned = set()
+        self._frozen = 0
+
+    def to_arrays(self, array=False):
+        """Returns tuple(items, priorities) in priority order, items as a
+        list and priorities as an array.array of int64 ('q') when they
+        are all ints in range or of double ('d') when they are floats and
+        ints of at most 2 ** 53, which converts exactly, else as a list,
+        so Decimal, Fraction or big int priorities keep their value. An
+        array.array exposes the buffer protocol, so numpy.frombuffer,
+        memoryview or pyarrow.py_buffer read it without a copy. If array
+        is True priorities are a NumPy array wrapping that buffer.
+
+        Columns are gathered under lock by mapping itemgetters over the
+        stored entries in C, so no tuple is built per item. No backend
+        stores priorities in an array, thus the columns are always a
+        copy. Performance: O(n)"""
+
+        with self.lock:
+            items, priorities = self._columns()
+
+        from array import array as typed_array
+        types = set(map(type, priorities))
+        if types <= {int}:
+            try:
+                priorities = typed_array('q', priorities)
+            except OverflowError:
+                pass
+        elif types <= {int, float} and all(
+                -_EXACT_FLOAT_INT <= priority <= _EXACT_FLOAT_INT
+                for priority in priorities if type(priority) is int):
+            priorities = typed_array('d', priorities)
+
+        if array:
+            import numpy
+            if isinstance(priorities, list):
+                priorities = numpy.array(priorities, dtype=object)
+            else:
+                # Type codes of array and NumPy agree for q and d
+                priorities = numpy.frombuffer(priorities, priorities.typecode)
+
+        return items, priorities
+
+    def _columns(self):
+        """Gets lists of items and priorities. Lock must already be held"""
+        entries = list(chain.from_iterable(self._blocks))
+        return list(map(_item, entries)), list(map(_priority, entries))
+
+    @classmethod
+    def from_arrays(cls, items, priorities, presorted=True, maxlen=None,
+                    key=None, unique=False, ranked=False):
+        """Builds a DEPQ from sequences of items and their priorities,
+        e.g. as returned by to_arrays, lists or NumPy arrays. If
+        presorted is True priorities must be in descending order, which
+        is checked in a single pass; otherwise entries are sorted once
+        and equal priorities keep their order, as if inserted one by
+        one. At most maxlen entries with the highest priorities are
+        kept. Raises ValueError if lengths differ, priorities are not
+        presorted as promised or, with unique=True, an item occurs twice.
+        Performance: O(n), O(n log n) if not presorted"""
+
+        # NumPy and array.array give Python scalars back in C
+        if hasattr(items, 'tolist'):
+            items = items.tolist()
+        if hasattr(priorities, 'tolist'):
+            priorities = priorities.tolist()
+
+        if len(items) != len(priorities):
+            raise ValueError('items and priorities differ in length')
+
+        depq = DEPQ(maxlen=maxlen, key=key, unique=unique, ranked=ranked)
+
+        if key is None:
+            data = list(zip(items, priorities))
+            sort_keys = priorities
+        else:
+            sort_keys = list(map(key, priorities))
+            data = list(zip(items, priorities, sort_keys))
+
+        if presorted:
+            if not all(map(ge, sort_keys, islice(sort_keys, 1, None))):
+                raise ValueError('priorities are not in descending order')
+        else:
+            # Stable, so equal priorities stay in insertion order
+            data.sort(key=_sort_key, reverse=True)
+
+        if maxlen is not None:
+            del data[maxlen:]
+
+        depq._build(data)
+        depq._recount(data)
+        return depq
+
+    def to_json(self):
+        """Returns JSON serializable state. A key function is not part
+        of it and must be passed to from_json again."""
+        with self.snapshot() as snapshot:
+            state = snapshot.state
+            return {
+                'data': list(snapshot),
+                'items': dict(snapshot.items),
+                '_maxlen': state['_maxlen'],
+                'unique': state['unique'],
+                'ranked': state['ranked'],
+            }
 
     @classmethod
-    def from_json(cls, json_str):
-        depq = DEPQ()
+    def from_json(cls, json_str, key=None):
+        import json
         state = json.loads(json_str)
-        state['data'] = deque(tuple(pair) for pair in state['data'])
+
+        backend = state.pop('backend', 'deque')
+        if backend != 'deque':
+            depq = DEPQ(state['data'], state['_maxlen'], backend=backend,
+                        priority_range=state.get('priority_range'))
+            return depq
+
+        depq = DEPQ(key=key, unique=state.pop('unique', False),
+                    ranked=state.pop('ranked', False))
+        entry = depq._entry
+        data = [entry(*pair) for pair in state.pop('data')]
+        state['items'] = defaultdict(int, state['items'])
         depq.__dict__.update(state)
+        depq._build(data)
+        if depq._index is not None:
+            # JSON object keys are always strings
+            depq._index = {tup[0]: tup for tup in data}
+            depq.items = defaultdict(int, dict.fromkeys(depq._index, 1))
+        if depq._ranks is not None:
+            depq._ranks.build(data)
         return depq
 
+    def _state(self):
+        """Gets serializable attributes. Items, index and ranks are
+        changed in place by every writer, so they are left out and only
+        flagged; loading rebuilds them. Lock must already be held"""
+        state = self.__dict__.copy()
+        for name in ('lock', 'journal', '_frozen', '_shared', '_owned',
+                     'items', '_index', '_ranks'):
+            state.pop(name, None)
+        state['unique'] = self._index is not None
+        state['ranked'] = self._ranks is not None
+        return state
+
     def __getstate__(self):
-        with self.lock:
-            state = self.__dict__.copy()
-            del state['lock']
+        # Entries are copied outside of lock from a frozen view
+        with self.snapshot() as snapshot:
+            state = snapshot.state
+            # Pickled as one list, as before entries were split in blocks
+            state['data'] = list(chain.from_iterable(state.pop('_blocks')))
+            del state['_length']
             return state
 
     def __setstate__(self, state):
-        self.__dict__.update(state)
-        self.lock = Lock()
+        # Journal snapshots hold the frozen blocks themselves. Pickles
+        # of earlier versions also hold items and the index instead of
+        # flags, which are rebuilt all the same
+        data = state.get('data')
+        if data is None:
+            data = chain.from_iterable(state['_blocks'])
+        data = list(data)
+        DEPQ.__init__(
+            self, maxlen=state.get('_maxlen'), key=state.get('_key'),
+            unique=state.get('unique', state.get('_index') is not None),
+            ranked=state.get('ranked', state.get('_ranks', False))
+        )
+        self._build(data)
+        self._recount(data)
 
     def __contains__(self, item):
         try:
@@ -369,17 +1403,16 @@ class DEPQ:
             return repr(item) in self.items
 
     def __iter__(self):
-        """Returns highly efficient deque C iterator."""
+        """Returns highly efficient C iterator chaining deque ones."""
         with self.lock:
-            return iter(self.data)
+            entries = chain.from_iterable(list(self._blocks))
+            if self._key is None:
+                return entries
+            return map(_pair, entries)
 
     def __getitem__(self, index):
         with self.lock:
-            try:
-                return self.data[index]
-            except IndexError as ex:
-                ex.args = ('DEPQ has no index {}'.format(index),)
-                raise
+            return self._entry_at(index)[:2]
 
     def __setitem__(self, item, priority):
         """Alias for self.insert"""
@@ -390,12 +1423,13 @@ class DEPQ:
                                   'referencing arbitrary indices.')
 
     def __len__(self):
-        return len(self.data)
+        return self._length
 
     def __str__(self):
         with self.lock:
             return 'DEPQ([{}])'.format(
-                ', '.join(str(item) for item in self.data)
+                ', '.join(str(tup[:2])
+                          for tup in chain.from_iterable(self._blocks))
             )
 
     def __repr__(self):
@@ -403,3 +1437,224 @@ class DEPQ:
 
     def __unicode__(self):
         return self.__str__()
+
+
+class Snapshot(object):
+    """Consistent frozen view of a DEPQ returned by DEPQ.snapshot().
+    state holds the attributes pickling is built from, e.g. _blocks
+    being the frozen list of blocks of the default backend. Iterating
+    yields tuple(item, priority) in priority order like DEPQ does."""
+
+    def __init__(self, depq, state, length):
+        self.depq = depq
+        self.state = state
+        self.length = length
+        self.released = False
+        self._items = None
+
+    @property
+    def items(self):
+        """Occurrences of every item like DEPQ.items, counted from the
+        frozen entries on first use. Performance: O(n)"""
+        if self._items is None:
+            self._items = _count([tup[0] for tup in self])
+        return self._items
+
+    def release(self):
+        """Lets DEPQ mutate shared blocks in place again"""
+        if self.released:
+            return
+        self.released = True
+
+        depq = self.depq
+        with depq.lock:
+            depq._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __iter__(self):
+        return self.depq._pairs(self.state)
+
+    def __len__(self):
+        return self.length
+
+
+class Batch(object):
+    """Group of operations on a DEPQ applied under a single acquisition
+    of its lock, returned by DEPQ.batch(). No other thread sees DEPQ or
+    changes it between the operations of the block.
+
+    Inserts are held back and merged at the end of the block the way
+    insert_many does: one sort of the batch and one pass over DEPQ at
+    most instead of a search per item, and maxlen is enforced once at
+    that point, so DEPQ may hold more than maxlen items within the
+    block. Meanwhile popfirst, poplast, remove and count answer as if
+    the held back inserts were already in DEPQ: popfirst and poplast
+    compare both ends, an item inserted and then removed is never
+    added at all. Operations already made stay applied if the block
+    raises; the held back inserts are then still merged."""
+
+    def __init__(self, depq):
+        self.depq = depq
+        self.lock = None
+        # Stored entries of held back inserts, descending once sorted
+        self.pending = []
+        self._sorted = True
+
+    def insert(self, item, priority):
+        """Holds back item with priority until the block ends.
+        Performance: O(1), O(p) in a unique DEPQ for p inserts held"""
+
+        depq = self.depq
+        entry = depq._entry(item, priority)
+
+        if depq._index is not None:
+            # A unique DEPQ moves an item that is already present
+            if item in depq._index:
+                self._thaw()
+                depq._remove(item, 1)
+                self._journal(('r', item, 1))
+            else:
+                self.pending = [tup for tup in self.pending
+                                if tup[0] != item]
+
+        self.pending.append(entry)
+        self._sorted = False
+
+    def popfirst(self):
+        """Removes item with highest priority among DEPQ and held back
+        inserts. Returns tuple(item, priority). Performance: O(p)"""
+
+        depq = self.depq
+        pending = self._ordered()
+
+        # Of equal priorities the ones already in DEPQ come first
+        if pending and (not len(depq) or
+                        pending[0][-1] > depq._end(True)[-1]):
+            return pending.pop(0)[:2]
+
+        self._thaw()
+        tup = depq._popfirst()
+        self._journal(('p',))
+        return tup[:2]
+
+    def poplast(self):
+        """Removes item with lowest priority among DEPQ and held back
+        inserts. Returns tuple(item, priority). Performance: O(1)"""
+
+        depq = self.depq
+        pending = self._ordered()
+
+        if pending and (not len(depq) or
+                        pending[-1][-1] <= depq._end(False)[-1]):
+            return pending.pop()[:2]
+
+        self._thaw()
+        tup = depq._poplast()
+        self._journal(('q',))
+        return tup[:2]
+
+    def remove(self, item, count=1):
+        """Removes occurrences of item in ascending priority like
+        DEPQ.remove, taking held back inserts into account. Returns a
+        list of tuple(item, priority). Performance: O(n)"""
+
+        try:
+            count = int(count)
+        except (TypeError, ValueError) as ex:
+            ex.args = ('{} cannot be represented as an '
+                       'integer'.format(count),)
+            raise
+
+        depq = self.depq
+        held = [tup for tup in reversed(self._ordered()) if item == tup[0]]
+
+        if not held:
+            self._thaw()
+            removed = depq._remove(item, count)
+            if removed:
+                self._journal(('r', item, len(removed)))
+            return [tup[:2] for tup in removed]
+
+        stored = depq._matches(item) if depq.count(item) else []
+        if count == -1:
+            count = len(held) + len(stored)
+
+        # Merge both ascending runs; a held back insert goes after any
+        # stored entry with an equal sort key, so it is lower
+        removed = []
+        i = j = 0
+        while len(removed) < count and (i < len(held) or j < len(stored)):
+            if j == len(stored) or (i < len(held) and
+                                    held[i][-1] <= stored[j][-1]):
+                removed.append(held[i])
+                i += 1
+            else:
+                removed.append(stored[j])
+                j += 1
+
+        if i:
+            taken = set(map(id, held[:i]))
+            self.pending = [tup for tup in self.pending
+                            if id(tup) not in taken]
+        if j:
+            self._thaw()
+            depq._remove(item, j)
+            self._journal(('r', item, j))
+
+        return [tup[:2] for tup in removed]
+
+    def count(self, item):
+        """Returns number of occurrences of item in DEPQ and held back
+        inserts. Performance: O(p)"""
+        held = sum(1 for tup in self.pending if item == tup[0])
+        return self.depq.count(item) + held
+
+    def _ordered(self):
+        """Gets held back inserts sorted descending, equal sort keys in
+        the order they were inserted"""
+        if not self._sorted:
+            self.pending.sort(key=_sort_key, reverse=True)
+            self._sorted = True
+        return self.pending
+
+    def _thaw(self):
+        depq = self.depq
+        if depq._frozen:
+            depq._thaw()
+
+    def _journal(self, record):
+        journal = self.depq.journal
+        if journal is not None:
+            journal.append(record)
+
+    def _commit(self):
+        """Merges held back inserts into DEPQ. Lock must be held"""
+
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+
+        self._thaw()
+        entries = self.depq._insert_many(pending)
+        if entries:
+            self._journal(('n', [tup[:2] for tup in entries]))
+
+    def __len__(self):
+        return len(self.depq) + len(self.pending)
+
+    def __enter__(self):
+        lock = self.lock = self.depq.lock
+        lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._commit()
+        finally:
+            lock, self.lock = self.lock, None
+            lock.release()
@@ -0,0 +1,283 @@
+from heapq import heapify, heappop, heappush, heapreplace
+from itertools import count
+from threading import Lock
+
+from depq.depq import DEPQ
+
+
+class _Tenant(object):
+
+    __slots__ = ('name', 'weight', 'maxlen', 'depq', 'finish', 'sequence',
+                 'inserted', 'popped', 'dropped')
+
+    def __init__(self, name, weight, maxlen):
+        self.name = name
+        self.weight = weight
+        self.maxlen = maxlen
+        # Created on first insert and dropped once empty, so idle
+        # tenants cost no more than this object
+        self.depq = None
+        self.finish = 0.0
+        # Sequence number of its live heap entry, older ones are stale
+        self.sequence = -1
+        self.inserted = 0
+        self.popped = 0
+        self.dropped = 0
+
+
+class FairDEPQ(object):
+    """Weighted fair queue of tenants, each with its own DEPQ.
+
+    popfirst() serves tenants by self-clocked weighted fair queueing: a
+    tenant with work has a virtual finish time, one job's cost 1/weight
+    after the later of its previous finish and the virtual time when it
+    got work, and the tenant with the earliest finish time is served
+    next, its own highest priority item first. A tenant of weight 2
+    thus gets twice the turns of one of weight 1 while both have work,
+    and no tenant can starve another however much it inserts. Finish
+    times of the T tenants with work are kept in a heap, so choosing
+    one is O(log T) whatever the number of idle tenants.
+
+    Tenants are created on first use with the default weight and
+    maxlen, or explicitly by add_tenant. A tenant's DEPQ is dropped as
+    soon as it is empty, keeping idle tenants cheap."""
+
+    def __init__(self, weight=1, maxlen=None):
+
+        if not weight > 0:
+            raise ValueError('weight must be > 0')
+
+        self.weight = weight
+        self.maxlen = maxlen
+        self.lock = Lock()
+
+        self._tenants = {}
+        # tuple(finish time, sequence number, tenant) of tenants with
+        # work, possibly stale for ones emptied by poplast or remove
+        self._heap = []
+        self._sequence = count()
+        self._active = 0
+        self._length = 0
+        self._virtual_time = 0.0
+
+    def add_tenant(self, tenant, weight=None, maxlen=None):
+        """Adds tenant or changes weight and maxlen of an existing one.
+        A new weight applies from the tenant's next job on. Performance:
+        O(1) unless maxlen drops entries"""
+
+        if weight is not None and not weight > 0:
+            raise ValueError('weight must be > 0')
+
+        with self.lock:
+            state = self._tenant(tenant)
+            if weight is not None:
+                state.weight = weight
+            if maxlen is not None:
+                state.maxlen = maxlen
+                depq = state.depq
+                if depq is not None:
+                    before = len(depq)
+                    depq.set_maxlen(maxlen)
+                    dropped = before - len(depq)
+                    state.dropped += dropped
+                    self._length -= dropped
+                    if not depq:
+                        self._deactivate(state)
+
+    def _tenant(self, tenant):
+        """Gets state of tenant, creating it. Lock must already be held"""
+        try:
+            return self._tenants[tenant]
+        except KeyError:
+            state = self._tenants[tenant] = _Tenant(tenant, self.weight,
+                                                    self.maxlen)
+            return state
+
+    def insert(self, tenant, item, priority):
+        """Adds item with priority to the DEPQ of tenant. If that is at
+        the tenant's maxlen its lowest priority item is dropped.
+        Performance: O(log T) if tenant had no work, plus the insert"""
+
+        with self.lock:
+
+            state = self._tenant(tenant)
+            depq = state.depq
+            if depq is None:
+                depq = state.depq = DEPQ(maxlen=state.maxlen)
+
+            before = len(depq)
+            depq.insert(item, priority)
+            state.inserted += 1
+
+            if len(depq) == before:
+                state.dropped += 1
+                if not before:
+                    # maxlen of 0, it never got work to be scheduled for
+                    state.depq = None
+                return
+
+            self._length += 1
+            if not before:
+                self._activate(state)
+
+    def _activate(self, state):
+        """Schedules a tenant that just got work. Lock must be held"""
+
+        start = state.finish
+        if start < self._virtual_time:
+            start = self._virtual_time
+        state.finish = start + 1.0 / state.weight
+        state.sequence = next(self._sequence)
+
+        heappush(self._heap, (state.finish, state.sequence, state))
+        self._active += 1
+
+        # Stale entries of emptied tenants never outnumber live ones
+        if len(self._heap) > 2 * self._active + 64:
+            self._heap = [entry for entry in self._heap
+                          if entry[2].depq is not None and
+                          entry[2].sequence == entry[1]]
+            heapify(self._heap)
+
+    def _head(self):
+        """Gets heap entry of tenant served next, dropping stale ones.
+        Lock must already be held"""
+
+        heap = self._heap
+        while heap:
+            entry = heap[0]
+            state = entry[2]
+            if state.depq is not None and state.sequence == entry[1]:
+                return entry
+            heappop(heap)
+
+        raise IndexError('FairDEPQ is empty')
+
+    def popfirst(self):
+        """Removes the highest priority item of the tenant whose turn it
+        is. Returns tuple(tenant, item, priority). Performance: O(log T)
+        for T tenants with work"""
+
+        with self.lock:
+
+            entry = self._head()
+            state = entry[2]
+            item, priority = state.depq.popfirst()
+            state.popped += 1
+            self._length -= 1
+            self._virtual_time = entry[0]
+
+            if state.depq:
+                state.finish += 1.0 / state.weight
+                state.sequence = next(self._sequence)
+                heapreplace(self._heap, (state.finish, state.sequence,
+                                         state))
+            else:
+                self._deactivate(state, charged=True)
+                heappop(self._heap)
+
+            return state.name, item, priority
+
+    def _deactivate(self, state, charged=False):
+        """Unschedules tenant once it has no work. Its heap entry turns
+        stale and is skipped later. Unless charged, the turn it was
+        waiting for is refunded. Lock must already be held"""
+        if state.depq is None:
+            return
+        if not charged:
+            state.finish -= 1.0 / state.weight
+        state.depq = None
+        self._active -= 1
+
+    def first(self):
+        """Gets tuple(tenant, item, priority) popfirst would return,
+        without removing it. Performance: O(1) amortized"""
+        with self.lock:
+            state = self._head()[2]
+            item, priority = state.depq[0]
+            return state.name, item, priority
+
+    def poplast(self, tenant):
+        """Removes lowest priority item of tenant. Returns tuple(item,
+        priority). Performance: O(1)"""
+        with self.lock:
+            state = self._tenants.get(tenant)
+            if state is None or state.depq is None:
+                raise IndexError('Tenant {!r} is empty'.format(tenant))
+            pair = state.depq.poplast()
+            self._removed(state, 1)
+            return pair
+
+    def remove(self, tenant, item, count=1):
+        """Removes occurrences of item from DEPQ of tenant, like
+        DEPQ.remove. Returns a list of tuple(item, priority)"""
+        with self.lock:
+            state = self._tenants.get(tenant)
+            if state is None or state.depq is None:
+                return []
+            removed = state.depq.remove(item, count)
+            self._removed(state, len(removed))
+            return removed
+
+    def _removed(self, state, number):
+        """Accounts for items taken out of turn. Lock must be held"""
+        state.popped += number
+        self._length -= number
+        if not state.depq:
+            self._deactivate(state)
+
+    def size(self, tenant=None):
+        """Gets number of items of tenant, or of all tenants. Performance:
+        O(1)"""
+        if tenant is None:
+            return self._length
+        state = self._tenants.get(tenant)
+        if state is None or state.depq is None:
+            return 0
+        return len(state.depq)
+
+    def tenants(self):
+        """Gets list of known tenants"""
+        with self.lock:
+            return list(self._tenants)
+
+    def stats(self, tenant):
+        """Gets dict of weight, maxlen, size and the number of items
+        inserted, popped and dropped by maxlen for tenant. Raises
+        KeyError if tenant is unknown"""
+        with self.lock:
+            try:
+                state = self._tenants[tenant]
+            except KeyError as ex:
+                ex.args = ('Unknown tenant {!r}'.format(tenant),)
+                raise
+            return {
+                'weight': state.weight,
+                'maxlen': state.maxlen,
+                'size': 0 if state.depq is None else len(state.depq),
+                'inserted': state.inserted,
+                'popped': state.popped,
+                'dropped': state.dropped,
+            }
+
+    def remove_tenant(self, tenant):
+        """Forgets tenant with its items and stats. Returns list of
+        tuple(item, priority) it still had"""
+        with self.lock:
+            state = self._tenants.pop(tenant)
+            if state.depq is None:
+                return []
+            pairs = list(state.depq)
+            self._length -= len(pairs)
+            self._deactivate(state)
+            return pairs
+
+    def is_empty(self):
+        return self._length == 0
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return 'FairDEPQ(tenants={}, size={})'.format(len(self._tenants),
+                                                      self._length)
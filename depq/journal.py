@@ -0,0 +1,389 @@
+import os
+import pickle
+import struct
+from threading import Event, Lock, Thread
+
+from depq.depq import DEPQ
+
+# Every record is its pickled length followed by the pickled tuple
+_HEADER = struct.Struct('<I')
+
+# Python 2.7 has no os.replace, rename replaces atomically on POSIX
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _replay_insert(depq, record):
+    depq.insert(record[1], record[2])
+
+
+def _replay_insert_many(depq, record):
+    depq.insert_many(record[1])
+
+
+def _replay_addfirst(depq, record):
+    depq.addfirst(record[1], record[2])
+
+
+def _replay_addlast(depq, record):
+    depq.addlast(record[1], record[2])
+
+
+def _replay_popfirst(depq, record):
+    depq.popfirst()
+
+
+def _replay_poplast(depq, record):
+    depq.poplast()
+
+
+def _replay_remove(depq, record):
+    depq.remove(record[1], record[2])
+
+
+def _replay_reprioritize(depq, record):
+    # New priorities were logged in the order items had before
+    priorities = iter(record[1])
+    depq.reprioritize(lambda item, priority: next(priorities), record[2])
+
+
+def _replay_clear(depq, record):
+    depq.clear()
+
+
+def _replay_set_maxlen(depq, record):
+    depq.set_maxlen(record[1])
+
+
+_REPLAY = {
+    'i': _replay_insert,
+    'n': _replay_insert_many,
+    'f': _replay_addfirst,
+    'l': _replay_addlast,
+    'p': _replay_popfirst,
+    'q': _replay_poplast,
+    'r': _replay_remove,
+    'a': _replay_reprioritize,
+    'c': _replay_clear,
+    'm': _replay_set_maxlen,
+}
+
+
+class Journal(object):
+    """Append-only log of DEPQ operations for crash-safe durability.
+
+    Files live next to path as path.<generation>.snap (a pickled state)
+    and path.<generation>.log (records appended after that snapshot).
+    Logs are unbuffered, so every operation costs one O(1) write() to
+    the kernel and survives a crash of the process as soon as the
+    operation returns. Surviving a crash of the machine takes a fsync,
+    which is batched and done by a background flusher thread, never
+    while DEPQ is locked: it is woken once group_commit records are
+    pending and otherwise runs every sync_interval seconds, so a record
+    is on disk at most sync_interval seconds after it was appended even
+    if DEPQ goes idle. With sync_interval=None only group_commit
+    triggers a fsync and records of an idle DEPQ have no time bound.
+    Passing compact_every makes the journal write a fresh snapshot in a
+    background thread after that many records, which keeps the log
+    tail and thus recovery time short."""
+
+    def __init__(self, path, group_commit=64, sync_interval=1.0,
+                 compact_every=None):
+
+        self.path = os.path.abspath(path)
+        self.group_commit = group_commit
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+        self.depq = None
+        self.generation = 0
+        self.records = 0
+
+        self._file = None
+        self._pending = 0
+        self._lock = Lock()
+        self._sync_lock = Lock()
+        self._compact_lock = Lock()
+        self._compactor = None
+        self._flusher = None
+        self._wake = Event()
+        self._closing = False
+
+    def open(self, **options):
+        """Recovers DEPQ from the latest snapshot plus the log tail and
+        attaches this journal to it. options such as maxlen, key or
+        backend are passed to DEPQ when there is no snapshot yet; a key
+        must be picklable to be snapshot. Performance: O(n + log length)"""
+
+        if self.depq is not None:
+            raise ValueError('Journal is already open.')
+
+        snapshots, logs = self._generations()
+
+        if snapshots:
+            generation = snapshots[-1]
+            with open(self._snapshot_path(generation), 'rb') as f:
+                cls, state = pickle.load(f)
+            depq = cls.__new__(cls)
+            depq.__setstate__(state)
+        else:
+            generation = 0
+            depq = DEPQ(**options)
+
+        for log_generation in logs:
+            if log_generation >= generation:
+                self._replay(depq, self._log_path(log_generation))
+
+        self.generation = max(snapshots + logs + [generation])
+        self.depq = depq
+
+        # A fresh generation drops any torn record at the end of the
+        # old log so new records never follow garbage
+        try:
+            self._compact()
+        except Exception:
+            self._abort_open()
+            raise
+
+        if self.group_commit or self.sync_interval is not None:
+            self._closing = False
+            self._wake.clear()
+            self._flusher = Thread(target=self._flush_loop)
+            self._flusher.daemon = True
+            self._flusher.start()
+
+        depq.journal = self
+        return depq
+
+    def append(self, record):
+        """Appends record of a single operation with one write() to
+        the log. Called by DEPQ while its lock is held, so records are
+        in the same order as operations. Never waits for a fsync."""
+
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            data = _HEADER.pack(len(payload)) + payload
+            written = self._file.write(data)
+            # Raw files may write short, e.g. when interrupted
+            while written < len(data):
+                data = data[written:]
+                written = self._file.write(data)
+            self.records += 1
+            self._pending += 1
+
+            group_commit = self.group_commit
+            if group_commit and self._pending >= group_commit:
+                self._wake.set()
+
+        compact_every = self.compact_every
+        if (compact_every and self.records >= compact_every and
+                self._compactor is None):
+            self._compactor = Thread(target=self._background_compact)
+            self._compactor.daemon = True
+            self._compactor.start()
+
+    def sync(self):
+        """Fsyncs every pending record"""
+        self._sync()
+
+    def compact(self):
+        """Writes a snapshot of attached DEPQ, starts a new log and
+        deletes files of older generations."""
+        if self.depq is None:
+            raise ValueError('Journal is not open.')
+        self._compact()
+
+    def close(self):
+        """Syncs pending records and detaches journal from DEPQ"""
+
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+        depq = self.depq
+        if depq is not None:
+            with depq.lock:
+                depq.journal = None
+            self.depq = None
+
+        flusher = self._flusher
+        if flusher is not None:
+            self._closing = True
+            self._wake.set()
+            flusher.join()
+            self._flusher = None
+
+        with self._sync_lock:
+            with self._lock:
+                if self._file is not None:
+                    os.fsync(self._file.fileno())
+                    self._file.close()
+                    self._file = None
+                    self._pending = 0
+
+    def _flush_loop(self):
+        wake = self._wake
+        while not self._closing:
+            wake.wait(self.sync_interval)
+            wake.clear()
+            self._sync()
+
+    def _sync(self):
+        """Takes the log and pending count under journal lock, which
+        appends also take, then fsyncs outside of it so neither appends
+        nor the DEPQ lock wait for the disk"""
+
+        with self._sync_lock:
+
+            with self._lock:
+                if self._file is None or not self._pending:
+                    return
+                fd = self._file.fileno()
+                self._pending = 0
+
+            # Log switches close old files only under the sync lock, so
+            # fd stays valid
+            os.fsync(fd)
+
+    def _abort_open(self):
+        """Undoes a failed open, leaving no file of a new generation"""
+
+        self.depq = None
+
+        with self._sync_lock:
+            with self._lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+
+        generation = self.generation
+        for path in (self._log_path(generation),
+                     self._snapshot_path(generation) + '.tmp'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.generation = generation - 1
+
+    def _background_compact(self):
+        try:
+            self._compact()
+        finally:
+            self._compactor = None
+
+    def _compact(self):
+
+        with self._compact_lock:
+
+            depq = self.depq
+
+            # Freezing is O(1) so the snapshot is serialized outside of
+            # lock, while writes meanwhile copy only what they change
+            with depq.lock:
+                snapshot = depq._snapshot()
+
+                with self._lock:
+                    self.generation += 1
+                    generation = self.generation
+                    old_file = self._open_log(generation)
+
+            if old_file is not None:
+                with self._sync_lock:
+                    os.fsync(old_file.fileno())
+                    old_file.close()
+
+            path = self._snapshot_path(generation)
+            temp_path = path + '.tmp'
+            try:
+                with snapshot, open(temp_path, 'wb') as f:
+                    pickle.dump((type(depq), snapshot.state), f,
+                                pickle.HIGHEST_PROTOCOL)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            _replace(temp_path, path)
+            self._sync_directory()
+
+            snapshots, logs = self._generations()
+            for old in snapshots:
+                if old < generation:
+                    os.remove(self._snapshot_path(old))
+            for old in logs:
+                if old < generation:
+                    os.remove(self._log_path(old))
+
+    def _open_log(self, generation):
+        """Switches appends to a new log and returns the old file, not
+        yet synced. Journal lock must be held"""
+        old_file = self._file
+        # Unbuffered: a record must reach the kernel before the DEPQ
+        # lock is released, not when a userspace buffer fills
+        self._file = open(self._log_path(generation), 'ab', 0)
+        self._pending = 0
+        self.records = 0
+        return old_file
+
+    def _sync_directory(self):
+        try:
+            fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        except OSError:  # pragma: no cover
+            return
+        try:
+            os.fsync(fd)
+        except OSError:  # pragma: no cover
+            pass
+        finally:
+            os.close(fd)
+
+    def _snapshot_path(self, generation):
+        return '{}.{}.snap'.format(self.path, generation)
+
+    def _log_path(self, generation):
+        return '{}.{}.log'.format(self.path, generation)
+
+    def _generations(self):
+        """Returns sorted generation numbers of snapshots and logs"""
+
+        directory, prefix = os.path.split(self.path)
+        prefix += '.'
+        snapshots = []
+        logs = []
+
+        for name in os.listdir(directory):
+            if not name.startswith(prefix):
+                continue
+            generation, _, suffix = name[len(prefix):].partition('.')
+            if not generation.isdigit():
+                continue
+            if suffix == 'snap':
+                snapshots.append(int(generation))
+            elif suffix == 'log':
+                logs.append(int(generation))
+
+        return sorted(snapshots), sorted(logs)
+
+    @staticmethod
+    def _replay(depq, path):
+        """Applies every complete record of log, stopping at a torn tail"""
+
+        header_size = _HEADER.size
+
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    break
+
+                size, = _HEADER.unpack(header)
+                payload = f.read(size)
+                if len(payload) < size:
+                    break
+
+                try:
+                    record = pickle.loads(payload)
+                except Exception:
+                    break
+
+                _REPLAY[record[0]](depq, record)
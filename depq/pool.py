@@ -0,0 +1,215 @@
+import os
+from concurrent.futures import Executor, Future
+from random import randrange
+from threading import Lock, Semaphore, Thread, local
+
+from depq.depq import DEPQ
+
+
+class _Task(object):
+    """Queued call. Hashed by identity, so DEPQ counts it in O(1)
+    however unhashable its arguments are or how its Future changes"""
+
+    __slots__ = ('future', 'fn', 'args', 'kwargs')
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+class WorkStealingExecutor(Executor):
+    """Executor running submit(fn, priority, *args, **kwargs) calls in
+    priority order on max_workers threads, each owning a DEPQ.
+
+    Work submitted by a worker thread goes to its own DEPQ, otherwise
+    DEPQs are filled round-robin. A worker takes its most important
+    task with popfirst() and only when its DEPQ is empty steals the
+    least important task of another worker with poplast(), so owners
+    and thieves work at opposite ends and a busy owner's best work is
+    never taken away. Priority is thus per worker, not global: use a
+    single DEPQ when strict global order matters more than throughput.
+
+    A semaphore counts queued tasks, so idle workers block instead of
+    spinning and a worker holding a permit always finds a task."""
+
+    def __init__(self, max_workers=None):
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers <= 0:
+            raise ValueError('max_workers must be > 0')
+
+        self.max_workers = max_workers
+        self._queues = [DEPQ() for _ in range(max_workers)]
+        self._steals = [0] * max_workers
+        self._tasks = Semaphore(0)
+        self._local = local()
+        self._next = 0
+        self._shutdown = False
+        self._shutdown_lock = Lock()
+        self._start()
+
+    def _start(self):
+        self._workers = []
+        for i in range(self.max_workers):
+            worker = Thread(target=self._work, args=(i,))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn, priority=0, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) with given priority and returns
+        a Future. Performance: O(log n) for n tasks queued on one worker"""
+
+        future = Future()
+
+        # Owner fast path: a worker keeps the work it spawns
+        index = getattr(self._local, 'index', None)
+
+        with self._shutdown_lock:
+
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after '
+                                   'shutdown')
+
+            if index is None:
+                index = self._next
+                self._next = (index + 1) % self.max_workers
+
+            self._queues[index].insert(_Task(future, fn, args, kwargs),
+                                       priority)
+            self._tasks.release()
+
+        return future
+
+    def map(self, fn, *iterables, **kwargs):
+        """Like Executor.map with every call at priority 0"""
+
+        timeout = kwargs.get('timeout')
+        futures = [self.submit(fn, 0, *args) for args in zip(*iterables)]
+
+        def results():
+            try:
+                for future in futures:
+                    yield future.result(timeout)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return results()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """Stops accepting work. Queued tasks still run unless
+        cancel_futures is True"""
+
+        with self._shutdown_lock:
+            stopping = not self._shutdown
+            self._shutdown = True
+
+        if stopping:
+
+            if cancel_futures:
+                for queue in self._queues:
+                    while True:
+                        try:
+                            task = queue.poplast()[0]
+                        except IndexError:
+                            break
+                        task.future.cancel()
+
+            # One extra permit per worker, taken once queues are empty
+            for _ in range(self.max_workers):
+                self._tasks.release()
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _run(self, index, fn, args, kwargs):
+        return fn(*args, **kwargs)
+
+    @property
+    def steals(self):
+        """Number of tasks taken from another worker's DEPQ"""
+        return sum(self._steals)
+
+    def _take(self, index):
+        """Gets a task for worker index, own work first"""
+
+        try:
+            return self._queues[index].popfirst()[0]
+        except IndexError:
+            pass
+
+        queues = self._queues
+        count = len(queues)
+        start = randrange(count)
+
+        for i in range(count):
+            victim = (start + i) % count
+            if victim == index:
+                continue
+            try:
+                task = queues[victim].poplast()[0]
+            except IndexError:
+                continue
+            self._steals[index] += 1
+            return task
+
+        return None
+
+    def _work(self, index):
+
+        self._local.index = index
+        tasks = self._tasks
+
+        while True:
+
+            tasks.acquire()
+
+            # A permit always has a task behind it unless shutting down,
+            # though it may be popped a moment later than it was counted
+            while True:
+                task = self._take(index)
+                if task is not None or self._shutdown:
+                    break
+
+            if task is None:
+                return
+
+            future = task.future
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = self._run(index, task.fn, task.args, task.kwargs)
+            except BaseException as ex:
+                future.set_exception(ex)
+            else:
+                future.set_result(result)
+
+
+class ProcessWorkStealingExecutor(WorkStealingExecutor):
+    """WorkStealingExecutor whose workers run tasks in processes. The
+    DEPQs and stealing stay in this process: each worker thread feeds
+    its own single process, so CPU bound tasks scale with cores. fn and
+    arguments must be picklable, and tasks can't submit more work."""
+
+    def _start(self):
+        # Only this variant needs multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self._processes = [ProcessPoolExecutor(1)
+                           for _ in range(self.max_workers)]
+        WorkStealingExecutor._start(self)
+
+    def _run(self, index, fn, args, kwargs):
+        return self._processes[index].submit(fn, *args, **kwargs).result()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        WorkStealingExecutor.shutdown(self, wait, cancel_futures)
+        if wait:
+            for process in self._processes:
+                process.shutdown()
+
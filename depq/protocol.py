@@ -0,0 +1,121 @@
+import struct
+
+# Every frame is a header followed by one encoded value. Requests carry
+# an opcode and a tuple(queue name, *arguments), responses a status and
+# the result. Request ids let a client check that the pipelined
+# responses come back in the order it sent the requests.
+HEADER = struct.Struct('<IIB')
+
+# Frames larger than this are taken for garbage and close the connection
+MAX_PAYLOAD = 1 << 26
+
+(INSERT, INSERT_MANY, POPFIRST, POPLAST, POPFIRST_N, POPLAST_N, FIRST,
+ LAST, HIGH, LOW, SIZE, REMOVE, COUNT, CLEAR) = range(1, 15)
+
+OK = 0
+ERROR = 1
+
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_SIZE = struct.Struct('<I')
+
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+class ProtocolError(Exception):
+    """Raised for malformed frames or responses out of order"""
+
+
+def pack(request_id, code, value):
+    """Gets a frame with header and encoded value"""
+    out = []
+    encode(value, out)
+    payload = b''.join(out)
+    return HEADER.pack(len(payload), request_id, code) + payload
+
+
+def encode(value, out):
+    """Appends the encoding of value to list out. Only None, bools,
+    ints, floats, str, bytes, tuples and lists of them are encoded,
+    unlike pickle, so decoding data from a peer never runs its code.
+    Every value is a type tag followed by a fixed size or size prefixed
+    body."""
+
+    kind = type(value)
+
+    if kind is str:
+        data = value.encode('utf-8')
+        out.append(b's' + _SIZE.pack(len(data)))
+        out.append(data)
+    elif kind is int:
+        if _INT_MIN <= value <= _INT_MAX:
+            out.append(b'i' + _INT.pack(value))
+        else:
+            data = value.to_bytes((value.bit_length() + 8) // 8, 'little',
+                                  signed=True)
+            out.append(b'I' + _SIZE.pack(len(data)))
+            out.append(data)
+    elif kind is float:
+        out.append(b'd' + _FLOAT.pack(value))
+    elif kind is tuple or kind is list:
+        out.append((b't' if kind is tuple else b'l') +
+                   _SIZE.pack(len(value)))
+        for element in value:
+            encode(element, out)
+    elif value is None:
+        out.append(b'N')
+    elif kind is bool:
+        out.append(b'T' if value else b'F')
+    elif kind is bytes:
+        out.append(b'b' + _SIZE.pack(len(value)))
+        out.append(value)
+    else:
+        raise TypeError('Cannot encode {!r}'.format(value))
+
+
+def decode(data, offset=0):
+    """Decodes value at offset of bytes-like data. Returns tuple(value,
+    offset after it)"""
+
+    try:
+        tag = data[offset:offset + 1]
+        offset += 1
+
+        if tag == b'i':
+            return _INT.unpack_from(data, offset)[0], offset + 8
+        if tag == b'd':
+            return _FLOAT.unpack_from(data, offset)[0], offset + 8
+        if tag == b'N':
+            return None, offset
+        if tag == b'T':
+            return True, offset
+        if tag == b'F':
+            return False, offset
+
+        size = _SIZE.unpack_from(data, offset)[0]
+        offset += 4
+
+        if tag == b't' or tag == b'l':
+            value = []
+            for _ in range(size):
+                element, offset = decode(data, offset)
+                value.append(element)
+            return (tuple(value) if tag == b't' else value), offset
+
+        end = offset + size
+        if end > len(data):
+            raise ProtocolError('Truncated value')
+        chunk = bytes(data[offset:end])
+
+        if tag == b's':
+            return chunk.decode('utf-8'), end
+        if tag == b'b':
+            return chunk, end
+        if tag == b'I':
+            return int.from_bytes(chunk, 'little', signed=True), end
+
+    except (struct.error, UnicodeDecodeError, RecursionError) as ex:
+        raise ProtocolError(str(ex))
+
+    raise ProtocolError('Unknown type tag {!r}'.format(tag))
@@ -0,0 +1,137 @@
+from depq.depq import DEPQ
+
+
+def _path(parents, state):
+    """Follows parents back from state to the start"""
+    path = []
+    while state is not None:
+        path.append(state)
+        state = parents[state]
+    path.reverse()
+    return path
+
+
+def beam_search(start, expand, score, width, goal=None, steps=None):
+    """Keeps the width best states of each level, scored by score(state)
+    with higher being better, and expands them with expand(state), an
+    iterable of child states, until no new states are found, steps
+    levels have been expanded or goal(state) is true for the best state
+    of a level. Children of every state go to a DEPQ(maxlen=width) with
+    insert_many, so once the beam is full a child not better than its
+    worst member is rejected in O(1). States must be hashable; a state
+    already on an earlier beam or on the next one is never added again.
+    Returns the last beam as a list of tuple(state, score), best first.
+    Performance: O(w + c log c) per expanded state with c children"""
+
+    beam = [(start, score(start))]
+    visited = set([start])
+    step = 0
+
+    while steps is None or step < steps:
+
+        if goal is not None and goal(beam[0][0]):
+            break
+
+        candidates = DEPQ(maxlen=width)
+        # Children of this level, also ones the full beam rejected, as a
+        # child is often reached from several states or twice from one
+        seen = set()
+
+        for state, _ in beam:
+            children = []
+            for child in expand(state):
+                if child not in visited and child not in seen:
+                    seen.add(child)
+                    children.append((child, score(child)))
+            candidates.insert_many(children)
+
+        if not candidates:
+            break
+
+        beam = list(candidates)
+        visited.update(state for state, _ in beam)
+        step += 1
+
+    return beam
+
+
+def best_first(start, expand, score, goal, maxlen=None, limit=None):
+    """Greedy best-first search always expanding the state with highest
+    score(state) until goal(state) is true. With maxlen the frontier is
+    bounded, evicting its lowest scores, which makes the search
+    incomplete but caps memory. As a bounded frontier over an infinite
+    graph may never run out, limit caps the number of states expanded.
+    States must be hashable and are added at most once. Returns the
+    list of states from start to goal, or None if the frontier runs out
+    or limit is reached. Performance: O(f + c log c) per expanded state
+    with f frontier states and c children"""
+
+    frontier = DEPQ(maxlen=maxlen)
+    frontier.insert(start, score(start))
+    parents = {start: None}
+    expanded = 0
+
+    while frontier:
+
+        state, _ = frontier.popfirst()
+        if goal(state):
+            return _path(parents, state)
+
+        if limit is not None and expanded >= limit:
+            break
+        expanded += 1
+
+        children = []
+        for child in expand(state):
+            if child not in parents:
+                parents[child] = state
+                children.append((child, score(child)))
+        frontier.insert_many(children)
+
+    return None
+
+
+def astar(start, neighbors, heuristic, goal, maxlen=None):
+    """A* search for the cheapest path to a state for which goal(state)
+    is true. neighbors(state) is an iterable of tuple(state, step cost)
+    and heuristic(state) must be a consistent estimate of the remaining
+    cost. Priorities are negated costs, so popfirst() yields the lowest
+    cost and a frontier bounded by maxlen evicts the highest. States
+    must be hashable. Returns tuple(path, cost), or None if there is no
+    path. Performance: O(f + c log c) per expanded state with f
+    frontier states and c neighbors"""
+
+    frontier = DEPQ(maxlen=maxlen)
+    frontier.insert(start, -heuristic(start))
+    costs = {start: 0}
+    parents = {start: None}
+    closed = set()
+
+    while frontier:
+
+        state, _ = frontier.popfirst()
+
+        # Outdated entry of a state later reached more cheaply
+        if state in closed:
+            continue
+
+        if goal(state):
+            return _path(parents, state), costs[state]
+
+        closed.add(state)
+        cost = costs[state]
+        children = []
+
+        for child, step_cost in neighbors(state):
+            child_cost = cost + step_cost
+            if child in closed:
+                continue
+            if child in costs and costs[child] <= child_cost:
+                continue
+            costs[child] = child_cost
+            parents[child] = state
+            children.append((child, -(child_cost + heuristic(child))))
+
+        frontier.insert_many(children)
+
+    return None
@@ -0,0 +1,176 @@
+import asyncio
+from functools import partial
+
+from depq import protocol
+from depq.depq import DEPQ
+from depq.protocol import (ERROR, HEADER, MAX_PAYLOAD, OK, ProtocolError,
+                           decode, pack)
+
+
+def _pop_n(pop, n):
+    pairs = []
+    for _ in range(n):
+        try:
+            pairs.append(pop())
+        except IndexError:
+            break
+    return pairs
+
+
+_HANDLERS = {
+    protocol.INSERT: lambda depq, item, priority: depq.insert(item, priority),
+    protocol.INSERT_MANY: lambda depq, pairs: depq.insert_many(pairs),
+    protocol.POPFIRST: lambda depq: depq.popfirst(),
+    protocol.POPLAST: lambda depq: depq.poplast(),
+    protocol.POPFIRST_N: lambda depq, n: _pop_n(depq.popfirst, n),
+    protocol.POPLAST_N: lambda depq, n: _pop_n(depq.poplast, n),
+    protocol.FIRST: lambda depq: depq.first(),
+    protocol.LAST: lambda depq: depq.last(),
+    protocol.HIGH: lambda depq: depq.high(),
+    protocol.LOW: lambda depq: depq.low(),
+    protocol.SIZE: lambda depq: len(depq),
+    protocol.REMOVE: lambda depq, item, count: depq.remove(item, count),
+    protocol.COUNT: lambda depq, item: depq.count(item),
+    protocol.CLEAR: lambda depq: depq.clear(),
+}
+
+
+class DEPQServer(object):
+    """Serves named DEPQs, created by factory() on first use, to
+    depq.client over a Unix or TCP socket.
+
+    Frames are described in depq.protocol. Clients may pipeline: every
+    complete request of a received chunk is handled in order and all
+    responses go out in a single write. Handling runs on the event
+    loop thread, so each request is atomic with respect to all others
+    and popfirst_n(n) pops its n items without interleaving. An error
+    such as popping an empty DEPQ is sent back and raised by the
+    client; a malformed frame closes the connection."""
+
+    def __init__(self, factory=DEPQ):
+        self.factory = factory
+        self.queues = {}
+
+    def queue(self, name):
+        """Gets DEPQ called name, creating it if needed"""
+        try:
+            return self.queues[name]
+        except KeyError:
+            depq = self.queues[name] = self.factory()
+            return depq
+
+    def handle(self, request_id, code, payload):
+        """Runs one request and returns the response frame"""
+
+        try:
+            args, _ = decode(payload)
+            handler = _HANDLERS[code]
+        except (ProtocolError, KeyError):
+            raise ProtocolError('Malformed request')
+
+        try:
+            result = handler(self.queue(args[0]), *args[1:])
+            return pack(request_id, OK, result)
+        except Exception as ex:
+            return pack(request_id, ERROR,
+                        (type(ex).__name__, ' '.join(map(str, ex.args))))
+
+    async def start(self, address):
+        """Starts serving on address, a path for a Unix socket or a
+        tuple(host, port) for TCP, and returns the asyncio.Server"""
+
+        loop = asyncio.get_running_loop()
+        factory = partial(_Connection, self)
+
+        if isinstance(address, str):
+            return await loop.create_unix_server(factory, address)
+        return await loop.create_server(factory, *address)
+
+    def serve_forever(self, address):
+        """Runs an event loop serving address until interrupted"""
+
+        async def serve():
+            server = await self.start(address)
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(serve())
+
+
+class _Connection(asyncio.Protocol):
+
+    def __init__(self, server):
+        self.server = server
+        self.buffer = bytearray()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+
+        buffer = self.buffer
+        buffer += data
+        handle = self.server.handle
+        header_size = HEADER.size
+        responses = []
+        offset = 0
+
+        malformed = False
+
+        try:
+            while len(buffer) - offset >= header_size:
+                size, request_id, code = HEADER.unpack_from(buffer, offset)
+                if size > MAX_PAYLOAD:
+                    raise ProtocolError('Frame too large')
+                start = offset + header_size
+                end = start + size
+                if len(buffer) < end:
+                    break
+                responses.append(handle(request_id, code,
+                                        bytes(buffer[start:end])))
+                offset = end
+        except ProtocolError:
+            malformed = True
+
+        # Answers to the valid requests before a bad one still go out
+        if responses:
+            self.transport.write(b''.join(responses))
+
+        if malformed:
+            self.transport.close()
+        else:
+            del buffer[:offset]
+
+    def pause_writing(self):
+        # A client pipelining without reading must not grow our buffers
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m depq.server', description='Serves named DEPQs.'
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--unix', metavar='PATH', help='Unix socket path')
+    group.add_argument('--tcp', metavar='HOST:PORT', help='TCP address')
+    args = parser.parse_args(argv)
+
+    if args.unix is not None:
+        address = args.unix
+    else:
+        host, _, port = args.tcp.rpartition(':')
+        address = (host or None, int(port))
+
+    try:
+        DEPQServer().serve_forever(address)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
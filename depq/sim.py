@@ -0,0 +1,143 @@
+from bisect import insort
+from heapq import heappop, heappush
+from itertools import count
+
+
+class Event(object):
+    """Scheduled callback returned by Simulator.schedule"""
+
+    __slots__ = ('time', 'callback', 'args', 'cancelled', 'done')
+
+    def __init__(self, time, callback, args):
+        self.time = time
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.done = False
+
+    def __repr__(self):
+        return 'Event({!r}, {!r})'.format(self.time, self.callback)
+
+
+class Simulator(object):
+    """Discrete event loop built on a calendar queue.
+
+    Time is divided into days of the given width. Events are appended
+    unsorted to the bucket of their day, an O(1) dict lookup, and only
+    days that have events are kept in a small heap. When the loop
+    reaches a day, its whole bucket is sorted once in C and dispatched
+    as a batch, so events scheduled "near now" never pay for a search
+    through the rest of the future. Events at equal times run in the
+    order they were scheduled. Choose width so a day holds a handful of
+    events or more; too small a width only degrades towards a heap.
+
+    Like any simulation clock this is meant to be driven by a single
+    thread and, unlike DEPQ, takes no lock."""
+
+    def __init__(self, start=0, width=1.0):
+
+        if not width > 0:
+            raise ValueError('width must be > 0')
+
+        self.now = start
+        self.width = width
+
+        self._days = {}
+        self._heap = []
+        self._day = start // width
+        self._today = []
+        self._position = 0
+        self._pending = 0
+        self._sequence = count()
+
+    def schedule(self, at, callback, *args):
+        """Schedules callback(*args) to run at time at, which can't be
+        earlier than now. Returns an Event for cancel(). Performance:
+        O(1) unless at opens a new day, then O(log d) for d busy days"""
+
+        if at < self.now:
+            raise ValueError('Cannot schedule event before now.')
+
+        event = Event(at, callback, args)
+        entry = (at, next(self._sequence), event)
+        day = at // self.width
+
+        # Current day is already sorted and partly dispatched
+        if day <= self._day:
+            insort(self._today, entry, self._position)
+        else:
+            try:
+                self._days[day].append(entry)
+            except KeyError:
+                self._days[day] = [entry]
+                heappush(self._heap, day)
+
+        self._pending += 1
+        return event
+
+    def cancel(self, event):
+        """Cancels event so it is skipped when its time comes. Returns
+        False if it already ran or was cancelled. Performance: O(1)"""
+
+        if event.cancelled or event.done:
+            return False
+
+        event.cancelled = True
+        event.callback = event.args = None
+        self._pending -= 1
+        return True
+
+    def run(self, until=None):
+        """Dispatches events in time order until none are left or the
+        next one is later than until, in which case now becomes until.
+        Returns the number of callbacks run. Performance: O(1) amortized
+        per event plus one sort of every day"""
+
+        days = self._days
+        heap = self._heap
+        width = self.width
+        dispatched = 0
+
+        while True:
+
+            today = self._today
+            position = self._position
+
+            if position == len(today):
+                if not heap or (until is not None and
+                                heap[0] * width > until):
+                    break
+
+                day = heappop(heap)
+                today = days.pop(day)
+                today.sort()
+                self._today = today
+                self._position = 0
+                self._day = day
+                continue
+
+            at, _, event = today[position]
+            if until is not None and at > until:
+                break
+
+            self._position = position + 1
+            if event.cancelled:
+                continue
+
+            self.now = at
+            self._pending -= 1
+            event.done = True
+            event.callback(*event.args)
+            dispatched += 1
+
+        if until is not None and until > self.now:
+            self.now = until
+
+        return dispatched
+
+    def __len__(self):
+        return self._pending
+
+    def __repr__(self):
+        return 'Simulator(now={!r}, pending={})'.format(self.now,
+                                                         self._pending)
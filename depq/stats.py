@@ -0,0 +1,188 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class RankIndex(object):
+    """Multiset of the sort keys of a DEPQ's entries for order
+    statistics, kept by DEPQ(ranked=True) next to its blocks.
+
+    Keys are stored ascending in blocks of at most 2 * load keys, with
+    the largest key of every block in self._maxes and the block lengths
+    in a Fenwick tree. Finding a block by key is a bisection of maxes
+    and finding one by position a descent of the tree, both O(log n),
+    while adding or discarding a key shifts at most one block in C.
+    A block that overflows is split and an empty one dropped, which
+    rebuilds the tree in O(n / load) but happens at most once per load
+    operations. If DEPQ has a key function, priorities are stored in
+    blocks parallel to their sort keys, since that is what quantiles
+    report."""
+
+    load = 512
+
+    def __init__(self, keyed=False):
+        self.keyed = keyed
+        self.clear()
+
+    def clear(self):
+        self._keys = []
+        self._values = [] if self.keyed else None
+        self._maxes = []
+        self._tree = [0]
+        self._length = 0
+
+    def build(self, entries):
+        """Replaces contents with entries sorted in descending order,
+        like a DEPQ's entries. Performance: O(n)"""
+
+        self.clear()
+        keys = [entry[-1] for entry in entries]
+        keys.reverse()
+        if self.keyed:
+            values = [entry[1] for entry in entries]
+            values.reverse()
+
+        load = self.load
+        for start in range(0, len(keys), load):
+            self._keys.append(keys[start:start + load])
+            if self.keyed:
+                self._values.append(values[start:start + load])
+        self._maxes = [block[-1] for block in self._keys]
+        self._length = len(keys)
+        self._rebuild()
+
+    def add(self, entry):
+        """Adds sort key and priority of entry. Performance: O(log n)"""
+
+        key = entry[-1]
+        blocks = self._keys
+        self._length += 1
+
+        if not blocks:
+            blocks.append([key])
+            if self.keyed:
+                self._values.append([entry[1]])
+            self._maxes.append(key)
+            self._rebuild()
+            return
+
+        maxes = self._maxes
+        b = bisect_right(maxes, key)
+        if b == len(blocks):
+            b -= 1
+            maxes[b] = key
+
+        block = blocks[b]
+        if self.keyed:
+            position = bisect_right(block, key)
+            block.insert(position, key)
+            self._values[b].insert(position, entry[1])
+        else:
+            insort(block, key)
+
+        if len(block) > 2 * self.load:
+            self._split(b)
+        else:
+            self._update(b, 1)
+
+    def discard(self, entry):
+        """Removes sort key and priority of entry, which must have been
+        added. Performance: O(log n)"""
+
+        key = entry[-1]
+        blocks = self._keys
+        b = bisect_left(self._maxes, key)
+        position = bisect_left(blocks[b], key)
+
+        if self.keyed:
+            # Equal sort keys may belong to different priorities
+            value = entry[1]
+            while self._values[b][position] != value:
+                position += 1
+                if position == len(blocks[b]):
+                    b += 1
+                    position = 0
+
+        block = blocks[b]
+        del block[position]
+        if self.keyed:
+            del self._values[b][position]
+        self._length -= 1
+
+        if not block:
+            del blocks[b]
+            del self._maxes[b]
+            if self.keyed:
+                del self._values[b]
+            self._rebuild()
+        else:
+            self._maxes[b] = block[-1]
+            self._update(b, -1)
+
+    def count_at_least(self, key):
+        """Number of keys >= key. Performance: O(log n)"""
+        b = bisect_left(self._maxes, key)
+        if b == len(self._keys):
+            return 0
+        below = self._prefix(b) + bisect_left(self._keys[b], key)
+        return self._length - below
+
+    def value_at(self, position):
+        """Priority at ascending position. Performance: O(log n)"""
+        b, offset = self._find(position)
+        if self.keyed:
+            return self._values[b][offset]
+        return self._keys[b][offset]
+
+    def __len__(self):
+        return self._length
+
+    def _split(self, b):
+        load = self.load
+        for blocks in (self._keys, self._values):
+            if blocks is not None:
+                block = blocks[b]
+                blocks.insert(b + 1, block[load:])
+                del block[load:]
+        self._maxes.insert(b, self._keys[b][-1])
+        self._rebuild()
+
+    def _rebuild(self):
+        """Builds Fenwick tree of block lengths. Performance: O(n / load)"""
+        tree = [0]
+        tree.extend(map(len, self._keys))
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, b, delta):
+        tree = self._tree
+        size = len(tree)
+        i = b + 1
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, b):
+        """Number of keys in blocks before block b"""
+        tree = self._tree
+        total = 0
+        while b:
+            total += tree[b]
+            b -= b & -b
+        return total
+
+    def _find(self, position):
+        """Gets block and offset of ascending position"""
+        tree = self._tree
+        size = len(tree)
+        i = 0
+        step = 1 << (size - 1).bit_length()
+        while step:
+            j = i + step
+            if j < size and tree[j] <= position:
+                i = j
+                position -= tree[j]
+            step >>= 1
+        return i, position
@@ -0,0 +1,85 @@
+"""Cases of test_aio, kept apart as async def is a SyntaxError before
+Python 3.5 and depq.aio needs 3.7"""
+import asyncio
+import unittest
+from depq import DEPQ
+from depq.aio import parallel_drain
+
+
+async def double(item):
+    await asyncio.sleep(0)
+    return item * 2
+
+
+def collect(depq, fn, max_inflight=None, count=None, leftovers=None):
+    async def run():
+        results = []
+        drain = parallel_drain(depq, fn, max_inflight, leftovers)
+        try:
+            async for result in drain:
+                results.append(result)
+                if len(results) == count:
+                    break
+        finally:
+            await drain.aclose()
+        return results
+    return asyncio.run(run())
+
+
+class ParallelDrainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ()
+        for i in range(10):
+            self.depq.insert(i, i)
+
+    def test_drains_every_item(self):
+        results = collect(self.depq, double, 3)
+        self.assertEqual(sorted(results), [(i, i * 2) for i in range(10)])
+        self.assertEqual(len(self.depq), 0)
+
+    def test_priority_order(self):
+        results = collect(self.depq, double, 1)
+        self.assertEqual([item for item, _ in results],
+                         list(range(9, -1, -1)))
+
+    def test_exception(self):
+        async def fail(item):
+            raise KeyError(item)
+
+        leftovers = []
+        with self.assertRaises(KeyError):
+            collect(self.depq, fail, 2, leftovers=leftovers)
+        self.assertEqual(len(leftovers), 1)
+
+    def test_close_puts_items_back(self):
+        async def slow_below_nine(item):
+            if item < 9:
+                await asyncio.sleep(10)
+            return item
+
+        leftovers = []
+        results = collect(self.depq, slow_below_nine, 4, count=1,
+                          leftovers=leftovers)
+        self.assertEqual(results, [(9, 9)])
+        # Cancelled calls never finished, so their items are back
+        self.assertEqual(len(self.depq), 9)
+        self.assertEqual(leftovers, [])
+
+    def test_close_hands_back_finished_calls(self):
+        async def instant(item):
+            return item
+
+        leftovers = []
+        results = collect(self.depq, instant, 4, count=1,
+                          leftovers=leftovers)
+        # Calls not yet yielded already finished, so none is put back
+        self.assertEqual(len(results) + len(leftovers), 4)
+        self.assertEqual(len(self.depq), 6)
+        for item, task in leftovers:
+            self.assertEqual(task.result(), item)
+            self.assertNotIn(item, self.depq)
+
+    def test_invalid_max_inflight_raise_error(self):
+        with self.assertRaises(ValueError):
+            collect(self.depq, double, 0)
@@ -0,0 +1,195 @@
+"""Cases of test_server, kept apart as async def is a SyntaxError before
+Python 3.5 and depq.server needs 3.7"""
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from depq import DEPQ
+from depq.client import Client, ServerError, _error
+from depq.protocol import HEADER, ProtocolError, decode, encode, pack
+from depq.server import DEPQServer
+
+
+def roundtrip(value):
+    out = []
+    encode(value, out)
+    data = b''.join(out)
+    decoded, offset = decode(data)
+    assert offset == len(data)
+    return decoded
+
+
+class ProtocolTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        for value in (None, True, False, 0, -5, 2 ** 63 - 1, -2 ** 63,
+                      2 ** 100, -2 ** 70, 1.5, '', 'ünicode', b'\x00raw',
+                      (), (1, ('a', [2.0, None])), [b'x', (True,)]):
+            self.assertEqual(roundtrip(value), value)
+            self.assertIs(type(roundtrip(value)), type(value))
+
+    def test_unsupported_type_raise_error(self):
+        with self.assertRaises(TypeError):
+            roundtrip({'a': 1})
+
+    def test_malformed_raise_error(self):
+        for data in (b'', b'?', b'i\x00', b's\xff\x00\x00\x00ab',
+                     b't\x01\x00\x00\x00', b'(' * 5000):
+            with self.assertRaises(ProtocolError):
+                decode(data)
+
+
+class ServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'depq.sock')
+        cls.server = DEPQServer(lambda: DEPQ(maxlen=100))
+        cls.loop = asyncio.new_event_loop()
+        cls.unix = cls.loop.run_until_complete(cls.server.start(cls.path))
+        cls.tcp = cls.loop.run_until_complete(
+            cls.server.start(('127.0.0.1', 0))
+        )
+        cls.thread = threading.Thread(target=cls.loop.run_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        async def stop():
+            for server in (cls.unix, cls.tcp):
+                server.close()
+                await server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(stop(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.client = Client(self.path, pool_size=2)
+        self.queue = self.client.queue(self.id())
+
+    def tearDown(self):
+        self.queue.clear()
+        self.client.close()
+
+    def test_operations(self):
+        queue = self.queue
+        self.assertIsNone(queue.insert('a', 1))
+        queue.insert(('b', 2), 5)
+        queue.insert_many([('c', 3), ('d', 0), ('c', 2)])
+        self.assertEqual(queue.size(), 5)
+        self.assertEqual(queue.first(), ('b', 2))
+        self.assertEqual(queue.last(), 'd')
+        self.assertEqual(queue.high(), 5)
+        self.assertEqual(queue.low(), 0)
+        self.assertEqual(queue.count('c'), 2)
+        self.assertEqual(queue.remove('c', -1), [('c', 2), ('c', 3)])
+        self.assertEqual(queue.popfirst(), (('b', 2), 5))
+        self.assertEqual(queue.poplast(), ('d', 0))
+        self.assertEqual(self.server.queues[self.id()].maxlen, 100)
+
+    def test_pop_n(self):
+        self.queue.insert_many((i, i) for i in range(10))
+        self.assertEqual(self.queue.popfirst_n(3), [(9, 9), (8, 8), (7, 7)])
+        self.assertEqual(self.queue.poplast_n(2), [(0, 0), (1, 1)])
+        self.assertEqual(len(self.queue.popfirst_n(100)), 5)
+        self.assertEqual(self.queue.popfirst_n(1), [])
+
+    def test_errors(self):
+        with self.assertRaises(IndexError):
+            self.queue.popfirst()
+        with self.assertRaises(TypeError):
+            self.queue.insert(1, 'mixed')
+            self.queue.insert(2, 0)
+        with self.assertRaises(TypeError):
+            self.queue.insert({'a'}, 1)
+        # Connection is still usable after errors
+        self.assertEqual(self.queue.size(), 1)
+
+    def test_pipeline(self):
+        with self.client.pipeline() as pipeline:
+            queue = pipeline.queue(self.id())
+            for i in range(5):
+                queue.insert(i, i)
+            queue.popfirst()
+        self.assertEqual(self.queue.size(), 4)
+
+        pipeline = self.client.pipeline()
+        queue = pipeline.queue(self.id())
+        queue.popfirst()
+        queue.popfirst_n(10)
+        queue.popfirst()
+        queue.size()
+        results = pipeline.execute(raise_on_error=False)
+        self.assertEqual(results[0], (3, 3))
+        self.assertEqual(len(results[1]), 3)
+        self.assertIsInstance(results[2], IndexError)
+        self.assertEqual(results[3], 0)
+        self.assertEqual(pipeline.execute(), [])
+
+        queue.popfirst()
+        with self.assertRaises(IndexError):
+            pipeline.execute()
+
+    def test_large_pipeline(self):
+        pipeline = self.client.pipeline()
+        queue = pipeline.queue('large')
+        for i in range(20000):
+            queue.insert('x' * 50, i)
+            queue.poplast()
+        self.assertEqual(len(pipeline.execute()), 40000)
+
+    def test_threads_share_pool(self):
+        def work(n):
+            for i in range(50):
+                self.queue.insert((n, i), i)
+
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.queue.size(), 100)
+        self.assertLessEqual(len(self.client._idle), 2)
+
+    def test_tcp(self):
+        address = self.tcp.sockets[0].getsockname()[:2]
+        with Client(address) as client:
+            queue = client.queue(self.id())
+            queue.insert('tcp', 1)
+            self.assertEqual(self.queue.popfirst(), ('tcp', 1))
+
+    def test_malformed_frame_closes_connection(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        try:
+            sock.sendall(pack(0, 2, ('x',)) + HEADER.pack(1, 1, 99) + b'N')
+            data = sock.recv(65536)
+            # Answer to the valid request, then the connection is closed
+            self.assertEqual(HEADER.unpack_from(data)[1], 0)
+            while data:
+                data = sock.recv(65536)
+        finally:
+            sock.close()
+
+    def test_closed_client_raise_error(self):
+        self.client.close()
+        with self.assertRaises(ValueError):
+            self.queue.size()
+        self.client = Client(self.path)
+        self.queue = self.client.queue(self.id())
+
+    def test_server_error(self):
+        server = DEPQServer(lambda: 1 / 0)
+        response = server.handle(7, 3, pack(0, 0, ('q',))[HEADER.size:])
+        value, _ = decode(response, HEADER.size)
+        self.assertEqual(value[0], 'ZeroDivisionError')
+        self.assertIsInstance(_error(value), ServerError)
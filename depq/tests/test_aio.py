@@ -0,0 +1,9 @@
+import sys
+import unittest
+
+# Only imported where they can run, see aio_cases.py
+if sys.version_info >= (3, 7):
+    from depq.tests.aio_cases import ParallelDrainTest
+
+if __name__ == '__main__':
+    unittest.main()
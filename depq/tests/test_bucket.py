@@ -0,0 +1,338 @@
+import json
+import pickle
+import unittest
+from random import Random
+from depq import DEPQ
+from depq.bucket import BucketDEPQ, RadixDEPQ
+
+
+class BackendSelectionTest(unittest.TestCase):
+
+    def test_default_backend(self):
+        self.assertIs(type(DEPQ()), DEPQ)
+
+    def test_bucket_backend(self):
+        depq = DEPQ(backend='bucket', priority_range=(0, 10))
+        self.assertIsInstance(depq, BucketDEPQ)
+        self.assertIsInstance(depq, DEPQ)
+
+    def test_radix_backend(self):
+        self.assertIsInstance(DEPQ(backend='radix'), RadixDEPQ)
+
+    def test_unknown_backend_raise_error(self):
+        with self.assertRaises(ValueError):
+            DEPQ(backend='heap')
+
+    def test_priority_range_requires_integer_backend(self):
+        with self.assertRaises(ValueError):
+            DEPQ(priority_range=(0, 10))
+        with self.assertRaises(ValueError):
+            DEPQ(backend='radix', priority_range=(0, 10))
+
+    def test_bucket_requires_priority_range(self):
+        with self.assertRaises(ValueError):
+            DEPQ(backend='bucket')
+        with self.assertRaises(ValueError):
+            DEPQ(backend='bucket', priority_range=(10, 0))
+
+    def test_key_raise_error(self):
+        with self.assertRaises(ValueError):
+            DEPQ(backend='bucket', priority_range=(0, 10), key=abs)
+
+
+class BucketDEPQTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ(backend='bucket', priority_range=(-5, 20))
+        self.random = Random(7)
+
+    def test_insert_order_matches_deque_backend(self):
+        reference = DEPQ()
+        for i in range(200):
+            priority = self.random.randrange(-5, 21)
+            reference.insert(i, priority)
+            self.depq.insert(i, priority)
+        self.assertEqual(list(self.depq), list(reference))
+        self.assertEqual(self.depq[57], reference[57])
+        self.assertEqual(self.depq[-3], reference[-3])
+
+    def test_to_arrays(self):
+        for i in range(50):
+            self.depq.insert(i, self.random.randrange(-5, 21))
+        items, priorities = self.depq.to_arrays()
+        self.assertEqual(list(zip(items, priorities)), list(self.depq))
+        self.assertEqual(priorities.typecode, 'q')
+
+    def test_random_operations_match_deque_backend(self):
+        reference = DEPQ(maxlen=30)
+        self.depq.set_maxlen(30)
+        for i in range(2000):
+            op = self.random.randrange(6)
+            item = self.random.randrange(10)
+            if op < 3:
+                priority = self.random.randrange(-5, 21)
+                reference.insert(item, priority)
+                self.depq.insert(item, priority)
+            elif op == 3 and reference:
+                self.assertEqual(self.depq.popfirst(), reference.popfirst())
+            elif op == 4 and reference:
+                self.assertEqual(self.depq.poplast(), reference.poplast())
+            else:
+                count = self.random.randrange(-1, 3)
+                self.assertEqual(self.depq.remove(item, count),
+                                 reference.remove(item, count))
+            self.assertEqual(list(self.depq), list(reference))
+            self.assertEqual(self.depq.count(item), reference.count(item))
+            self.assertEqual(len(self.depq), len(reference))
+
+    def test_insert_many(self):
+        self.depq.insert_many([('a', 1), ('b', 3), ('c', 1)])
+        self.assertEqual(list(self.depq), [('b', 3), ('a', 1), ('c', 1)])
+
+    def test_insert_many_same_tuple_twice(self):
+        pair = ('a', 1)
+        self.depq.insert_many([pair, pair])
+        self.assertEqual(self.depq.remove('a'), [pair])
+        self.assertEqual(len(self.depq), 1)
+        self.assertEqual(list(self.depq), [pair])
+
+    def test_insert_many_out_of_range_adds_nothing(self):
+        with self.assertRaises(ValueError):
+            self.depq.insert_many([('a', 1), ('b', 21)])
+        self.assertEqual(len(self.depq), 0)
+
+    def test_batch_matches_deque_backend(self):
+        reference = DEPQ(maxlen=6)
+        self.depq.set_maxlen(6)
+        for _ in range(30):
+            results = []
+            expected = []
+            for depq, out in ((self.depq, results), (reference, expected)):
+                random = Random(len(reference))
+                with depq.batch() as tx:
+                    for i in range(8):
+                        tx.insert(i % 3, random.randrange(-5, 21))
+                        if random.random() < 0.3 and len(tx):
+                            out.append(tx.popfirst())
+                        if random.random() < 0.3 and len(tx):
+                            out.append(tx.poplast())
+                        out.append(tx.remove(random.randrange(3)))
+                        out.append(tx.count(i % 3))
+            self.assertEqual(results, expected)
+            self.assertEqual(list(self.depq), list(reference))
+
+    def test_priority_out_of_range_raise_error(self):
+        with self.assertRaises(ValueError):
+            self.depq.insert(None, 21)
+        with self.assertRaises(ValueError):
+            self.depq.insert(None, -6)
+        with self.assertRaises(TypeError):
+            self.depq.insert(None, 1.5)
+        self.assertEqual(len(self.depq), 0)
+
+    def test_peeks(self):
+        self.depq.insert('low', -5)
+        self.depq.insert('high', 20)
+        self.depq.insert('also high', 20)
+        self.assertEqual(self.depq.first(), 'high')
+        self.assertEqual(self.depq.last(), 'low')
+        self.assertEqual(self.depq.high(), 20)
+        self.assertEqual(self.depq.low(), -5)
+
+    def test_empty_raise_error(self):
+        for method in (self.depq.first, self.depq.last, self.depq.high,
+                       self.depq.low, self.depq.popfirst, self.depq.poplast):
+            with self.assertRaises(IndexError):
+                method()
+        with self.assertRaises(IndexError):
+            self.depq[0]
+
+    def test_addfirst_and_addlast(self):
+        self.depq.addfirst('a')
+        self.depq.insert('b', 3)
+        self.depq.addfirst('c')
+        self.depq.addlast('d')
+        self.depq.addlast('e', -2)
+        with self.assertRaises(ValueError):
+            self.depq.addfirst('f', 2)
+        with self.assertRaises(ValueError):
+            self.depq.addlast('g', 0)
+        self.assertEqual(list(self.depq),
+                         [('c', 3), ('b', 3), ('a', 0), ('d', 0), ('e', -2)])
+
+    def test_maxlen(self):
+        depq = DEPQ(((None, i) for i in range(5)), 4, backend='bucket',
+                    priority_range=(0, 10))
+        self.assertEqual(depq.low(), 1)
+        depq.addlast(None, 0)
+        self.assertEqual(len(depq), 4)
+        depq.addfirst(None, 9)
+        self.assertEqual(depq.low(), 2)
+
+    def test_membership(self):
+        self.depq.insert(['test'], 5)
+        self.depq.insert(['test'], 6)
+        self.assertEqual(['test'] in self.depq, True)
+        self.depq.popfirst()
+        self.assertEqual(self.depq.count(['test']), 1)
+        self.assertEqual(self.depq.count_many([['test'], 'test']), [1, 0])
+        self.depq.clear()
+        self.assertEqual(['test'] in self.depq, False)
+        self.assertEqual(len(self.depq), 0)
+
+    def test_str(self):
+        self.depq.insert(None, 5)
+        self.depq.insert('test', 3)
+        self.assertEqual(str(self.depq), "DEPQ([(None, 5), ('test', 3)])")
+
+    def test_reprioritize(self):
+        for i in range(10):
+            self.depq.insert(i, i)
+        self.depq.reprioritize(lambda item, priority: priority % 3)
+        reference = DEPQ((i, i) for i in range(10))
+        reference.reprioritize(lambda item, priority: priority % 3)
+        self.assertEqual(list(self.depq), list(reference))
+        with self.assertRaises(ValueError):
+            self.depq.reprioritize(lambda item, priority: 100)
+        self.assertEqual(list(self.depq), list(reference))
+
+    def test_snapshot(self):
+        self.depq.insert(None, 1)
+        with self.depq.snapshot() as snapshot:
+            self.depq.insert(None, 2)
+            self.depq.clear()
+            self.assertEqual(list(snapshot), [(None, 1)])
+        self.assertEqual(len(self.depq), 0)
+
+    def test_snapshot_copies_written_buckets_only(self):
+        for i in range(10):
+            self.depq.insert(i, i)
+        buckets = list(self.depq._buckets)
+        with self.depq.snapshot() as snapshot:
+            self.depq.popfirst()
+            self.depq.insert('new', 3)
+            changed = [slot for slot, bucket in enumerate(self.depq._buckets)
+                       if bucket is not buckets[slot]]
+            self.assertEqual(changed,
+                             [self.depq._slot(3), self.depq._slot(9)])
+            self.assertEqual(list(snapshot),
+                             [(i, i) for i in range(9, -1, -1)])
+            self.assertEqual(snapshot.items['new'], 0)
+        self.assertIsNone(self.depq._owned)
+
+    def test_pickle(self):
+        for i in range(5):
+            self.depq.insert([i], i)
+        depq_from_pickle = pickle.loads(pickle.dumps(self.depq))
+        self.assertIsInstance(depq_from_pickle, BucketDEPQ)
+        self.assertEqual(list(depq_from_pickle), list(self.depq))
+        self.assertEqual(depq_from_pickle.items, self.depq.items)
+        self.assertEqual(type(depq_from_pickle.lock).__name__, 'lock')
+
+    def test_json(self):
+        for i in range(5):
+            self.depq.insert([i], i)
+        depq_from_json = DEPQ.from_json(json.dumps(self.depq.to_json()))
+        self.assertIsInstance(depq_from_json, BucketDEPQ)
+        self.assertEqual([(item, priority) for item, priority
+                          in depq_from_json],
+                         [([i], i) for i in range(4, -1, -1)])
+        self.assertEqual(depq_from_json.items, self.depq.items)
+
+
+class RadixDEPQTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ(backend='radix')
+        self.random = Random(11)
+
+    def test_random_operations_match_deque_backend(self):
+        reference = DEPQ()
+        for i in range(3000):
+            op = self.random.randrange(7)
+            item = self.random.randrange(10)
+            if op < 3:
+                priority = self.depq._last + self.random.randrange(300)
+                reference.insert(item, priority)
+                self.depq.insert(item, priority)
+            elif op == 3 and reference:
+                self.assertEqual(self.depq.popfirst(), reference.popfirst())
+            elif op in (4, 5) and reference:
+                self.assertEqual(self.depq.poplast(), reference.poplast())
+            elif op == 6:
+                self.assertEqual(self.depq.remove(item),
+                                 reference.remove(item))
+            self.assertEqual(len(self.depq), len(reference))
+            if reference:
+                self.assertEqual(self.depq.high(), reference.high())
+                self.assertEqual(self.depq.low(), reference.low())
+        self.assertEqual(list(self.depq), list(reference))
+
+    def test_timestamps(self):
+        for timestamp in range(100, 200):
+            self.depq.insert(timestamp, timestamp)
+        popped = [self.depq.poplast()[1] for _ in range(50)]
+        self.assertEqual(popped, list(range(100, 150)))
+        self.depq.insert('now', 150)
+        self.assertEqual(self.depq.last(), 'now')
+
+    def test_non_monotone_raise_error(self):
+        self.depq.insert(None, 10)
+        self.depq.insert(None, 20)
+        self.depq.poplast()
+        with self.assertRaises(ValueError):
+            self.depq.insert(None, 9)
+        with self.assertRaises(ValueError):
+            DEPQ(backend='radix').insert(None, -1)
+
+    def test_peek_keeps_monotone_base(self):
+        self.depq.insert('a', 5)
+        self.depq.insert('b', 8)
+        self.depq.insert('b2', 5)
+        self.assertEqual(self.depq.low(), 5)
+        self.assertEqual(self.depq.last(), 'b2')
+        self.depq.insert('c', 3)
+        self.assertEqual(self.depq.last(), 'c')
+        self.assertEqual(self.depq.poplast(), ('c', 3))
+        self.assertEqual(self.depq.poplast(), ('b2', 5))
+        self.assertEqual(self.depq.last(), 'a')
+        with self.assertRaises(ValueError):
+            self.depq.insert(None, 4)
+
+    def test_clear_resets_monotone_base(self):
+        self.depq.insert(None, 10)
+        self.depq.poplast()
+        self.depq.clear()
+        self.depq.insert(None, 0)
+        self.assertEqual(self.depq.low(), 0)
+
+    def test_equal_priorities_keep_order(self):
+        for item in 'abc':
+            self.depq.insert(item, 5)
+        self.depq.insert('d', 9)
+        self.depq.addfirst('e')
+        self.assertEqual([item for item, _ in self.depq], list('edabc'))
+        self.assertEqual(self.depq.popfirst(), ('e', 9))
+        self.assertEqual(self.depq.poplast(), ('c', 5))
+
+    def test_reprioritize(self):
+        for i in range(10):
+            self.depq.insert(i, i * 10)
+        self.depq.reprioritize(lambda item, priority: 1000 - priority)
+        self.assertEqual(self.depq.low(), 910)
+        self.assertEqual(self.depq.first(), 0)
+        with self.assertRaises(ValueError):
+            self.depq.reprioritize(lambda item, priority: -1)
+
+    def test_pickle(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        self.depq.poplast()
+        self.depq.poplast()
+        depq_from_pickle = pickle.loads(pickle.dumps(self.depq))
+        self.assertEqual(list(depq_from_pickle), list(self.depq))
+        with self.assertRaises(ValueError):
+            depq_from_pickle.insert(None, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+from depq.cache import CacheInfo, PriorityCache, priority_cache
+
+
+class PriorityCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = PriorityCache(3)
+
+    def test_mapping(self):
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+        self.cache['a'] = 3
+        self.assertEqual(self.cache['a'], 3)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(sorted(self.cache), ['a', 'b'])
+        self.assertIn('b', self.cache)
+        del self.cache['b']
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(self.cache.get('b', 0), 0)
+        with self.assertRaises(KeyError):
+            del self.cache['b']
+
+    def test_lfu_evicts_least_used(self):
+        for key in 'abc':
+            self.cache[key] = key
+        self.cache['a']
+        self.cache['a']
+        self.cache['b']
+        self.cache['c']
+        self.cache['c']
+        self.assertEqual(self.cache.victim()[0], 'b')
+        self.cache['d'] = 'd'
+        self.assertEqual(sorted(self.cache), ['a', 'c', 'd'])
+        self.assertEqual(self.cache.score_of('a')[0], 2)
+
+    def test_lfu_ties_evict_least_recent(self):
+        for key in 'abc':
+            self.cache[key] = key
+        self.cache['d'] = 'd'
+        self.assertEqual(sorted(self.cache), ['b', 'c', 'd'])
+
+    def test_lru(self):
+        cache = PriorityCache(2, 'lru')
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a']
+        cache['c'] = 3
+        self.assertEqual(sorted(cache), ['a', 'c'])
+
+    def test_custom_policy(self):
+        cache = PriorityCache(
+            2, lambda key, value, hits, tick: (hits + 1) * len(value)
+        )
+        cache['big'] = 'x' * 10
+        cache['small'] = 'x'
+        cache['small']
+        cache['other'] = 'xx'
+        self.assertEqual(sorted(cache), ['big', 'other'])
+
+    def test_stats(self):
+        self.cache['a'] = 1
+        self.cache['a']
+        self.cache.get('b')
+        self.assertEqual(self.cache.peek('a'), 1)
+        self.assertEqual(self.cache.peek('b', 0), 0)
+        for key in 'bcd':
+            self.cache[key] = key
+        self.assertEqual(self.cache.cache_info(), CacheInfo(1, 1, 1, 3, 3))
+        self.cache.clear()
+        self.assertEqual(self.cache.cache_info(), CacheInfo(0, 0, 0, 3, 0))
+
+    def test_unbounded(self):
+        cache = PriorityCache(None)
+        for i in range(100):
+            cache[i] = i
+        self.assertEqual(len(cache), 100)
+        self.assertEqual(cache.cache_info().evictions, 0)
+
+    def test_invalid_arguments_raise_error(self):
+        with self.assertRaises(ValueError):
+            PriorityCache(0)
+        with self.assertRaises(ValueError):
+            PriorityCache(2, 'random')
+
+
+class PriorityCacheDecoratorTest(unittest.TestCase):
+
+    def test_memoizes(self):
+        calls = []
+
+        @priority_cache(maxsize=2)
+        def square(x, power=2):
+            calls.append(x)
+            return x ** power
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3, power=3), 27)
+        self.assertEqual(calls, [3, 3])
+        self.assertEqual(square.cache_info(), CacheInfo(1, 2, 0, 2, 2))
+        self.assertEqual(square.__name__, 'square')
+        square(4)
+        self.assertEqual(square.cache_info().evictions, 1)
+        # The twice used key survived
+        self.assertIn((3,), square.cache)
+        square.cache_clear()
+        self.assertEqual(len(square.cache), 0)
+
+    def test_typed(self):
+        @priority_cache(typed=True)
+        def identity(x):
+            return x
+
+        identity(1)
+        identity(1.0)
+        self.assertEqual(identity.cache_info().misses, 2)
+
+    def test_without_arguments(self):
+        @priority_cache
+        def fib(n):
+            return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+        self.assertEqual(fib(60), 1548008755920)
+        self.assertEqual(fib.cache_info().maxsize, 128)
+
+if __name__ == '__main__':
+    unittest.main()
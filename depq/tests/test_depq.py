@@ -1,9 +1,15 @@
 import unittest
+from array import array
 import pickle
 import json
-from random import SystemRandom
+from random import Random, SystemRandom
 from depq import DEPQ
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 
 def is_ordered(d):
     try:
@@ -69,6 +75,108 @@ class DEPQTest(unittest.TestCase):
     def test_in_operator_unset_unhashable(self):
         self.assertEqual(['test'] in self.depq, False)
 
+    def test_contains_many(self):
+        self.depq.insert('a', 1)
+        self.depq.insert(['b'], 2)
+        self.assertEqual(self.depq.contains_many(iter(['a', 'c'])),
+                         [True, False])
+        self.assertEqual(self.depq.contains_many(['a', ['b'], ['c'], 'c']),
+                         [True, True, False, False])
+        self.assertEqual(self.depq.contains_many([]), [])
+
+    def test_count_many(self):
+        self.depq.insert('a', 1)
+        self.depq.insert('a', 2)
+        self.depq.insert(['b'], 2)
+        self.assertEqual(self.depq.count_many(['a', 'c']), [2, 0])
+        self.assertEqual(self.depq.count_many(['a', ['b'], ['c']]), [2, 1, 0])
+        self.assertNotIn('c', self.depq.items)
+
+    @unittest.skipUnless(numpy, 'requires NumPy')
+    def test_many_array(self):
+        self.depq.insert('a', 1)
+        contains = self.depq.contains_many(['a', 'c'], array=True)
+        self.assertEqual(contains.dtype, numpy.bool_)
+        self.assertEqual(contains.tolist(), [True, False])
+        counts = self.depq.count_many(['a', 'c'], array=True)
+        self.assertEqual(counts.dtype.kind, 'i')
+        self.assertEqual(counts.tolist(), [1, 0])
+
+    def test_to_arrays(self):
+        self.assertEqual(self.depq.to_arrays(), ([], array('q')))
+        self.depq.insert('a', 1)
+        self.depq.insert(['b'], 3)
+        self.depq.insert('c', 1)
+        items, priorities = self.depq.to_arrays()
+        self.assertEqual(items, [['b'], 'a', 'c'])
+        self.assertEqual(priorities, array('q', [3, 1, 1]))
+        self.assertEqual(memoryview(priorities).format, 'q')
+        self.depq.insert('d', 0.5)
+        self.assertEqual(self.depq.to_arrays()[1].typecode, 'd')
+        depq = DEPQ([('a', 'x'), ('b', 'y')])
+        self.assertEqual(depq.to_arrays(), (['b', 'a'], ['y', 'x']))
+
+    def test_to_arrays_key(self):
+        depq = DEPQ([('a', 2 ** 70), ('b', 1)], key=float)
+        self.assertEqual(depq.to_arrays(), (['a', 'b'], [2 ** 70, 1]))
+
+    def test_to_arrays_keeps_exact_priorities(self):
+        from decimal import Decimal
+        from fractions import Fraction
+        for priorities in ([Decimal('0.1'), 1], [Fraction(1, 3)],
+                           [2 ** 53 + 1, 0.5], [True, 1]):
+            depq = DEPQ((i, p) for i, p in enumerate(priorities))
+            result = depq.to_arrays()[1]
+            self.assertIsInstance(result, list)
+            self.assertEqual(sorted(result), sorted(priorities))
+        depq = DEPQ([('a', 2 ** 53), ('b', 0.5)])
+        self.assertEqual(depq.to_arrays()[1], array('d', [2 ** 53, 0.5]))
+
+    def test_from_arrays(self):
+        self.depq.insert('a', 3)
+        self.depq.insert(['b'], 2)
+        self.depq.insert('a', 2)
+        depq = DEPQ.from_arrays(*self.depq.to_arrays())
+        self.assertEqual(list(depq), list(self.depq))
+        self.assertEqual(depq.count('a'), 2)
+        self.assertEqual(depq.count(['b']), 1)
+        depq.insert('c', 2)
+        depq.popfirst()
+        self.assertEqual(list(depq), [(['b'], 2), ('a', 2), ('c', 2)])
+
+    def test_from_arrays_not_presorted(self):
+        depq = DEPQ.from_arrays('abcd', [1, 3, 1, 2], presorted=False,
+                                maxlen=3)
+        self.assertEqual(list(depq), [('b', 3), ('d', 2), ('a', 1)])
+        self.assertEqual(depq.maxlen, 3)
+        self.assertNotIn('c', depq)
+
+    def test_from_arrays_key_and_unique(self):
+        depq = DEPQ.from_arrays(['a', 'b'], [-1, 2], key=abs, unique=True,
+                                presorted=False)
+        self.assertEqual(list(depq), [('b', 2), ('a', -1)])
+        self.assertEqual(depq.priority_of('a'), -1)
+        depq.insert('a', 5)
+        self.assertEqual(list(depq), [('a', 5), ('b', 2)])
+
+    def test_from_arrays_invalid_raise_error(self):
+        with self.assertRaises(ValueError):
+            DEPQ.from_arrays('ab', [1])
+        with self.assertRaises(ValueError):
+            DEPQ.from_arrays('ab', [1, 2])
+        with self.assertRaises(ValueError):
+            DEPQ.from_arrays('aa', [2, 1], unique=True)
+
+    @unittest.skipUnless(numpy, 'requires NumPy')
+    def test_arrays_numpy(self):
+        self.depq.insert('a', 1)
+        self.depq.insert('b', 2)
+        items, priorities = self.depq.to_arrays(array=True)
+        self.assertEqual(priorities.dtype, numpy.int64)
+        self.assertEqual(priorities.tolist(), [2, 1])
+        depq = DEPQ.from_arrays(numpy.array(items), priorities)
+        self.assertEqual(list(depq), [('b', 2), ('a', 1)])
+
     def test_insert_initial_membership_new_hashable_with_in_operator(self):
         self.depq.insert('test', 7)
         self.assertEqual('test' in self.depq, True)
@@ -493,5 +601,640 @@ class DEPQTest(unittest.TestCase):
         self.assertEqual(self.depq.items, depq_from_json.items)
         self.assertEqual(type(depq_from_json.lock).__name__, 'lock')
 
+    def test_reprioritize_monotonic(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        self.depq.reprioritize(lambda item, priority: priority * 10,
+                               monotonic=True)
+        self.assertEqual(list(self.depq), [(i, i * 10) for i in range(4, -1, -1)])
+        self.assertEqual(self.depq.count(3), 1)
+
+    def test_reprioritize_monotonic_is_checked(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        self.depq.reprioritize(lambda item, priority: -priority,
+                               monotonic=True)
+        self.assertEqual(list(self.depq), [(i, -i) for i in range(5)])
+        self.depq.insert('new', -2)
+        self.assertEqual(self.depq[3], ('new', -2))
+
+    def test_reprioritize_resorts(self):
+        for i in range(10):
+            self.depq.insert(i, i)
+        # Items older than 5 get a bonus that overtakes newer ones
+        self.depq.reprioritize(
+            lambda item, priority: priority + (100 if item < 5 else 0)
+        )
+        self.assertEqual(is_ordered(self.depq), True)
+        self.assertEqual(self.depq.first(), 4)
+        self.assertEqual(self.depq.last(), 5)
+
+    def test_reprioritize_keeps_order_of_ties(self):
+        for item in 'abcd':
+            self.depq.insert(item, ord(item))
+        self.depq.reprioritize(lambda item, priority: 0)
+        self.assertEqual([item for item, _ in self.depq], list('dcba'))
+
+    def test_reprioritize_with_key(self):
+        depq = DEPQ(key=lambda priority: -priority)
+        for i in range(5):
+            depq.insert(i, i)
+        depq.reprioritize(lambda item, priority: -priority)
+        self.assertEqual(list(depq), [(i, -i) for i in range(4, -1, -1)])
+        depq.insert('new', -2)
+        self.assertEqual(depq[3], ('new', -2))
+
+    def test_reprioritize_snapshot_unchanged(self):
+        self.depq.insert(None, 1)
+        with self.depq.snapshot() as snapshot:
+            self.depq.reprioritize(lambda item, priority: 2, monotonic=True)
+            self.assertEqual(list(snapshot), [(None, 1)])
+        self.assertEqual(list(self.depq), [(None, 2)])
+
+    def test_insert_many_matches_insert(self):
+        random = SystemRandom()
+        for maxlen in (None, 0, 1, 7, 30):
+            depq = DEPQ(maxlen=maxlen)
+            reference = DEPQ(maxlen=maxlen)
+            for _ in range(10):
+                pairs = [(random.randrange(100), random.randrange(10))
+                         for _ in range(random.randrange(8))]
+                depq.insert_many(iter(pairs))
+                for pair in pairs:
+                    reference.insert(*pair)
+                self.assertEqual(list(depq), list(reference))
+                self.assertEqual(depq.items, reference.items)
+
+    def test_insert_many_keeps_order_of_ties(self):
+        self.depq.insert('old', 1)
+        self.depq.insert('low', 0)
+        self.depq.insert_many([('a', 1), ('b', 0), ('c', 1), (['d'], 0)])
+        self.assertEqual([item for item, _ in self.depq],
+                         ['old', 'a', 'c', 'low', 'b', ['d']])
+        self.assertEqual(self.depq.count(['d']), 1)
+
+    def test_insert_many_rejects_below_low(self):
+        depq = DEPQ([(None, 5), (None, 3)], maxlen=2)
+        depq.insert_many([('low', 3), ('lower', 1)])
+        self.assertEqual(list(depq), [(None, 5), (None, 3)])
+        self.assertNotIn('low', depq)
+        depq.insert_many([('high', 4), ('low', 3)])
+        self.assertEqual(list(depq), [(None, 5), ('high', 4)])
+        self.assertEqual(depq.count(None), 1)
+
+    def test_insert_many_snapshot_unchanged(self):
+        self.depq.insert(None, 1)
+        with self.depq.snapshot() as snapshot:
+            self.depq.insert_many([('a', 2), ('b', 0)])
+            self.assertEqual(list(snapshot), [(None, 1)])
+        self.assertEqual(len(self.depq), 3)
+
+    def test_insert_many_with_key_and_unique(self):
+        depq = DEPQ(key=lambda priority: -priority)
+        depq.insert_many([('a', 2), ('b', 1), ('c', 3)])
+        self.assertEqual([item for item, _ in depq], ['b', 'a', 'c'])
+        depq = DEPQ(unique=True)
+        depq.insert_many([('a', 2), ('b', 1), ('a', 3)])
+        self.assertEqual(list(depq), [('a', 3), ('b', 1)])
+
+    def test_batch_matches_single_operations(self):
+        random = SystemRandom()
+        for kwargs in ({}, {'key': lambda priority: -priority},
+                       {'unique': True}, {'ranked': True}):
+            depq = DEPQ(**kwargs)
+            reference = DEPQ(**kwargs)
+            for _ in range(20):
+                results = []
+                expected = []
+                with depq.batch() as tx:
+                    for _ in range(random.randrange(12)):
+                        op = random.randrange(5)
+                        item = random.randrange(6)
+                        if op < 2:
+                            priority = random.randrange(4)
+                            tx.insert(item, priority)
+                            reference.insert(item, priority)
+                        elif op == 2 and len(reference):
+                            results.append(tx.popfirst())
+                            expected.append(reference.popfirst())
+                        elif op == 3 and len(reference):
+                            results.append(tx.poplast())
+                            expected.append(reference.poplast())
+                        else:
+                            count = random.choice((-1, 1, 2))
+                            results.append(tx.remove(item, count))
+                            expected.append(reference.remove(item, count))
+                        results.append(tx.count(item))
+                        expected.append(reference.count(item))
+                    self.assertEqual(len(tx), len(reference))
+                self.assertEqual(results, expected)
+                self.assertEqual(list(depq), list(reference))
+                self.assertEqual({k: v for k, v in depq.items.items() if v},
+                                 {k: v for k, v in reference.items.items()
+                                  if v})
+                if kwargs.get('ranked') and reference:
+                    self.assertEqual(depq.median(), reference.median())
+
+    def test_batch_trims_maxlen_once(self):
+        depq = DEPQ([('a', 3), ('b', 1)], maxlen=2)
+        with depq.batch() as tx:
+            tx.insert('c', 2)
+            tx.insert('d', 0)
+            self.assertEqual(len(tx), 4)
+            self.assertEqual(tx.poplast(), ('d', 0))
+            self.assertEqual(tx.remove('c'), [('c', 2)])
+            tx.insert('e', 5)
+        self.assertEqual(list(depq), [('e', 5), ('a', 3)])
+        self.assertEqual(depq.count('b'), 0)
+
+    def test_batch_is_atomic(self):
+        import threading
+        seen = []
+        self.depq.insert('a', 1)
+        with self.depq.batch() as tx:
+            thread = threading.Thread(
+                target=lambda: seen.append(self.depq.popfirst())
+            )
+            thread.start()
+            tx.insert('b', 2)
+            self.assertEqual(tx.popfirst(), ('b', 2))
+            tx.insert('c', 3)
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(seen, [('c', 3)])
+        self.assertEqual(list(self.depq), [('a', 1)])
+
+    def test_batch_applies_on_error_and_snapshot_unchanged(self):
+        self.depq.insert('a', 1)
+        with self.depq.snapshot() as snapshot:
+            with self.assertRaises(KeyError):
+                with self.depq.batch() as tx:
+                    tx.insert('b', 2)
+                    tx.popfirst()
+                    tx.poplast()
+                    raise KeyError
+            self.assertEqual(list(snapshot), [('a', 1)])
+        self.assertEqual(len(self.depq), 0)
+        with self.depq.batch() as tx:
+            with self.assertRaises(IndexError):
+                tx.popfirst()
+            with self.assertRaises(ValueError):
+                tx.remove('a', 'x')
+        self.assertFalse(self.depq.lock.locked())
+
+    def test_snapshot_unchanged_by_mutation(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        snapshot = self.depq.snapshot()
+        self.depq.insert('new', 10)
+        self.depq.popfirst()
+        self.depq.poplast()
+        self.depq.remove(2)
+        self.assertEqual(list(snapshot), [(i, i) for i in range(4, -1, -1)])
+        self.assertEqual(len(snapshot), 5)
+        self.assertEqual(snapshot.items[2], 1)
+        self.assertEqual(list(self.depq), [(4, 4), (3, 3), (1, 1)])
+        self.assertEqual(self.depq.count(2), 0)
+        snapshot.release()
+
+    def test_snapshot_release_avoids_copy(self):
+        self.depq.insert(None, 1)
+        blocks = self.depq._blocks
+        with self.depq.snapshot() as snapshot:
+            self.assertIs(snapshot.state['_blocks'], blocks)
+        self.depq.insert(None, 2)
+        self.assertIs(self.depq._blocks, blocks)
+
+    def test_snapshot_mutation_copies_once(self):
+        self.depq.insert(None, 1)
+        blocks = self.depq._blocks
+        snapshot = self.depq.snapshot()
+        self.depq.insert(None, 2)
+        copied = self.depq._blocks
+        self.assertIsNot(copied, blocks)
+        self.depq.insert(None, 3)
+        self.assertIs(self.depq._blocks, copied)
+        snapshot.release()
+        self.assertEqual(self.depq._frozen, 0)
+
+    def test_snapshot_copies_written_blocks_only(self):
+        self.depq._load = 3
+        for i in range(20):
+            self.depq.insert(i, i)
+        blocks = list(self.depq._blocks)
+        with self.depq.snapshot() as snapshot:
+            self.depq.popfirst()
+            first = self.depq._blocks[0]
+            self.depq.popfirst()
+            self.depq.poplast()
+            self.assertIs(self.depq._blocks[0], first)
+            shared = [block for block in self.depq._blocks
+                      if any(block is old for old in blocks)]
+            self.assertEqual(len(shared), len(blocks) - 2)
+            self.assertEqual(list(snapshot),
+                             [(i, i) for i in range(19, -1, -1)])
+            self.assertEqual(snapshot.items[19], 1)
+            self.assertEqual(self.depq.count(19), 0)
+        self.assertEqual(self.depq._frozen, 0)
+        self.assertIsNone(self.depq._owned)
+        self.assertEqual(list(self.depq), [(i, i) for i in range(17, 0, -1)])
+
+    def test_snapshots_overlap(self):
+        self.depq._load = 2
+        for i in range(10):
+            self.depq.insert(i, i)
+        first = self.depq.snapshot()
+        self.depq.popfirst()
+        second = self.depq.snapshot()
+        self.depq.popfirst()
+        first.release()
+        self.assertEqual(self.depq._frozen, 0)
+        self.depq.popfirst()
+        self.assertEqual([item for item, _ in second], list(range(8, -1, -1)))
+        second.release()
+        self.assertIsNone(self.depq._owned)
+
+    def test_snapshot_clear(self):
+        self.depq.insert(None, 1)
+        with self.depq.snapshot() as snapshot:
+            self.depq.clear()
+            self.assertEqual(list(snapshot), [(None, 1)])
+        self.assertEqual(len(self.depq), 0)
+        self.assertEqual(self.depq.count(None), 0)
+
+    def test_pickle_leaves_depq_unfrozen(self):
+        self.depq.insert(None, 1)
+        pickle.dumps(self.depq)
+        self.assertEqual(self.depq._frozen, 0)
+
+
+class KeyedPriority:
+    """Priority with deliberately expensive rich comparisons"""
+
+    comparisons = 0
+
+    def __init__(self, severity, age):
+        self.severity = severity
+        self.age = age
+
+    def fields(self):
+        KeyedPriority.comparisons += 1
+        return self.severity, -self.age
+
+    def __lt__(self, other):
+        return self.fields() < other.fields()
+
+    def __le__(self, other):
+        return self.fields() <= other.fields()
+
+    def __gt__(self, other):
+        return self.fields() > other.fields()
+
+    def __ge__(self, other):
+        return self.fields() >= other.fields()
+
+    def __eq__(self, other):
+        return self.fields() == other.fields()
+
+    def __repr__(self):
+        return 'KeyedPriority({}, {})'.format(self.severity, self.age)
+
+
+def priority_fields(priority):
+    return priority.severity, -priority.age
+
+
+class DEPQKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ(key=priority_fields)
+        self.random = SystemRandom()
+
+    def test_insert_order_matches_unkeyed(self):
+        plain = DEPQ()
+        for i in range(50):
+            priority = KeyedPriority(self.random.randrange(5),
+                                     self.random.randrange(100))
+            plain.insert(i, priority)
+            self.depq.insert(i, priority)
+        self.assertEqual(list(self.depq), list(plain))
+
+    def test_insert_does_not_compare_priorities(self):
+        KeyedPriority.comparisons = 0
+        for i in range(50):
+            self.depq.insert(i, KeyedPriority(i % 7, i))
+        self.assertEqual(KeyedPriority.comparisons, 0)
+
+    def test_key_reverses_order(self):
+        depq = DEPQ(key=lambda priority: -priority)
+        for i in range(5):
+            depq.insert(i, i)
+        self.assertEqual(list(depq), [(i, i) for i in range(5)])
+        self.assertEqual(depq.high(), 0)
+        self.assertEqual(depq.low(), 4)
+
+    def test_returns_pairs(self):
+        low = KeyedPriority(1, 0)
+        high = KeyedPriority(2, 0)
+        self.depq.insert('low', low)
+        self.depq.insert('high', high)
+        gone = KeyedPriority(0, 0)
+        self.depq.insert('gone', gone)
+        self.assertEqual(self.depq[0], ('high', high))
+        self.assertEqual(self.depq.remove('gone'), [('gone', gone)])
+        self.assertEqual(self.depq.popfirst(), ('high', high))
+        self.assertEqual(self.depq.poplast(), ('low', low))
+
+    def test_addfirst_and_addlast_compare_keys(self):
+        depq = DEPQ(key=lambda priority: -priority)
+        depq.addfirst('a', 5)
+        depq.addfirst('b', 3)
+        depq.addlast('c', 9)
+        with self.assertRaises(ValueError):
+            depq.addfirst('d', 4)
+        with self.assertRaises(ValueError):
+            depq.addlast('e', 8)
+        depq.addfirst('f')
+        depq.addlast('g')
+        self.assertEqual(list(depq),
+                         [('f', 3), ('b', 3), ('a', 5), ('c', 9), ('g', 9)])
+
+    def test_maxlen_evicts_lowest_key(self):
+        depq = DEPQ(maxlen=2, key=lambda priority: -priority)
+        for i in range(4):
+            depq.insert(i, i)
+        self.assertEqual(list(depq), [(0, 0), (1, 1)])
+
+    def test_str(self):
+        depq = DEPQ(key=lambda priority: -priority)
+        depq.insert(None, 5)
+        self.assertEqual(str(depq), "DEPQ([(None, 5)])")
+
+    def test_pickle(self):
+        for i in range(5):
+            self.depq.insert(i, KeyedPriority(i, i))
+        depq_from_pickle = pickle.loads(pickle.dumps(self.depq))
+        self.assertEqual([item for item, _ in depq_from_pickle],
+                         [item for item, _ in self.depq])
+        self.assertIs(depq_from_pickle._key, priority_fields)
+
+    def test_json(self):
+        depq = DEPQ(key=abs)
+        for i in range(-2, 3):
+            depq.insert(i, i)
+        state = depq.to_json()
+        self.assertNotIn('_key', state)
+        self.assertEqual(state['data'][0], (-2, -2))
+        depq_from_json = DEPQ.from_json(json.dumps(state), key=abs)
+        self.assertEqual(list(depq_from_json), list(depq))
+        depq_from_json.insert('new', -5)
+        self.assertEqual(depq_from_json.first(), 'new')
+
+
+class DEPQUniqueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ(unique=True)
+
+    def test_insert_moves_item(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        self.depq.insert(0, 10)
+        self.depq.insert(4, 2)
+        self.assertEqual(list(self.depq),
+                         [(0, 10), (3, 3), (2, 2), (4, 2), (1, 1)])
+        self.assertEqual(self.depq.count(0), 1)
+        self.assertEqual(len(self.depq), 5)
+
+    def test_equal_sort_keys(self):
+        for item in 'abcde':
+            self.depq.insert(item, 1)
+        self.depq.insert('c', 1)
+        self.assertEqual([item for item, _ in self.depq], list('abdec'))
+
+    def test_priority_of(self):
+        self.depq.insert('a', 3)
+        self.depq.insert('a', 7)
+        self.assertEqual(self.depq.priority_of('a'), 7)
+        with self.assertRaises(KeyError):
+            self.depq.priority_of('b')
+        depq = DEPQ([('a', 1), ('a', 5)])
+        self.assertEqual(depq.priority_of('a'), 5)
+        with self.assertRaises(KeyError):
+            depq.priority_of('b')
+
+    def test_upsert(self):
+        depq = DEPQ([('a', 1), ('a', 5), ('b', 3)])
+        depq.upsert('a', 2)
+        self.assertEqual(list(depq), [('b', 3), ('a', 2)])
+        self.depq.upsert('a', 1)
+        self.depq.upsert('a', 4)
+        self.assertEqual(list(self.depq), [('a', 4)])
+
+    def test_pops_and_remove_update_index(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        self.depq.popfirst()
+        self.depq.poplast()
+        self.assertEqual(self.depq.remove(2), [(2, 2)])
+        self.assertEqual(self.depq.remove(2), [])
+        self.assertEqual(self.depq.remove(3, 0), [])
+        self.assertEqual(sorted(self.depq._index), [1, 3])
+        self.assertEqual(self.depq.elim(1), [(1, 1)])
+        with self.assertRaises(KeyError):
+            self.depq.priority_of(4)
+        self.assertEqual(self.depq.priority_of(3), 3)
+
+    def test_addfirst_and_addlast(self):
+        for i in range(3):
+            self.depq.insert(i, i)
+        self.depq.addfirst(0)
+        self.depq.addlast(2, 0)
+        self.assertEqual(list(self.depq), [(0, 2), (1, 1), (2, 0)])
+        with self.assertRaises(ValueError):
+            self.depq.addfirst(1, 0)
+        with self.assertRaises(ValueError):
+            self.depq.addlast(1, 5)
+        self.assertEqual(list(self.depq), [(0, 2), (1, 1), (2, 0)])
+        self.assertEqual(self.depq.priority_of(1), 1)
+
+    def test_addfirst_and_addlast_keep_default_priority(self):
+        self.depq.insert('a', 5)
+        self.depq.addfirst('a')
+        self.assertEqual(list(self.depq), [('a', 5)])
+        self.depq.addlast('a')
+        self.assertEqual(list(self.depq), [('a', 5)])
+        self.depq.insert('b', 3)
+        self.depq.addlast('a')
+        self.assertEqual(list(self.depq), [('b', 3), ('a', 3)])
+        self.depq.addfirst('a')
+        self.assertEqual(list(self.depq), [('a', 3), ('b', 3)])
+
+    def test_upsert_matches_reference(self):
+        random = SystemRandom()
+        reference = DEPQ()
+        for _ in range(300):
+            item, priority = random.randrange(20), random.randrange(10)
+            self.depq.upsert(item, priority)
+            reference.upsert(item, priority)
+            self.assertEqual(list(self.depq), list(reference))
+
+    def test_maxlen(self):
+        depq = DEPQ(maxlen=2, unique=True)
+        depq.insert('a', 1)
+        depq.insert('b', 2)
+        depq.insert('a', 3)
+        depq.insert('c', 0)
+        self.assertEqual(list(depq), [('a', 3), ('b', 2)])
+        depq.addlast('b', 1)
+        self.assertEqual(list(depq), [('a', 3), ('b', 1)])
+        self.assertEqual(sorted(depq._index), ['a', 'b'])
+
+    def test_key(self):
+        depq = DEPQ(key=lambda priority: -priority, unique=True)
+        for i in range(5):
+            depq.insert(i, i)
+        depq.insert(4, -1)
+        self.assertEqual(depq.first(), 4)
+        self.assertEqual(depq.priority_of(4), -1)
+        self.assertEqual(depq.remove(4), [(4, -1)])
+
+    def test_snapshot_and_clear(self):
+        self.depq.insert('a', 1)
+        with self.depq.snapshot() as snapshot:
+            self.depq.insert('a', 2)
+            self.depq.clear()
+            self.assertEqual(list(snapshot), [('a', 1)])
+        self.assertEqual(self.depq._index, {})
+        self.depq.insert('a', 3)
+        self.assertEqual(self.depq.priority_of('a'), 3)
+
+    def test_reprioritize(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        self.depq.reprioritize(lambda item, priority: -priority)
+        self.depq.insert(0, -10)
+        self.assertEqual(self.depq.last(), 0)
+        self.assertEqual(self.depq.priority_of(3), -3)
+        self.assertEqual(len(self.depq), 5)
+
+    def test_pickle_and_json(self):
+        for i in range(5):
+            self.depq.insert(i, i)
+        for depq in (pickle.loads(pickle.dumps(self.depq)),
+                     DEPQ.from_json(json.dumps(self.depq.to_json()))):
+            self.assertEqual(list(depq), list(self.depq))
+            depq.insert(2, 10)
+            self.assertEqual(depq.first(), 2)
+            self.assertEqual(len(depq), 5)
+        self.assertNotIn('_index', self.depq.to_json())
+        self.assertIs(DEPQ.from_json('{"data": [], "items": {}}')._index,
+                      None)
+
+    def test_integer_backend_raise_error(self):
+        with self.assertRaises(ValueError):
+            DEPQ(backend='radix', unique=True)
+
+
+class DEPQBlocksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = Random(5)
+
+    def check(self, depq, expected):
+        blocks = depq._blocks
+        self.assertTrue(all(0 < len(block) <= 2 * depq._load
+                            for block in blocks))
+        self.assertEqual(sum(map(len, blocks)), len(depq))
+        self.assertEqual(list(depq), expected)
+        self.assertEqual(len(depq), len(expected))
+        for index in (0, len(expected) // 3, -1, -len(expected) // 2):
+            if expected:
+                self.assertEqual(depq[index], expected[index])
+        for priority in (-1, 10, 25, 51):
+            self.assertEqual(depq.rank_of(priority),
+                             sum(1 for _, p in expected if p >= priority))
+
+    def run_operations(self, depq, unique):
+        depq._load = 4
+        expected = []
+
+        def place(item, priority):
+            if unique:
+                expected[:] = [tup for tup in expected if tup[0] != item]
+            position = sum(1 for _, p in expected if p >= priority)
+            expected.insert(position, (item, priority))
+
+        for i in range(2000):
+            op = self.random.randrange(8)
+            item = self.random.randrange(40)
+            priority = self.random.randrange(50)
+            if op < 3:
+                depq.insert(item, priority)
+                place(item, priority)
+            elif op == 3:
+                pairs = [(self.random.randrange(40), self.random.randrange(50))
+                         for _ in range(self.random.randrange(12))]
+                depq.insert_many(pairs)
+                for pair in pairs:
+                    place(*pair)
+            elif op == 4 and expected:
+                self.assertEqual(depq.popfirst(), expected.pop(0))
+            elif op == 5 and expected:
+                self.assertEqual(depq.poplast(), expected.pop())
+            elif op == 6:
+                count = self.random.randrange(-1, 3)
+                positions = [position for position in
+                             range(len(expected) - 1, -1, -1)
+                             if expected[position][0] == item]
+                if count != -1:
+                    positions = positions[:count]
+                self.assertEqual(depq.remove(item, count),
+                                 [expected[position]
+                                  for position in positions])
+                for position in positions:
+                    del expected[position]
+            elif op == 7:
+                if unique:
+                    expected[:] = [tup for tup in expected if tup[0] != item]
+                if self.random.random() < 0.5:
+                    depq.addfirst(item)
+                    expected.insert(0, (item, depq.high()))
+                else:
+                    depq.addlast(item)
+                    expected.append((item, depq.low()))
+            if i % 50 == 0:
+                self.check(depq, expected)
+
+        self.check(depq, expected)
+        state = pickle.loads(pickle.dumps(depq))
+        self.assertEqual(list(state), expected)
+
+    def test_random_operations(self):
+        self.run_operations(DEPQ(), False)
+
+    def test_random_operations_unique(self):
+        depq = DEPQ(unique=True, ranked=True)
+        self.run_operations(depq, True)
+        for item, priority in depq:
+            self.assertEqual(depq.priority_of(item), priority)
+
+    def test_equal_priorities_span_blocks(self):
+        depq = DEPQ(unique=True)
+        depq._load = 2
+        for item in range(20):
+            depq.insert(item, 1)
+        self.assertGreater(len(depq._blocks), 2)
+        depq.insert(13, 1)
+        depq.insert(2, 0)
+        self.assertEqual([item for item, _ in depq],
+                         [i for i in range(20) if i not in (2, 13)] + [13, 2])
+
+    def test_data_is_a_copy(self):
+        depq = DEPQ([(None, 1)])
+        depq.data.clear()
+        self.assertEqual(len(depq.data), 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from collections import Counter
+from depq.fair import FairDEPQ
+
+
+class FairDEPQTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fair = FairDEPQ()
+
+    def test_round_robin_with_equal_weights(self):
+        for i in range(3):
+            self.fair.insert('a', 'a{}'.format(i), i)
+            self.fair.insert('b', 'b{}'.format(i), i)
+        self.fair.insert('c', 'c0', 0)
+        order = [self.fair.popfirst() for _ in range(7)]
+        self.assertEqual(order, [
+            ('a', 'a2', 2), ('b', 'b2', 2), ('c', 'c0', 0),
+            ('a', 'a1', 1), ('b', 'b1', 1), ('a', 'a0', 0), ('b', 'b0', 0),
+        ])
+        self.assertTrue(self.fair.is_empty())
+        with self.assertRaises(IndexError):
+            self.fair.popfirst()
+
+    def test_weights_share_turns(self):
+        self.fair.add_tenant('heavy', weight=3)
+        for i in range(400):
+            self.fair.insert('heavy', i, i)
+            self.fair.insert('light', i, i)
+        served = Counter(self.fair.popfirst()[0] for _ in range(400))
+        self.assertEqual(served, {'heavy': 300, 'light': 100})
+
+    def test_newcomer_is_not_starved_or_favoured(self):
+        for i in range(100):
+            self.fair.insert('busy', i, i)
+        for _ in range(50):
+            self.fair.popfirst()
+        # An idle tenant catches up with virtual time, not with zero
+        self.fair.insert('new', 'x', 0)
+        self.fair.insert('new', 'y', 0)
+        served = [self.fair.popfirst()[0] for _ in range(4)]
+        self.assertEqual(served.count('new'), 2)
+        self.assertEqual(served.count('busy'), 2)
+
+    def test_first_matches_popfirst(self):
+        for tenant, item, priority in (('a', 1, 5), ('b', 2, 9), ('a', 3, 7)):
+            self.fair.insert(tenant, item, priority)
+        while self.fair:
+            expected = self.fair.first()
+            self.assertEqual(self.fair.popfirst(), expected)
+
+    def test_maxlen_and_stats(self):
+        self.fair.add_tenant('a', maxlen=2)
+        for i in range(5):
+            self.fair.insert('a', i, i)
+        self.assertEqual(self.fair.size('a'), 2)
+        self.assertEqual(len(self.fair), 2)
+        self.fair.popfirst()
+        self.assertEqual(self.fair.stats('a'), {
+            'weight': 1, 'maxlen': 2, 'size': 1,
+            'inserted': 5, 'popped': 1, 'dropped': 3,
+        })
+        self.fair.add_tenant('a', maxlen=0)
+        self.assertEqual(len(self.fair), 0)
+        self.assertEqual(self.fair.stats('a')['dropped'], 4)
+        with self.assertRaises(IndexError):
+            self.fair.popfirst()
+        with self.assertRaises(KeyError):
+            self.fair.stats('b')
+
+    def test_zero_maxlen_tenant_is_never_scheduled(self):
+        self.fair.add_tenant('a', maxlen=0)
+        self.fair.insert('a', 1, 1)
+        self.assertEqual(self.fair.remove('a', 1), [])
+        self.fair.add_tenant('a', maxlen=0)
+        self.assertEqual(self.fair._active, 0)
+        self.assertEqual(self.fair.remove_tenant('a'), [])
+        self.assertEqual(self.fair._active, 0)
+
+    def test_shrinking_maxlen_refunds_turn(self):
+        self.fair.insert('a', 1, 1)
+        self.fair.insert('b', 2, 2)
+        self.fair.add_tenant('a', maxlen=0)
+        self.assertEqual(self.fair._active, 1)
+        # The turn 'a' was waiting for is not charged
+        self.assertEqual(self.fair._tenants['a'].finish, 0.0)
+
+    def test_default_weight_and_maxlen(self):
+        fair = FairDEPQ(weight=2, maxlen=1)
+        fair.insert('a', 1, 1)
+        fair.insert('a', 2, 2)
+        self.assertEqual(fair.stats('a')['weight'], 2)
+        self.assertEqual(fair.popfirst(), ('a', 2, 2))
+        with self.assertRaises(ValueError):
+            FairDEPQ(weight=0)
+        with self.assertRaises(ValueError):
+            fair.add_tenant('a', weight=-1)
+
+    def test_out_of_turn_removal(self):
+        self.fair.insert('a', 1, 1)
+        self.fair.insert('a', 2, 2)
+        self.fair.insert('b', 3, 3)
+        self.assertEqual(self.fair.poplast('a'), (1, 1))
+        self.assertEqual(self.fair.remove('a', 2), [(2, 2)])
+        self.assertEqual(self.fair.remove('a', 2), [])
+        with self.assertRaises(IndexError):
+            self.fair.poplast('a')
+        # Emptied tenant rejoins with a single live turn
+        self.fair.insert('a', 4, 4)
+        self.assertEqual(sorted(self.fair.popfirst() for _ in range(2)),
+                         [('a', 4, 4), ('b', 3, 3)])
+        self.assertEqual(len(self.fair), 0)
+
+    def test_remove_tenant(self):
+        self.fair.insert('a', 1, 1)
+        self.fair.insert('b', 2, 2)
+        self.assertEqual(self.fair.remove_tenant('a'), [(1, 1)])
+        self.assertEqual(self.fair.tenants(), ['b'])
+        self.assertEqual(self.fair.popfirst(), ('b', 2, 2))
+        self.assertEqual(self.fair.remove_tenant('b'), [])
+        with self.assertRaises(KeyError):
+            self.fair.remove_tenant('b')
+
+    def test_many_tenants_stay_compact(self):
+        for tenant in range(1000):
+            self.fair.insert(tenant, tenant, 0)
+            self.fair.poplast(tenant)
+            self.fair.insert(tenant, tenant, 0)
+        self.assertLessEqual(len(self.fair._heap), 2 * 1000 + 64)
+        served = sorted(self.fair.popfirst()[0] for _ in range(1000))
+        self.assertEqual(served, list(range(1000)))
+        self.assertEqual(self.fair._heap, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import unittest
+
+
+def imported_after(statement):
+    """Returns modules a fresh interpreter has loaded after statement"""
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        '{}\nimport sys\nprint(" ".join(sys.modules))'.format(statement)
+    ], universal_newlines=True)
+    return set(output.split())
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'requires PEP 562')
+class LazyImportTest(unittest.TestCase):
+
+    def test_import_package_only(self):
+        modules = imported_after('import depq')
+        self.assertIn('depq', modules)
+        self.assertNotIn('depq.depq', modules)
+        self.assertNotIn('depq.journal', modules)
+
+    def test_import_depq_skips_optional_modules(self):
+        modules = imported_after('from depq import DEPQ; DEPQ()')
+        self.assertIn('depq.depq', modules)
+        for name in ('json', 'depq.journal'):
+            self.assertNotIn(name, modules)
+
+    def test_json_imported_on_use(self):
+        modules = imported_after('from depq import DEPQ\n'
+                                 'DEPQ.from_json(\'{"data": [], "items": {}}\')')
+        self.assertIn('json', modules)
+
+    def test_submodule_attribute(self):
+        modules = imported_after('import depq; depq.journal.Journal')
+        self.assertIn('depq.journal', modules)
+
+    def test_unknown_attribute_raise_error(self):
+        import depq
+        with self.assertRaises(AttributeError):
+            depq.missing
+
+    def test_dir_lists_lazy_names(self):
+        import depq
+        self.assertIn('DEPQ', dir(depq))
+        self.assertIn('journal', dir(depq))
+
+
+class StarImportTest(unittest.TestCase):
+
+    def test_all_names_resolve(self):
+        import depq
+        namespace = {}
+        exec('from depq import *', namespace)
+        for name in depq.__all__:
+            self.assertIs(namespace[name], getattr(depq, name))
+        self.assertIn('Journal', depq.__all__)
+
+if __name__ == '__main__':
+    unittest.main()
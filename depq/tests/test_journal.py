@@ -0,0 +1,245 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from depq import DEPQ
+from depq.journal import Journal
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'queue')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reopen(self, **kwargs):
+        journal = Journal(self.path, **kwargs)
+        return journal, journal.open()
+
+    def test_open_empty(self):
+        journal, depq = self.reopen()
+        self.assertEqual(len(depq), 0)
+        self.assertIs(depq.journal, journal)
+        journal.close()
+        self.assertIs(depq.journal, None)
+
+    def test_open_with_maxlen(self):
+        journal = Journal(self.path)
+        depq = journal.open(maxlen=3)
+        self.assertEqual(depq.maxlen, 3)
+        journal.close()
+
+    def test_process_crash_loses_nothing(self):
+        script = ('import os, sys\n'
+                  'from depq.journal import Journal\n'
+                  'depq = Journal(sys.argv[1]).open()\n'
+                  'for i in range(50):\n'
+                  '    depq.insert(i, i)\n'
+                  'os._exit(0)\n')
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        subprocess.check_call([sys.executable, '-c', script, self.path],
+                              cwd=root)
+        journal, depq = self.reopen()
+        self.assertEqual(len(depq), 50)
+        self.assertEqual(depq.first(), 49)
+        journal.close()
+
+    def test_open_twice_raise_error(self):
+        journal, depq = self.reopen()
+        with self.assertRaises(ValueError):
+            journal.open()
+        journal.close()
+
+    def test_failed_open_leaves_no_files(self):
+        journal = Journal(self.path)
+        with self.assertRaises(Exception):
+            journal.open(key=lambda priority: -priority)
+        self.assertIs(journal.depq, None)
+        self.assertEqual(os.listdir(self.directory), [])
+        depq = journal.open()
+        depq.insert(None, 1)
+        journal.close()
+
+    def test_sync_interval_syncs_idle_journal(self):
+        journal = Journal(self.path, group_commit=0, sync_interval=0.01)
+        depq = journal.open()
+        depq.insert(None, 1)
+        for _ in range(200):
+            if not journal._pending:
+                break
+            time.sleep(0.01)
+        self.assertEqual(journal._pending, 0)
+        journal.close()
+
+    def test_group_commit_syncs_in_background(self):
+        journal, depq = self.reopen(group_commit=2)
+        depq.insert(None, 1)
+        depq.insert(None, 2)
+        for _ in range(200):
+            if not journal._pending:
+                break
+            time.sleep(0.01)
+        self.assertEqual(journal._pending, 0)
+        journal.close()
+
+    def test_recover_all_operations(self):
+        journal, depq = self.reopen(group_commit=1)
+        for i in range(10):
+            depq.insert('item{}'.format(i), i)
+        depq.addfirst('first', 20)
+        depq.addlast('last', -5)
+        depq.popfirst()
+        depq.poplast()
+        depq.remove('item3')
+        depq.insert_many([('batch', 4), ('batch', 0)])
+        depq.set_maxlen(5)
+        expected = list(depq)
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), expected)
+        self.assertEqual(recovered.items, depq.items)
+        self.assertEqual(recovered.maxlen, 5)
+        journal.close()
+
+    def test_recover_batch(self):
+        journal, depq = self.reopen()
+        depq.insert_many([('a', 1), ('b', 2), ('a', 3)])
+        with depq.batch() as tx:
+            tx.insert('c', 5)
+            tx.insert('a', 0)
+            tx.popfirst()
+            tx.poplast()
+            tx.remove('a')
+            tx.insert('d', 4)
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), list(depq))
+        self.assertEqual(recovered.items, depq.items)
+        journal.close()
+
+    def test_recover_reprioritize(self):
+        journal, depq = self.reopen()
+        for i in range(10):
+            depq.insert(i, i)
+        depq.reprioritize(lambda item, priority: -priority)
+        depq.reprioritize(lambda item, priority: priority * 2, True)
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), list(depq))
+        journal.close()
+
+    def test_recover_unique(self):
+        journal = Journal(self.path)
+        depq = journal.open(unique=True)
+        for i in range(5):
+            depq.insert(i, i)
+        journal.compact()
+        depq.insert(0, 10)
+        depq.addlast(4)
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), list(depq))
+        self.assertEqual(recovered.priority_of(0), 10)
+        journal.close()
+
+    def test_recover_bucket_backend(self):
+        journal = Journal(self.path)
+        depq = journal.open(backend='bucket', priority_range=(0, 10))
+        for i in range(10):
+            depq.insert(i, i)
+        journal.compact()
+        depq.popfirst()
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(type(recovered), type(depq))
+        self.assertEqual(list(recovered), list(depq))
+        self.assertEqual(recovered.items, depq.items)
+        journal.close()
+
+    def test_recover_unhashable(self):
+        journal, depq = self.reopen()
+        depq.insert(['test'], 5)
+        depq.insert(['test'], 7)
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(recovered.count(['test']), 2)
+        journal.close()
+
+    def test_recover_after_clear(self):
+        journal, depq = self.reopen()
+        depq.insert(None, 5)
+        depq.clear()
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(len(recovered), 0)
+        journal.close()
+
+    def test_recover_ignores_torn_tail(self):
+        journal, depq = self.reopen()
+        depq.insert('kept', 1)
+        journal.sync()
+        with open(journal._log_path(journal.generation), 'ab') as f:
+            f.write(b'\xff\x00\x00\x00garbage')
+        journal._file.close()
+        journal._file = None
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), [('kept', 1)])
+        recovered.insert('new', 2)
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), [('new', 2), ('kept', 1)])
+        journal.close()
+
+    def test_compact_removes_old_generations(self):
+        journal, depq = self.reopen()
+        for i in range(5):
+            depq.insert(None, i)
+        journal.compact()
+        snapshots, logs = journal._generations()
+        self.assertEqual(snapshots, [journal.generation])
+        self.assertEqual(logs, [journal.generation])
+        depq.poplast()
+        journal.close()
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), [(None, i) for i in range(4, 0, -1)])
+        journal.close()
+
+    def test_background_compaction(self):
+        journal, depq = self.reopen(compact_every=10)
+        generation = journal.generation
+        for i in range(25):
+            depq.insert(i, i)
+        journal.close()
+        self.assertGreater(journal.generation, generation)
+
+        journal, recovered = self.reopen()
+        self.assertEqual(list(recovered), list(depq))
+        journal.close()
+
+    def test_pickle_and_json_exclude_journal(self):
+        journal, depq = self.reopen()
+        depq.insert(None, 1)
+        self.assertNotIn('journal', depq.to_json())
+        self.assertNotIn('journal', depq.__getstate__())
+        self.assertIs(DEPQ.from_json('{"data": [], "items": {}}').journal, None)
+        journal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import threading
+import time
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from depq import DEPQ
+from depq.pool import ProcessWorkStealingExecutor, WorkStealingExecutor
+
+
+class WorkStealingExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = WorkStealingExecutor(2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_submit_returns_futures(self):
+        futures = [self.executor.submit(pow, i, i, 2) for i in range(20)]
+        self.assertEqual([future.result() for future in futures],
+                         [i * i for i in range(20)])
+
+    def test_map(self):
+        self.assertEqual(list(self.executor.map(pow, range(5), range(5))),
+                         [1, 1, 4, 27, 256])
+
+    def test_exception(self):
+        future = self.executor.submit(int, 0, 'not a number')
+        with self.assertRaises(ValueError):
+            future.result()
+
+    def test_priority_order(self):
+        executor = WorkStealingExecutor(1)
+        gate = threading.Event()
+        order = []
+        executor.submit(gate.wait)
+        for priority in (1, 5, 3):
+            executor.submit(order.append, priority, priority)
+        gate.set()
+        executor.shutdown()
+        self.assertEqual(order, [5, 3, 1])
+
+    def test_idle_worker_steals_lowest_priority(self):
+        stolen = []
+        owner = []
+
+        def spawn():
+            owner.append(threading.current_thread())
+            # Submitted from a worker so all of it goes to its own DEPQ
+            for priority in range(10):
+                self.executor.submit(time.sleep, priority, 0.01)
+            self.executor.submit(
+                lambda: stolen.append(threading.current_thread()), -1
+            )
+
+        self.executor.submit(spawn).result()
+        self.executor.shutdown()
+        self.assertGreater(self.executor.steals, 0)
+        self.assertEqual(len(stolen), 1)
+        self.assertIsNot(stolen[0], owner[0])
+
+    def test_shutdown(self):
+        self.executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(pow, 0, 2, 2)
+
+    def test_shutdown_cancel_futures(self):
+        executor = WorkStealingExecutor(1)
+        gate = threading.Event()
+        running = executor.submit(gate.wait)
+        queued = executor.submit(pow, 0, 2, 2)
+        time.sleep(0.05)
+        executor.shutdown(wait=False, cancel_futures=True)
+        gate.set()
+        executor.shutdown()
+        self.assertEqual(running.result(), True)
+        self.assertEqual(queued.cancelled(), True)
+
+    def test_queued_tasks_counted_by_identity(self):
+        executor = WorkStealingExecutor(1)
+        gate = threading.Event()
+        executor.submit(gate.wait)
+        time.sleep(0.05)
+        queued = executor.submit(dict, 0, a=[1])
+        queued.cancel()
+        queue = executor._queues[0]
+        task = queue.first()
+        self.assertEqual(queue.count(task), 1)
+        self.assertEqual(list(queue.items), [task])
+        gate.set()
+        executor.shutdown()
+        self.assertEqual(queued.cancelled(), True)
+        self.assertEqual(len(queue.items), 0)
+
+    def test_invalid_max_workers_raise_error(self):
+        with self.assertRaises(ValueError):
+            WorkStealingExecutor(0)
+
+
+class ProcessWorkStealingExecutorTest(unittest.TestCase):
+
+    def test_submit_and_map(self):
+        with ProcessWorkStealingExecutor(2) as executor:
+            futures = [executor.submit(pow, i, i, 2) for i in range(10)]
+            self.assertEqual([future.result() for future in futures],
+                             [i * i for i in range(10)])
+            self.assertEqual(list(executor.map(abs, [-1, -2])), [1, 2])
+
+
+class ParallelDrainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ()
+        for i in range(20):
+            self.depq.insert(i, i)
+
+    def test_drains_every_item(self):
+        with ThreadPoolExecutor(4) as executor:
+            results = sorted(self.depq.parallel_drain(abs, executor, 3))
+        self.assertEqual(results, [(i, i) for i in range(20)])
+        self.assertEqual(len(self.depq), 0)
+
+    def test_priority_order_and_inflight_bound(self):
+        with ThreadPoolExecutor(2) as executor:
+            drain = self.depq.parallel_drain(abs, executor, 1)
+            self.assertEqual(next(drain)[0], 19)
+            # Only as many items as calls in flight have been popped
+            self.assertEqual(len(self.depq), 19)
+            self.assertEqual([item for item, _ in drain],
+                             list(range(18, -1, -1)))
+
+    def test_fn_inserting_items(self):
+        def spawn(item):
+            if item >= 20:
+                self.depq.insert(item - 20, 100)
+            return item
+
+        self.depq.clear()
+        for i in range(20, 25):
+            self.depq.insert(i, i)
+        with WorkStealingExecutor(2) as executor:
+            items = [i for i, _ in self.depq.parallel_drain(spawn, executor)]
+        self.assertEqual(sorted(items), list(range(5)) + list(range(20, 25)))
+
+    def test_exception(self):
+        with ThreadPoolExecutor(2) as executor:
+            with self.assertRaises(ZeroDivisionError):
+                list(self.depq.parallel_drain(lambda i: 1 // i, executor))
+
+    def test_close_puts_pending_items_back(self):
+        leftovers = []
+        with ThreadPoolExecutor(1) as executor:
+            gate = threading.Event()
+            executor.submit(gate.wait)
+            threading.Timer(0.05, gate.set).start()
+            drain = self.depq.parallel_drain(
+                lambda item: time.sleep(0.05) or item, executor, 3,
+                leftovers
+            )
+            self.assertEqual(next(drain)[0], 19)
+            drain.close()
+        # 18 already runs and is handed back, 17 was still queued
+        self.assertNotIn(19, self.depq)
+        self.assertNotIn(18, self.depq)
+        self.assertEqual(self.depq.first(), 17)
+        self.assertEqual(len(self.depq), 18)
+        self.assertEqual([item for item, _ in leftovers], [18])
+        self.assertEqual(leftovers[0][1].result(), 18)
+
+    def test_close_warns_without_leftovers(self):
+        with ThreadPoolExecutor(2) as executor:
+            drain = self.depq.parallel_drain(abs, executor, 2)
+            next(drain)
+            time.sleep(0.05)
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                drain.close()
+        self.assertEqual(len(caught), 1)
+        self.assertIs(caught[0].category, RuntimeWarning)
+        # The finished call is not put back to run twice
+        self.assertEqual(len(self.depq), 18)
+
+    def test_invalid_max_inflight_raise_error(self):
+        with ThreadPoolExecutor(1) as executor:
+            with self.assertRaises(ValueError):
+                next(self.depq.parallel_drain(abs, executor, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from depq.search import astar, beam_search, best_first
+
+
+def grid(walls, size):
+    """Returns neighbors function of a size x size grid with walls"""
+
+    def neighbors(state):
+        x, y = state
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            child = x + dx, y + dy
+            if (0 <= child[0] < size and 0 <= child[1] < size and
+                    child not in walls):
+                yield child, 1
+
+    return neighbors
+
+
+def manhattan(goal):
+    return lambda state: abs(state[0] - goal[0]) + abs(state[1] - goal[1])
+
+
+class AStarTest(unittest.TestCase):
+
+    def test_shortest_path_around_wall(self):
+        walls = set((2, y) for y in range(4))
+        path, cost = astar((0, 0), grid(walls, 5), manhattan((4, 0)),
+                           lambda state: state == (4, 0))
+        self.assertEqual(cost, 12)
+        self.assertEqual(len(path), 13)
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (4, 0))
+        self.assertFalse(walls.intersection(path))
+
+    def test_weighted_edges(self):
+        edges = {'a': [('b', 1), ('c', 5)], 'b': [('c', 1)], 'c': []}
+        self.assertEqual(
+            astar('a', edges.get, lambda state: 0, lambda state: state == 'c'),
+            (['a', 'b', 'c'], 2)
+        )
+
+    def test_no_path(self):
+        walls = set((2, y) for y in range(5))
+        self.assertIs(astar((0, 0), grid(walls, 5), manhattan((4, 0)),
+                            lambda state: state == (4, 0)), None)
+
+
+class BestFirstTest(unittest.TestCase):
+
+    def test_finds_goal(self):
+        goal = (6, 6)
+        distance = manhattan(goal)
+        path = best_first((0, 0),
+                          lambda state: [s for s, _ in grid(set(), 7)(state)],
+                          lambda state: -distance(state),
+                          lambda state: state == goal)
+        self.assertEqual(len(path), 13)
+        self.assertEqual(path[-1], goal)
+
+    def test_bounded_frontier(self):
+        expanded = []
+
+        def expand(state):
+            expanded.append(state)
+            return range(state * 10 + 1, state * 10 + 11)
+
+        self.assertIs(best_first(0, expand, lambda state: -state,
+                                 lambda state: False, maxlen=3, limit=20),
+                      None)
+        self.assertEqual(len(expanded), 20)
+        self.assertEqual(expanded[:4], [0, 1, 2, 3])
+
+    def test_duplicate_children(self):
+        scored = []
+
+        def score(state):
+            scored.append(state)
+            return -state
+
+        self.assertIs(best_first(0, lambda state: [1, 1, 2] if not state
+                                 else [], score, lambda state: False),
+                      None)
+        self.assertEqual(scored, [0, 1, 2])
+
+    def test_frontier_runs_out(self):
+        self.assertIs(best_first(0, lambda state: range(state + 1, 5),
+                                 lambda state: state, lambda state: False),
+                      None)
+
+
+class BeamSearchTest(unittest.TestCase):
+
+    def test_keeps_best_states(self):
+        beam = beam_search(0, lambda state: (state * 2, state * 2 + 1),
+                           lambda state: state % 7, width=3, steps=4)
+        self.assertEqual(len(beam), 3)
+        self.assertEqual(beam, [(13, 6), (12, 5), (11, 4)])
+
+    def test_goal_stops_search(self):
+        beam = beam_search(1, lambda state: (state + 1, state + 2),
+                           lambda state: state, width=2,
+                           goal=lambda state: state >= 10)
+        self.assertEqual(beam, [(11, 11), (10, 10)])
+
+    def test_exhausted(self):
+        beam = beam_search('a', lambda state: 'ab', lambda state: 0, width=4)
+        self.assertEqual(beam, [('b', 0)])
+
+    def test_duplicate_children(self):
+        beam = beam_search((0, 0), lambda state: [(1, 1), (1, 1), (2, 2)],
+                           lambda state: state[0], width=3, steps=1)
+        self.assertEqual(beam, [((2, 2), 2), ((1, 1), 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,9 @@
+import sys
+import unittest
+
+# Only imported where they can run, see server_cases.py
+if sys.version_info >= (3, 7):
+    from depq.tests.server_cases import ProtocolTest, ServerTest
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from random import Random
+from depq.sim import Simulator
+
+
+class SimulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = Simulator()
+        self.log = []
+
+    def record(self, name):
+        self.log.append((self.sim.now, name))
+
+    def test_runs_in_time_order(self):
+        for at, name in ((5, 'e'), (0.5, 'a'), (3, 'c'), (1.5, 'b'), (3, 'd')):
+            self.sim.schedule(at, self.record, name)
+        self.assertEqual(len(self.sim), 5)
+        self.assertEqual(self.sim.run(), 5)
+        self.assertEqual(self.log, [(0.5, 'a'), (1.5, 'b'), (3, 'c'),
+                                    (3, 'd'), (5, 'e')])
+        self.assertEqual(len(self.sim), 0)
+        self.assertEqual(self.sim.now, 5)
+
+    def test_matches_sorted_order(self):
+        random = Random(3)
+        sim = Simulator(width=0.25)
+        times = [random.uniform(0, 100) for _ in range(1000)]
+        times += times[:100]
+        for at in times:
+            sim.schedule(at, self.log.append, at)
+        sim.run()
+        self.assertEqual(self.log, sorted(times))
+
+    def test_schedule_from_callback(self):
+
+        def tick(remaining):
+            self.record(remaining)
+            if remaining:
+                self.sim.schedule(self.sim.now + 0.25, tick, remaining - 1)
+                self.sim.schedule(self.sim.now, self.record, 'same time')
+
+        self.sim.schedule(0.75, self.record, 'later')
+        self.sim.schedule(0, tick, 3)
+        self.sim.run()
+        self.assertEqual(self.log, [
+            (0, 3), (0, 'same time'), (0.25, 2), (0.25, 'same time'),
+            (0.5, 1), (0.5, 'same time'), (0.75, 'later'), (0.75, 0),
+        ])
+
+    def test_schedule_before_now_raise_error(self):
+        self.sim.schedule(2, self.record, None)
+        self.sim.run()
+        with self.assertRaises(ValueError):
+            self.sim.schedule(1, self.record, None)
+
+    def test_invalid_width_raise_error(self):
+        with self.assertRaises(ValueError):
+            Simulator(width=0)
+
+    def test_cancel(self):
+        first = self.sim.schedule(1, self.record, 'first')
+        second = self.sim.schedule(2, self.record, 'second')
+        self.assertEqual(self.sim.cancel(second), True)
+        self.assertEqual(self.sim.cancel(second), False)
+        self.assertEqual(len(self.sim), 1)
+        self.assertEqual(self.sim.run(), 1)
+        self.assertEqual(self.sim.cancel(first), False)
+        self.assertEqual(self.log, [(1, 'first')])
+
+    def test_run_until(self):
+        for at in range(10):
+            self.sim.schedule(at, self.record, at)
+        self.assertEqual(self.sim.run(until=4.5), 5)
+        self.assertEqual(self.sim.now, 4.5)
+        self.sim.schedule(4.75, self.record, 'inserted')
+        self.assertEqual(self.sim.run(until=100), 6)
+        self.assertEqual(self.sim.now, 100)
+        self.assertEqual(self.log[5], (4.75, 'inserted'))
+        self.assertEqual(self.log[-1], (9, 9))
+
+    def test_run_until_inside_day(self):
+        sim = Simulator(width=10)
+        sim.schedule(8, self.log.append, 8)
+        sim.run(until=5)
+        sim.schedule(6, self.log.append, 6)
+        sim.schedule(25, self.log.append, 25)
+        sim.run()
+        self.assertEqual(self.log, [6, 8, 25])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import pickle
+import unittest
+from random import Random
+from depq import DEPQ
+from depq.stats import RankIndex
+
+
+def expected_quantile(depq, q):
+    priorities = sorted(priority for _, priority in depq)
+    return priorities[int(q * (len(priorities) - 1))]
+
+
+def expected_rank(depq, priority):
+    return sum(1 for _, p in depq if p >= priority)
+
+
+class RankIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = RankIndex()
+        self.index.load = 4
+        self.random = Random(3)
+
+    def test_random_add_and_discard(self):
+        keys = []
+        for _ in range(2000):
+            if keys and self.random.random() < 0.4:
+                key = keys.pop(self.random.randrange(len(keys)))
+                self.index.discard((None, key))
+            else:
+                key = self.random.randrange(50)
+                keys.append(key)
+                self.index.add((None, key))
+            self.assertEqual(len(self.index), len(keys))
+        keys.sort()
+        for position, key in enumerate(keys):
+            self.assertEqual(self.index.value_at(position), key)
+        for key in range(-1, 52):
+            self.assertEqual(self.index.count_at_least(key),
+                             sum(1 for k in keys if k >= key))
+
+    def test_build(self):
+        entries = [(None, key) for key in range(20, 0, -1)]
+        self.index.build(entries)
+        self.assertEqual(len(self.index), 20)
+        self.assertEqual(self.index.value_at(0), 1)
+        self.assertEqual(self.index.count_at_least(15), 6)
+        self.index.build([])
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.count_at_least(15), 0)
+
+    def test_keyed(self):
+        index = RankIndex(keyed=True)
+        index.load = 2
+        for priority in (-3, 1, -1, 3, 2, -2):
+            index.add((None, priority, abs(priority)))
+        index.discard((None, -1, 1))
+        self.assertEqual([index.value_at(i) for i in range(5)],
+                         [1, 2, -2, -3, 3])
+        self.assertEqual(index.count_at_least(2), 4)
+
+
+class DEPQRankedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ(ranked=True)
+        self.depq._ranks.load = 8
+        self.random = Random(11)
+
+    def check(self, depq):
+        self.assertEqual(len(depq._ranks), len(depq))
+        if not depq:
+            return
+        for q in (0, 0.25, 0.5, 0.99, 1):
+            self.assertEqual(depq.quantile(q), expected_quantile(depq, q))
+        for priority in (-1, 0, 7, 25, 50, 101):
+            self.assertEqual(depq.rank_of(priority),
+                             expected_rank(depq, priority))
+
+    def test_random_operations(self):
+        depq = self.depq
+        depq.set_maxlen(150)
+        for i in range(3000):
+            op = self.random.randrange(9)
+            item = self.random.randrange(30)
+            priority = self.random.randrange(100)
+            if op < 3:
+                depq.insert(item, priority)
+            elif op == 3:
+                depq.insert_many((j, self.random.randrange(100))
+                                 for j in range(self.random.randrange(8)))
+            elif op == 4 and depq:
+                depq.popfirst()
+            elif op == 5 and depq:
+                depq.poplast()
+            elif op == 6:
+                depq.remove(item, self.random.randrange(-1, 3))
+            elif op == 7:
+                depq.addlast(item)
+            else:
+                depq.addfirst(item)
+            if i % 50 == 0:
+                self.check(depq)
+        self.check(depq)
+
+    def test_median_and_maxlen(self):
+        for i in range(10):
+            self.depq.insert(i, i)
+        self.assertEqual(self.depq.median(), 4)
+        self.assertEqual(self.depq.rank_of(7), 3)
+        self.depq.set_maxlen(4)
+        self.assertEqual(self.depq.quantile(0), 6)
+        self.assertEqual(self.depq.rank_of(7), 3)
+        self.depq.clear()
+        self.check(self.depq)
+
+    def test_reprioritize(self):
+        for i in range(20):
+            self.depq.insert(i, i)
+        self.depq.reprioritize(lambda item, priority: -priority)
+        self.check(self.depq)
+
+    def test_unique_and_key(self):
+        depq = DEPQ(key=abs, unique=True, ranked=True)
+        for priority in (-3, 1, -1, 3, 2, -2):
+            depq.insert(priority, priority)
+        depq.insert(-3, 5)
+        depq.remove(2)
+        self.assertEqual(depq.rank_of(-2), 3)
+        self.assertEqual(depq.quantile(1), 5)
+        self.assertEqual(depq.median(), -2)
+
+    def test_serialization_keeps_ranks(self):
+        for i in range(10):
+            self.depq.insert(i, i)
+        for depq in (pickle.loads(pickle.dumps(self.depq)),
+                     DEPQ.from_json(json.dumps(self.depq.to_json())),
+                     DEPQ.from_arrays(*self.depq.to_arrays(), ranked=True)):
+            self.check(depq)
+            depq.insert('new', 3)
+            self.check(depq)
+        with self.depq.snapshot():
+            self.depq.popfirst()
+        self.check(self.depq)
+
+    def test_unranked_fallback(self):
+        depq = DEPQ()
+        for i in range(10):
+            depq.insert(i, i)
+        self.assertEqual(depq.median(), 4)
+        self.assertEqual(depq.quantile(0.99), 8)
+        self.assertEqual(depq.rank_of(7), 3)
+        bucket = DEPQ(depq, backend='bucket', priority_range=(0, 9))
+        self.assertEqual(bucket.median(), 4)
+        self.assertEqual(bucket.rank_of(7), 3)
+        self.assertEqual(bucket.rank_of(-1), 10)
+
+    def test_invalid_raise_error(self):
+        with self.assertRaises(IndexError):
+            self.depq.median()
+        self.depq.insert('a', 1)
+        with self.assertRaises(ValueError):
+            self.depq.quantile(1.5)
+        with self.assertRaises(ValueError):
+            DEPQ(backend='radix', ranked=True)
+
+if __name__ == '__main__':
+    unittest.main()
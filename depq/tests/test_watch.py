@@ -0,0 +1,128 @@
+import pickle
+import sys
+import threading
+import unittest
+from depq import DEPQ
+from depq.watch import WatchedLock
+
+# Only imported where it can run, see watch_cases.py
+if sys.version_info >= (3, 7):
+    from depq.tests.watch_cases import AsyncioModeCases
+else:  # pragma: no cover
+    AsyncioModeCases = object
+
+
+class WatchTest(AsyncioModeCases, unittest.TestCase):
+
+    def setUp(self):
+        self.depq = DEPQ()
+        self.events = []
+
+    def callback(self, event, value):
+        self.events.append((event, value))
+
+    def test_high_above(self):
+        self.depq.watch(self.callback, high_above=5)
+        self.depq.insert('a', 3)
+        self.depq.insert('b', 6)
+        self.depq.insert('c', 7)
+        self.assertEqual(self.events, [('high_above', 6)])
+        self.depq.popfirst()
+        self.depq.popfirst()
+        self.depq.addfirst('d', 9)
+        self.assertEqual(self.events, [('high_above', 6), ('high_above', 9)])
+
+    def test_low_below_and_size_above(self):
+        self.depq.watch(self.callback, low_below=0, size_above=2)
+        self.depq.insert('a', 1)
+        self.depq.insert('b', 2)
+        self.depq.addlast('c', -1)
+        self.assertEqual(self.events, [('size_above', 3), ('low_below', -1)])
+
+    def test_fires_at_once_if_condition_holds(self):
+        self.depq.insert('a', 10)
+        self.depq.watch(self.callback, high_above=5)
+        self.assertEqual(self.events, [('high_above', 10)])
+
+    def test_maxlen_eviction_and_clear(self):
+        self.depq.set_maxlen(2)
+        self.depq.insert('a', 1)
+        self.depq.insert('b', 5)
+        self.depq.watch(self.callback, low_below=3)
+        self.assertEqual(len(self.events), 1)
+        # Evicts the low entry, so the condition turns false
+        self.depq.insert('c', 6)
+        self.depq.clear()
+        self.depq.insert('d', 0)
+        self.assertEqual(self.events, [('low_below', 1), ('low_below', 0)])
+
+    def test_callback_can_use_depq(self):
+        def drain(event, value):
+            self.events.append(self.depq.popfirst())
+
+        self.depq.watch(drain, high_above=5)
+        self.depq.insert('a', 8)
+        self.assertEqual(self.events, [('a', 8)])
+        self.assertEqual(len(self.depq), 0)
+
+    def test_sync_callback_error_raised(self):
+        def fail(event, value):
+            raise RuntimeError(event)
+
+        self.depq.watch(fail, size_above=0)
+        with self.assertRaises(RuntimeError):
+            self.depq.insert('a', 1)
+        self.assertEqual(len(self.depq), 1)
+
+    def test_unwatch_restores_lock(self):
+        lock = self.depq.lock
+        watch = self.depq.watch(self.callback, size_above=0)
+        other = self.depq.watch(self.callback, size_above=1)
+        self.assertIsInstance(self.depq.lock, WatchedLock)
+        watch.cancel()
+        self.depq.insert('a', 1)
+        self.assertEqual(self.events, [])
+        self.depq.unwatch(other)
+        self.assertIs(self.depq.lock, lock)
+        self.depq.insert('b', 1)
+        self.assertEqual(self.events, [])
+
+    def test_key_and_backend(self):
+        depq = DEPQ(key=abs)
+        depq.watch(self.callback, high_above=-5)
+        depq.insert('a', -6)
+        bucket = DEPQ(backend='bucket', priority_range=(0, 10))
+        bucket.watch(self.callback, low_below=2)
+        bucket.insert('b', 1)
+        self.assertEqual(self.events, [('high_above', -6),
+                                       ('low_below', 1)])
+
+    def test_pickle_watched(self):
+        self.depq.watch(self.callback, size_above=5)
+        self.depq.insert('a', 1)
+        copy = pickle.loads(pickle.dumps(self.depq))
+        self.assertEqual(list(copy), [('a', 1)])
+        self.assertNotIsInstance(copy.lock, WatchedLock)
+
+    def test_thread_mode(self):
+        delivered = threading.Event()
+        seen = []
+
+        def callback(event, value):
+            seen.append(threading.current_thread())
+            delivered.set()
+
+        watch = self.depq.watch(callback, size_above=0, mode='thread')
+        self.depq.insert('a', 1)
+        self.assertTrue(delivered.wait(5))
+        self.assertIsNot(seen[0], threading.current_thread())
+        watch.cancel()
+
+    def test_invalid_arguments_raise_error(self):
+        with self.assertRaises(ValueError):
+            self.depq.watch(self.callback)
+        with self.assertRaises(ValueError):
+            self.depq.watch(self.callback, size_above=1, mode='process')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from collections import deque
+from random import Random
+from depq.window import SlidingWindowDEPQ
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlidingWindowDEPQTest(unittest.TestCase):
+
+    def setUp(self):
+        self.window = SlidingWindowDEPQ(window=3)
+
+    def test_count_window(self):
+        for i, priority in enumerate((5, 1, 3, 4, 2)):
+            self.window.insert(i, priority)
+        self.assertEqual(list(self.window), [(3, 4), (2, 3), (4, 2)])
+        self.assertEqual(self.window.first(), 3)
+        self.assertEqual(self.window.last(), 4)
+        self.assertEqual(self.window.high(), 4)
+        self.assertEqual(self.window.low(), 2)
+        self.assertEqual(len(self.window), 3)
+
+    def test_matches_brute_force(self):
+        random = Random(5)
+        window = SlidingWindowDEPQ(window=20)
+        # Popped arrivals still count towards the window
+        arrivals = deque(maxlen=20)
+        for i in range(2000):
+            priority = random.randrange(50)
+            window.insert(i, priority)
+            arrivals.append((i, priority))
+            op = random.randrange(10)
+            if op < 2:
+                live = [pair for pair in arrivals if pair[0] is not None]
+                pair = window.popfirst() if op == 0 else window.poplast()
+                best = (max if op == 0 else min)(p for _, p in live)
+                self.assertEqual(pair[1], best)
+                arrivals[arrivals.index(pair)] = (None, None)
+            live = [p for item, p in arrivals if item is not None]
+            self.assertEqual(len(window), len(live))
+            if live:
+                self.assertEqual(window.high(), max(live))
+                self.assertEqual(window.low(), min(live))
+
+    def test_equal_priorities_like_depq(self):
+        for item in 'abc':
+            self.window.insert(item, 1)
+        self.assertEqual(self.window.first(), 'a')
+        self.assertEqual(self.window.last(), 'c')
+
+    def test_duration_window(self):
+        clock = FakeClock()
+        window = SlidingWindowDEPQ(duration=10, clock=clock)
+        window.insert('a', 5)
+        clock.now = 4
+        window.insert('b', 1)
+        clock.now = 10
+        self.assertEqual(window.high(), 1)
+        clock.now = 14
+        self.assertEqual(len(window), 0)
+        with self.assertRaises(IndexError):
+            window.first()
+
+    def test_event_time(self):
+        window = SlidingWindowDEPQ(window=100, duration=10, clock=None)
+        window.insert('a', 5, at=0)
+        window.insert('b', 1, at=4)
+        self.assertEqual(window.high(), 5)
+        self.assertEqual(window.expire(12), 1)
+        self.assertEqual(list(window), [('b', 1)])
+        # Time never runs backwards
+        window.insert('c', 7, at=3)
+        self.assertEqual(window.high(), 7)
+        with self.assertRaises(ValueError):
+            window.insert('d', 1)
+
+    def test_pops_and_clear(self):
+        for i in range(3):
+            self.window.insert(i, i)
+        self.assertEqual(self.window.popfirst(), (2, 2))
+        self.assertEqual(self.window.poplast(), (0, 0))
+        self.window.insert(3, 3)
+        self.window.insert(4, 4)
+        self.assertEqual(list(self.window), [(4, 4), (3, 3)])
+        self.window.clear()
+        self.assertEqual(self.window.is_empty(), True)
+        with self.assertRaises(IndexError):
+            self.window.popfirst()
+
+    def test_snapshot_of_inner_depq(self):
+        for i in range(5):
+            self.window.insert(i, i)
+        with self.window._depq.snapshot() as snapshot:
+            self.window.insert(5, 5)
+            self.assertEqual(len(snapshot), 3)
+        self.assertEqual(self.window.low(), 3)
+
+    def test_invalid_arguments_raise_error(self):
+        with self.assertRaises(ValueError):
+            SlidingWindowDEPQ()
+        with self.assertRaises(ValueError):
+            SlidingWindowDEPQ(window=0)
+        with self.assertRaises(ValueError):
+            SlidingWindowDEPQ(duration=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+"""Cases of test_watch, kept apart as async def is a SyntaxError before
+Python 3.5 and mode='asyncio' needs 3.7"""
+import asyncio
+
+
+class AsyncioModeCases(object):
+    """Mixed into WatchTest, whose setUp and callback they use"""
+
+    def test_asyncio_mode(self):
+        async def main():
+            done = asyncio.Event()
+
+            async def callback(event, value):
+                self.events.append((event, value))
+                done.set()
+
+            self.depq.watch(callback, high_above=1, mode='asyncio')
+            self.depq.watch(self.callback, size_above=0, mode='asyncio')
+            # Events are handed over by the inserting thread
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.depq.insert, 'a', 2
+            )
+            await asyncio.wait_for(done.wait(), 5)
+
+        asyncio.run(main())
+        self.assertEqual(sorted(self.events), [('high_above', 2),
+                                               ('size_above', 1)])
+
+    def test_asyncio_mode_requires_running_loop(self):
+        with self.assertRaises(RuntimeError):
+            self.depq.watch(self.callback, size_above=1, mode='asyncio')
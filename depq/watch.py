@@ -0,0 +1,189 @@
+from threading import Thread
+
+try:
+    from queue import Queue
+except ImportError:  # pragma: no cover
+    from Queue import Queue
+
+MODES = ('sync', 'thread', 'asyncio')
+
+
+class Watch(object):
+    """Subscription returned by DEPQ.watch. Each given threshold is an
+    edge triggered condition: callback(event, value) is delivered when
+    high() goes above high_above, low() goes below low_below or len()
+    goes above size_above, with event being that argument's name and
+    value the new priority or length. It fires again only after its
+    condition was false in between. A condition that already holds
+    when watching starts fires at once."""
+
+    def __init__(self, depq, callback, high_above=None, low_below=None,
+                 size_above=None, mode='sync', loop=None):
+
+        if high_above is None and low_below is None and size_above is None:
+            raise ValueError('No threshold given')
+        if mode not in MODES:
+            raise ValueError('mode must be one of {}'.format(
+                ', '.join(MODES)
+            ))
+
+        key = depq._key
+        self.depq = depq
+        self.callback = callback
+        self.high_above = high_above
+        self.low_below = low_below
+        self.size_above = size_above
+        self.mode = mode
+        self.active = True
+
+        # Thresholds are compared with sort keys like priorities are
+        self._high_key = high_above
+        self._low_key = low_below
+        if key is not None:
+            if high_above is not None:
+                self._high_key = key(high_above)
+            if low_below is not None:
+                self._low_key = key(low_below)
+
+        self._high = self._low = self._size = False
+        self._loop = None
+        self._queue = None
+
+        if mode == 'asyncio':
+            import asyncio
+            if loop is None:
+                loop = asyncio.get_running_loop()
+            self._loop = loop
+            self._coroutine = asyncio.iscoroutinefunction(callback)
+        elif mode == 'thread':
+            self._queue = Queue()
+            thread = Thread(target=self._deliver_loop)
+            thread.daemon = True
+            thread.start()
+
+    def check(self, depq, fired):
+        """Appends tuple(watch, event, value) to fired for every
+        condition that just became true. Lock of DEPQ must be held.
+        Performance: O(1)"""
+
+        length = len(depq)
+
+        if self.size_above is not None:
+            state = length > self.size_above
+            if state and not self._size:
+                fired.append((self, 'size_above', length))
+            self._size = state
+
+        if self._high_key is not None:
+            state = False
+            if length:
+                entry = depq._end(True)
+                state = entry[-1] > self._high_key
+            if state and not self._high:
+                fired.append((self, 'high_above', entry[1]))
+            self._high = state
+
+        if self._low_key is not None:
+            state = False
+            if length:
+                entry = depq._end(False)
+                state = entry[-1] < self._low_key
+            if state and not self._low:
+                fired.append((self, 'low_below', entry[1]))
+            self._low = state
+
+    def deliver(self, event, value):
+        """Hands event to callback according to mode"""
+
+        if not self.active:
+            return
+
+        mode = self.mode
+        if mode == 'sync':
+            self.callback(event, value)
+        elif mode == 'thread':
+            self._queue.put((event, value))
+        elif self._coroutine:
+            import asyncio
+            asyncio.run_coroutine_threadsafe(self.callback(event, value),
+                                             self._loop)
+        else:
+            self._loop.call_soon_threadsafe(self.callback, event, value)
+
+    def cancel(self):
+        """Stops delivering events. Same as DEPQ.unwatch(watch)"""
+        self.depq.unwatch(self)
+
+    def _close(self):
+        self.active = False
+        if self._queue is not None:
+            self._queue.put(None)
+
+    def _deliver_loop(self):
+        queue = self._queue
+        callback = self.callback
+        while True:
+            event = queue.get()
+            if event is None:
+                return
+            callback(*event)
+
+    def __repr__(self):
+        thresholds = ', '.join(
+            '{}={!r}'.format(name, getattr(self, name))
+            for name in ('high_above', 'low_below', 'size_above')
+            if getattr(self, name) is not None
+        )
+        return 'Watch({}, mode={!r})'.format(thresholds, self.mode)
+
+
+def deliver(fired):
+    """Delivers every tuple(watch, event, value) of fired, raising the
+    first exception of a sync callback once all were delivered"""
+
+    error = None
+    for watch, event, value in fired:
+        try:
+            watch.deliver(event, value)
+        except Exception as ex:
+            if error is None:
+                error = ex
+    if error is not None:
+        raise error
+
+
+class WatchedLock(object):
+    """Stands in for the lock of a DEPQ with watches. It wraps the very
+    same Lock, so threads that fetched the plain lock before watching
+    started still exclude each other. Releasing it checks every watch
+    while still holding the lock and delivers events after the lock is
+    released, so callbacks may use the DEPQ themselves."""
+
+    def __init__(self, depq, lock):
+        self.depq = depq
+        self.lock = lock
+        self.watches = []
+
+    def acquire(self, blocking=True, timeout=-1):
+        return self.lock.acquire(blocking, timeout)
+
+    def release(self):
+        fired = []
+        try:
+            depq = self.depq
+            for watch in self.watches:
+                watch.check(depq, fired)
+        finally:
+            self.lock.release()
+        if fired:
+            deliver(fired)
+
+    def locked(self):
+        return self.lock.locked()
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
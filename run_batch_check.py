@@ -0,0 +1,82 @@
+__doc__ = """A request handler makes a few dozen mixed operations on a DEPQ per
+request. This check runs one such request, 30 inserts with random
+priorities, 5 count() checks, 1 remove() of an item inserted in the
+same request and 5 popfirst(), once as separate calls each taking the
+lock and once inside 'with depq.batch() as tx:', which takes it once,
+resolves the remove against the held back inserts and merges the rest
+in one pass. Each is repeated 300 times on a freshly built DEPQ and,
+like the main performance check, only the lowest 100 times are used in
+calculations.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+SETUP = '''
+from random import Random
+from depq.depq import DEPQ
+
+random = Random(3)
+d = DEPQ.from_arrays(range({0}), sorted((random.random()
+                                         for _ in range({0})),
+                                        reverse=True))
+pairs = [('new{{}}'.format(i), random.random()) for i in range(30)]
+
+def single():
+    for item, priority in pairs:
+        d.insert(item, priority)
+    for item, _ in pairs[:5]:
+        d.count(item)
+    d.remove('new7')
+    for _ in range(5):
+        d.popfirst()
+
+def batch():
+    with d.batch() as tx:
+        for item, priority in pairs:
+            tx.insert(item, priority)
+        for item, _ in pairs[:5]:
+            tx.count(item)
+        tx.remove('new7')
+        for _ in range(5):
+            tx.popfirst()
+'''
+
+
+def get_times(size):
+    size_text = 'Size of DEPQ: {}\n{}\n'.format(size, '=' * 40)
+    print(size_text)
+    setup = SETUP.format(size)
+
+    results = [size_text]
+
+    for name, statement in (
+            ('Separate calls result', 'single()'),
+            ('batch() result', 'batch()')):
+        stats = get_stats(timeit.Timer(
+            statement, setup=setup
+        ).repeat(300, 1))
+        result = ('{}:\n==> Minimum: {}\n==> Maximum: {}\n'
+                  '==> Trimean: {}\n\n'.format(name, *stats))
+        print(result)
+        results.append(result)
+
+    return results
+
+
+def main():
+    print(__doc__)
+    a = get_times(1000)
+    b = get_times(100000)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'batch_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(a))
+        f.write(''.join(b))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+__doc__ = """Integer priorities in a small range, or monotonically increasing
+integer timestamps, don't need the O(n) search of the default deque
+backend. This check times 1000 inserts followed by 500 popfirst() and
+500 poplast() calls on DEPQ instances already holding size items, for
+the deque backend and backend="bucket" with priorities in 0-1000, and
+for monotone timestamps with the deque backend and backend="radix"
+(popping the low end). Each is repeated 20 times and, like the main
+performance check, only the lowest times are used in calculations.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+RANGE_SETUP = (
+    'from depq.depq import DEPQ\n'
+    'from random import Random\n'
+    'r = Random(0)\n'
+    'randoms = [r.randrange(0, 1001) for i in range(1000)]\n'
+    'd = DEPQ({backend})\n'
+    'initial = [r.randrange(0, 1001) for i in range({size})]\n'
+    'for p in sorted(initial): d.insert(None, p)\n'
+)
+
+RANGE_STMT = (
+    'for p in randoms: d.insert(None, p)\n'
+    'for i in range(500): d.popfirst()\n'
+    'for i in range(500): d.poplast()\n'
+)
+
+MONOTONE_SETUP = (
+    'from depq.depq import DEPQ\n'
+    'from itertools import count\n'
+    'from random import Random\n'
+    'r = Random(0)\n'
+    'clock = count()\n'
+    'd = DEPQ({backend})\n'
+    'initial = [next(clock) + r.randrange(1000) for i in range({size})]\n'
+    'for p in sorted(initial): d.insert(None, p)\n'
+)
+
+MONOTONE_STMT = (
+    'for i in range(1000): d.insert(None, next(clock) + r.randrange(1000))\n'
+    'for i in range(1000): d.poplast()\n'
+)
+
+
+def time_backend(name, setup, stmt, size, backend):
+    stats = get_stats(timeit.Timer(
+        stmt, setup=setup.format(backend=backend, size=size)
+    ).repeat(20, 1))
+    result = ('{} result:\n==> Minimum: {}\n==> Maximum: {}\n'
+              '==> Trimean: {}\n\n'.format(name, *stats))
+    print(result)
+    return result
+
+
+def get_times(size):
+    size_text = 'Size of DEPQ: {}\n{}\n'.format(size, '=' * 40)
+    print(size_text)
+
+    bucket = "backend='bucket', priority_range=(0, 1000)"
+    return (
+        size_text,
+        time_backend('Priorities 0-1000, deque backend', RANGE_SETUP,
+                     RANGE_STMT, size, ''),
+        time_backend('Priorities 0-1000, bucket backend', RANGE_SETUP,
+                     RANGE_STMT, size, bucket),
+        time_backend('Monotone timestamps, deque backend', MONOTONE_SETUP,
+                     MONOTONE_STMT, size, ''),
+        time_backend('Monotone timestamps, radix backend', MONOTONE_SETUP,
+                     MONOTONE_STMT, size, "backend='radix'"),
+    )
+
+
+def main():
+    print(__doc__)
+    results = [get_times(size) for size in (10000, 100000)]
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'bucket_results.txt'), 'w') as f:
+        f.write(__doc__)
+        for result in results:
+            f.write(''.join(result))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+__doc__ = """Caches that evict by a score instead of recency keep hot keys of
+skewed workloads that a burst of one-off keys would flush out of an LRU
+cache. This check replays 100000 lookups drawn from a Zipf-like
+distribution over 10000 keys, mixed with scans of keys seen only once,
+through functools.lru_cache and depq.cache.priority_cache with the
+'lru' and 'lfu' policies, each holding 500 entries. Hit rates are
+printed and each run is timed 7 times; like the main performance check
+only the lowest 5 times are used in calculations.
+
+Every read of a cached key touches it, i.e. rescores it in the DEPQ
+of scores, so the second part shows how that scales: a PriorityCache
+of 10000, 100000 and 500000 keys is filled and 100000 reads of random
+cached keys are timed 3 times per policy, reporting the time per read
+of the fastest run.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+setup = '''
+from functools import lru_cache
+from random import Random
+from depq.cache import priority_cache
+
+random = Random(7)
+weights = [1.0 / rank for rank in range(1, 10001)]
+keys = random.choices(range(10000), weights, k=100000)
+# Every 1000 lookups a scan touches 300 keys never seen again
+scans = iter(range(10000, 10 ** 9))
+trace = []
+for i, key in enumerate(keys):
+    trace.append(key)
+    if i % 1000 == 999:
+        trace.extend(next(scans) for _ in range(300))
+
+def replay(decorator):
+    f = decorator(lambda key: key)
+    for key in trace:
+        f(key)
+    return f.cache_info()
+
+functions = {
+    'lru_cache': lru_cache(500),
+    "priority_cache(policy='lru')": priority_cache(500, 'lru'),
+    "priority_cache(policy='lfu')": priority_cache(500, 'lfu'),
+}
+'''
+
+NAMES = ('lru_cache', "priority_cache(policy='lru')",
+         "priority_cache(policy='lfu')")
+
+TOUCH_SETUP = '''
+from random import Random
+from depq.cache import PriorityCache
+
+random = Random(7)
+cache = PriorityCache({0}, {1!r})
+for key in range({0}):
+    cache[key] = key
+touched = [random.randrange({0}) for _ in range(100000)]
+
+def touch():
+    for key in touched:
+        cache[key]
+'''
+
+
+def main():
+    print(__doc__)
+    results = []
+
+    namespace = {}
+    exec(setup, namespace)
+
+    for name in NAMES:
+        info = namespace['replay'](namespace['functions'][name])
+        stats = get_stats(sorted(timeit.Timer(
+            'replay(functions[{!r}])'.format(name), setup=setup
+        ).repeat(7, 1))[:5])
+        result = ('{} result:\n==> Hit rate: {:.1%}\n==> Minimum: {}\n'
+                  '==> Maximum: {}\n==> Trimean: {}\n\n'.format(
+                      name, info.hits / (info.hits + info.misses),
+                      *stats))
+        print(result)
+        results.append(result)
+
+    for size in (10000, 100000, 500000):
+        for policy in ('lru', 'lfu'):
+            fastest = min(timeit.Timer(
+                'touch()', setup=TOUCH_SETUP.format(size, policy)
+            ).repeat(3, 1))
+            result = ('PriorityCache({}, {!r}) touch result:\n'
+                      '==> Per read: {:.2f} us\n\n'.format(
+                          size, policy, fastest / 100000 * 1e6))
+            print(result)
+            results.append(result)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'cache_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+__doc__ = """Short-lived worker processes pay for "import depq" every time they
+start. This check runs a fresh interpreter with -X importtime for each
+statement below and sums the time spent importing every module that a
+bare interpreter doesn't already import. The best of 20 runs is compared
+against a budget in microseconds and the exit status is 1 if any
+statement exceeds it.\n\n
+"""
+
+import compileall
+import os
+import subprocess
+import sys
+
+# DEPQ itself needs collections and threading, which are most of its
+# budget; anything optional showing up here is a regression
+STATEMENTS = (
+    ('import depq', 1000),
+    ('from depq import DEPQ', 6000),
+    ('from depq import DEPQ; DEPQ().insert(None, 1)', 6000),
+)
+
+
+def get_import_times(statement):
+    """Returns dict of module name to self import time in microseconds"""
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.STDOUT, universal_newlines=True
+    )
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_time)
+    return times
+
+
+def get_cost(statement, baseline):
+    costs = []
+    for _ in range(20):
+        times = get_import_times(statement)
+        costs.append(sum(t for name, t in times.items()
+                         if name not in baseline))
+    return min(costs)
+
+
+def main():
+    print(__doc__)
+
+    # Timing source compilation would only measure disk and compiler
+    here = os.path.dirname(os.path.abspath(__file__))
+    compileall.compile_dir(os.path.join(here, 'depq'), quiet=1)
+
+    baseline = get_import_times('pass')
+    over_budget = False
+
+    for statement, budget in STATEMENTS:
+        cost = get_cost(statement, baseline)
+        status = 'OK' if cost <= budget else 'OVER BUDGET'
+        over_budget = over_budget or cost > budget
+        print('{}\n==> Import cost: {} us (budget {} us) {}\n'.format(
+            statement, cost, budget, status
+        ))
+
+    return 1 if over_budget else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
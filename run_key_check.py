@@ -0,0 +1,89 @@
+__doc__ = """Priorities made of several fields with rich comparison methods are
+compared many times by every insert. This check inserts 100 items with
+random priorities into a DEPQ of objects whose __lt__, __gt__ etc. build
+and compare a tuple of fields, once using those objects directly and
+once with DEPQ(key=...) precomputing that tuple a single time per item.
+Each is repeated 150 times and, like the main performance check, only
+the lowest 100 times are used in calculations.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+
+class FieldPriority:
+
+    def __init__(self, severity, deadline, name):
+        self.severity = severity
+        self.deadline = deadline
+        self.name = name
+
+    def fields(self):
+        return self.severity, -self.deadline, self.name
+
+    def __lt__(self, other):
+        return self.fields() < other.fields()
+
+    def __le__(self, other):
+        return self.fields() <= other.fields()
+
+    def __gt__(self, other):
+        return self.fields() > other.fields()
+
+    def __ge__(self, other):
+        return self.fields() >= other.fields()
+
+
+def field_key(priority):
+    return priority.severity, -priority.deadline, priority.name
+
+
+def get_times(size):
+    size_text = 'Size of DEPQ: {}\n{}\n'.format(size, '=' * 40)
+    print(size_text)
+    setup = ('from depq.depq import DEPQ\n'
+             'from run_key_check import FieldPriority, field_key\n'
+             'from random import SystemRandom\n'
+             'r = SystemRandom()\n'
+             'def make():\n'
+             '    return FieldPriority(r.randrange(10), r.randrange({0}),\n'
+             '                         str(r.randrange(100)))\n'
+             'randoms = [make() for i in range(100)]\n'
+             'd = DEPQ(key={1})\n'
+             'for i in range({0}): d.insert(None, make())\n')
+
+    objects = get_stats(timeit.Timer(
+        'for r in randoms:d.insert(None, r)',
+        setup=setup.format(size, None)
+    ).repeat(150, 1))
+    objects_result = ('Object comparison result:\n==> Minimum: {}\n'
+                      '==> Maximum: {}\n==> Trimean: {}\n\n'.format(*objects))
+    print(objects_result)
+
+    keyed = get_stats(timeit.Timer(
+        'for r in randoms:d.insert(None, r)',
+        setup=setup.format(size, 'field_key')
+    ).repeat(150, 1))
+    keyed_result = ('Precomputed key result:\n==> Minimum: {}\n'
+                    '==> Maximum: {}\n==> Trimean: {}\n\n'.format(*keyed))
+    print(keyed_result)
+
+    return size_text, objects_result, keyed_result
+
+
+def main():
+    print(__doc__)
+    a = get_times(10000)
+    b = get_times(100000)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'key_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write('{}{}{}'.format(*a))
+        f.write('{}{}{}'.format(*b))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+__doc__ = """An admission filter checks a batch of candidate items against a DEPQ
+per request. This check looks up 1000 items, half of them present, in
+a DEPQ once with a loop calling 'in' and count() for each item and once
+with contains_many() and count_many() resolving the whole batch under a
+single lock acquisition. Each is repeated 150 times and, like the main
+performance check, only the lowest 100 times are used in calculations.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+
+def get_times(size):
+    size_text = 'Size of DEPQ: {}\n{}\n'.format(size, '=' * 40)
+    print(size_text)
+    setup = ('from depq.depq import DEPQ\n'
+             'd = DEPQ()\n'
+             'for i in range({0}): d.addlast(i, 0)\n'
+             'candidates = list(range({0} - 500, {0} + 500))\n'.format(size))
+
+    results = [size_text]
+
+    for name, statement in (
+            ('Loop of in result', '[c in d for c in candidates]'),
+            ('contains_many result', 'd.contains_many(candidates)'),
+            ('Loop of count result', '[d.count(c) for c in candidates]'),
+            ('count_many result', 'd.count_many(candidates)')):
+        stats = get_stats(timeit.Timer(
+            statement, setup=setup
+        ).repeat(150, 1))
+        result = ('{}:\n==> Minimum: {}\n==> Maximum: {}\n'
+                  '==> Trimean: {}\n\n'.format(name, *stats))
+        print(result)
+        results.append(result)
+
+    return results
+
+
+def main():
+    print(__doc__)
+    a = get_times(10000)
+    b = get_times(100000)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'many_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(a))
+        f.write(''.join(b))
+
+if __name__ == '__main__':
+    main()
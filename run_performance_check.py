@@ -10,6 +10,8 @@ sized DEPQ instances to show how the algorithms scale.\n\n
 
 import os
 import timeit
+from collections import defaultdict, deque
+from threading import Lock
 
 
 def get_stats(data):
@@ -30,6 +32,20 @@ def get_stats(data):
     return data[0], data[-1], (q1 + 2*q2 + q3) / 4.0
 
 
+class ReferenceDEPQ(object):
+    """The single deque DEPQ used to store its entries in. DEPQ keeps
+    blocks of them now, so the 2 other searches run on this instead"""
+
+    def __init__(self, size):
+        self.data = deque((None, i) for i in range(size - 1, -1, -1))
+        self.items = defaultdict(int, {None: size})
+        self.lock = Lock()
+        self._maxlen = None
+
+    def _poplast(self):
+        return self.data.pop()
+
+
 def linear_insert(self, item, priority):
     """Linear search. Performance is O(n^2)."""
 
@@ -117,19 +133,20 @@ def get_times(size):
     size_text = 'Size of DEPQ: {}\n{}\n'.format(size, ''.join(('=' for _ in range(40))))
     print(size_text)
     setup = ('from depq.depq import DEPQ\n'
-             'from run_performance_check import binary_insert, linear_insert\n'
-             'DEPQ.binary_insert, DEPQ.linear_insert = binary_insert, linear_insert\n'
+             'from run_performance_check import ReferenceDEPQ, binary_insert, linear_insert\n'
+             'ReferenceDEPQ.binary_insert, ReferenceDEPQ.linear_insert = binary_insert, linear_insert\n'
              'from random import SystemRandom\n'
              'r = SystemRandom()\n'
              'randoms = [r.randrange(0, {}) for i in range(100)]\n'
              'd = DEPQ()\n'
-             'for i in range({}): d.addfirst(None, i)\n'.format(size, size))
+             'for i in range({}): d.addfirst(None, i)\n'
+             'ref = ReferenceDEPQ({})\n'.format(size, size, size))
 
-    linear = get_stats(timeit.Timer('for r in randoms:d.linear_insert(None, r)', setup=setup).repeat(150, 1))
+    linear = get_stats(timeit.Timer('for r in randoms:ref.linear_insert(None, r)', setup=setup).repeat(150, 1))
     linear_result = 'Linear search result:\n==> Minimum: {}\n==> Maximum: {}\n==> Trimean: {}\n\n'.format(*linear)
     print(linear_result)
 
-    binary = get_stats(timeit.Timer('for r in randoms:d.binary_insert(None, r)', setup=setup).repeat(150, 1))
+    binary = get_stats(timeit.Timer('for r in randoms:ref.binary_insert(None, r)', setup=setup).repeat(150, 1))
     binary_result = 'Binary search result:\n==> Minimum: {}\n==> Maximum: {}\n==> Trimean: {}\n\n'.format(*binary)
     print(binary_result)
 
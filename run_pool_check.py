@@ -0,0 +1,73 @@
+__doc__ = """Throughput of depq.pool executors as workers are added. Each run
+submits 2000 tasks at random priorities and waits for all of them:
+tasks that sleep for 1 ms on WorkStealingExecutor, which scale with
+workers while waiting on I/O, and CPU bound tasks on
+ProcessWorkStealingExecutor, which scale up to the number of cores
+(os.cpu_count() is given below). Each is repeated 5 times and, like
+the main performance check, the minimum, maximum and trimean are
+given along with tasks per second for the minimum.\n\n
+"""
+
+import os
+import time
+import timeit
+from random import random
+
+from depq.pool import ProcessWorkStealingExecutor, WorkStealingExecutor
+from run_performance_check import get_stats
+
+TASKS = 2000
+
+
+def spin(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+def run(executor, fn, arg):
+    futures = [executor.submit(fn, random(), arg) for _ in range(TASKS)]
+    for future in futures:
+        future.result()
+
+
+def get_times(cls, fn, arg, workers):
+    executor = cls(workers)
+    try:
+        run(executor, fn, arg)  # Warm up workers
+        stats = get_stats(timeit.Timer(
+            lambda: run(executor, fn, arg)
+        ).repeat(5, 1))
+    finally:
+        executor.shutdown()
+
+    result = ('{} with {} workers:\n==> Minimum: {}\n==> Maximum: {}\n'
+              '==> Trimean: {}\n==> Tasks per second: {:.0f}\n\n'
+              .format(cls.__name__, workers,
+                      *(stats + (TASKS / stats[0],))))
+    print(result)
+    return result
+
+
+def main():
+    cores = os.cpu_count() or 1
+    header = '{}os.cpu_count(): {}\n\n'.format(__doc__, cores)
+    print(header)
+
+    counts = sorted(set([1, 2, 4, cores]))
+    results = [header]
+    for workers in counts:
+        results.append(get_times(WorkStealingExecutor, time.sleep, 0.001,
+                                 workers))
+    for workers in counts:
+        results.append(get_times(ProcessWorkStealingExecutor, spin, 20000,
+                                 workers))
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'pool_results.txt'), 'w') as f:
+        f.write(''.join(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+__doc__ = """Beam search pushes every child of a beam into a DEPQ(maxlen=width)
+and most of them are immediately evicted again. This check runs a beam
+of width 100 for 20 levels over a synthetic graph in which every state
+has 50 children with random scores, once with a hand written loop
+calling insert for each child and once with depq.search.beam_search,
+which adds the children of each state with insert_many. A* on a
+synthetic 200 x 200 grid with random walls is timed as well. Each is
+repeated 15 times and, like the main performance check, only the
+lowest 10 times are used in calculations.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+setup = '''
+from random import Random
+from depq.depq import DEPQ
+from depq.search import astar, beam_search
+
+random = Random(5)
+scores = {}
+
+def expand(state):
+    return [state * 50 + i for i in range(1, 51)]
+
+def score(state):
+    try:
+        return scores[state]
+    except KeyError:
+        value = scores[state] = random.random()
+        return value
+
+def naive():
+    beam = [(0, score(0))]
+    for step in range(20):
+        candidates = DEPQ(maxlen=100)
+        for state, _ in beam:
+            for child in expand(state):
+                candidates.insert(child, score(child))
+        beam = list(candidates)
+    return beam
+
+size = 200
+walls = set((random.randrange(size), random.randrange(size))
+            for _ in range(size * size // 4))
+walls.discard((0, 0))
+walls.discard((size - 1, size - 1))
+
+def neighbors(state):
+    x, y = state
+    for child in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+        if (0 <= child[0] < size and 0 <= child[1] < size and
+                child not in walls):
+            yield child, 1
+
+def heuristic(state):
+    return 2 * size - 2 - state[0] - state[1]
+
+def goal(state):
+    return state == (size - 1, size - 1)
+
+naive()
+'''
+
+
+def main():
+    print(__doc__)
+    results = []
+
+    for name, statement in (
+            ('Beam search with insert loop result', 'naive()'),
+            ('beam_search result',
+             'beam_search(0, expand, score, 100, steps=20)'),
+            ('A* on grid result',
+             'astar((0, 0), neighbors, heuristic, goal)')):
+        stats = get_stats(sorted(timeit.Timer(
+            statement, setup=setup
+        ).repeat(15, 1))[:10])
+        result = ('{}:\n==> Minimum: {}\n==> Maximum: {}\n'
+                  '==> Trimean: {}\n\n'.format(name, *stats))
+        print(result)
+        results.append(result)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'search_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+__doc__ = """Loopback throughput and latency of depq.server and depq.client. A
+server is started with python -m depq.server on a Unix socket and a
+single client thread then runs 20000 insert calls followed by 20000
+popfirst calls one request at a time, which gives per call round trip
+latencies, the same calls pipelined 1000 at a time, and insert_many /
+popfirst_n batches of 1000 items. Ops per second count items, so a
+batch of 1000 is 1000 ops. Each throughput run is repeated 5 times and
+the fastest is reported.\n\n
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+OPS = 20000
+BATCH = 1000
+
+
+def percentile(latencies, q):
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+def sequential(queue):
+    latencies = []
+    clock = time.perf_counter
+    for i in range(OPS):
+        start = clock()
+        queue.insert(i, i)
+        latencies.append(clock() - start)
+    for i in range(OPS):
+        start = clock()
+        queue.popfirst()
+        latencies.append(clock() - start)
+    return latencies
+
+
+def pipelined(client):
+    for method in ('insert', 'popfirst'):
+        for start in range(0, OPS, BATCH):
+            pipeline = client.pipeline()
+            call = getattr(pipeline.queue('bench'), method)
+            for i in range(start, start + BATCH):
+                if method == 'insert':
+                    call(i, i)
+                else:
+                    call()
+            pipeline.execute()
+
+
+def batched(queue):
+    for start in range(0, OPS, BATCH):
+        queue.insert_many((i, i) for i in range(start, start + BATCH))
+    for start in range(0, OPS, BATCH):
+        queue.popfirst_n(BATCH)
+
+
+def best_of(function, argument, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(__doc__)
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    from depq.client import Client
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'depq.sock')
+    server = subprocess.Popen([sys.executable, '-m', 'depq.server',
+                               '--unix', path], cwd=here)
+    results = []
+
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.01)
+
+        with Client(path, pool_size=1) as client:
+            queue = client.queue('bench')
+
+            latencies = sorted(sequential(queue))
+            seconds = sum(latencies)
+            results.append(
+                'One request per call result:\n==> Ops per second: {:.0f}'
+                '\n==> p50 latency: {:.1f} us\n==> p99 latency: {:.1f} us'
+                '\n==> p99.9 latency: {:.1f} us\n\n'.format(
+                    2 * OPS / seconds,
+                    *(percentile(latencies, q) * 1e6
+                      for q in (0.5, 0.99, 0.999))
+                )
+            )
+
+            for name, function, argument in (
+                    ('Pipelined 1000 calls per write', pipelined, client),
+                    ('insert_many and popfirst_n of 1000 items', batched,
+                     queue)):
+                seconds = best_of(function, argument)
+                results.append(
+                    '{} result:\n==> Ops per second: {:.0f}\n'
+                    '==> Per batch of 1000: {:.2f} ms\n\n'.format(
+                        name, 2 * OPS / seconds,
+                        seconds / (2 * OPS / BATCH) * 1e3
+                    )
+                )
+
+    finally:
+        server.terminate()
+        server.wait()
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+
+    for result in results:
+        print(result)
+
+    with open(os.path.join(here, 'server_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(results))
+
+if __name__ == '__main__':
+    main()
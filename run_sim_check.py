@@ -0,0 +1,91 @@
+__doc__ = """Event driven simulations pop the earliest event and schedule new ones
+shortly after it. In this check 1000 processes each reschedule
+themselves at now + an exponentially distributed delay until 100000
+events have run, once with a hand written loop around DEPQ.insert and
+DEPQ.poplast and once with depq.sim.Simulator. Each is repeated 15
+times and, like the main performance check, only the lowest 10 times
+are used in calculations. Events per second are given for the
+minimum.\n\n
+"""
+
+import os
+import timeit
+
+from run_performance_check import get_stats
+
+setup = '''
+from random import Random
+from depq.depq import DEPQ
+from depq.sim import Simulator
+random = Random(1)
+delays = [random.expovariate(1.0) for _ in range({events} + {processes})]
+
+def naive():
+    d = DEPQ()
+    remaining = [{events}]
+    it = iter(delays)
+
+    def process():
+        remaining[0] -= 1
+        if remaining[0] > 0:
+            d.insert(process, now[0] + next(it))
+
+    now = [0]
+    for i in range({processes}):
+        d.insert(process, next(it))
+    while d and remaining[0] > 0:
+        callback, now[0] = d.poplast()
+        callback()
+
+def simulator():
+    sim = Simulator(width={width})
+    remaining = [{events}]
+    it = iter(delays)
+
+    def process():
+        remaining[0] -= 1
+        if remaining[0] > 0:
+            sim.schedule(sim.now + next(it), process)
+
+    for i in range({processes}):
+        sim.schedule(next(it), process)
+    sim.run()
+'''
+
+
+def get_times(processes, events=100000):
+    size_text = 'Processes: {}\n{}\n'.format(processes, '=' * 40)
+    print(size_text)
+    code = setup.format(events=events, processes=processes,
+                        width=1.0 / processes * 8)
+
+    results = [size_text]
+
+    for name, statement in (('Naive DEPQ loop result', 'naive()'),
+                            ('Simulator result', 'simulator()')):
+        stats = get_stats(sorted(timeit.Timer(
+            statement, setup=code
+        ).repeat(15, 1))[:10])
+        result = ('{}:\n==> Minimum: {}\n==> Maximum: {}\n'
+                  '==> Trimean: {}\n==> Events per second: {:.0f}\n\n'
+                  .format(name, *(stats + (events / stats[0],))))
+        print(result)
+        results.append(result)
+
+    return results
+
+
+def main():
+    print(__doc__)
+    a = get_times(1000)
+    b = get_times(10000)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'sim_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(a))
+        f.write(''.join(b))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+__doc__ = """Checkpoints pickle a DEPQ from snapshot() outside of its lock, while
+writers go on. Whatever a writer changes during that time is copied
+first, and this check shows what that costs the writers: a DEPQ of
+2000000 items is frozen and 1000 inserts with random priorities are
+each timed alone, then the same number without a snapshot, and last
+the pickling of the snapshot itself. Each is repeated 5 times. Like the
+main performance check, the stats only use the lowest 100 times, so
+the slowest insert of all, the longest pause any writer saw, is given
+as well. As in timeit, the garbage collector is disabled while timing,
+since a full collection of millions of entries pauses any code that
+happens to trigger it.\n\n
+"""
+
+import gc
+import os
+import pickle
+from random import Random
+from timeit import default_timer
+
+from depq.depq import DEPQ
+from run_performance_check import get_stats
+
+SIZE = 2000000
+
+
+def time_inserts(depq, priorities, frozen):
+    times = []
+    gc.disable()
+    try:
+        for _ in range(5):
+            snapshot = depq.snapshot() if frozen else None
+            for i, priority in enumerate(priorities):
+                start = default_timer()
+                depq.insert(i, priority)
+                times.append(default_timer() - start)
+            if snapshot is not None:
+                snapshot.release()
+    finally:
+        gc.enable()
+    return times
+
+
+def main():
+    print(__doc__)
+    random = Random(5)
+    depq = DEPQ.from_arrays(range(SIZE), sorted(
+        (random.random() for _ in range(SIZE)), reverse=True
+    ))
+    priorities = [random.random() for _ in range(1000)]
+    results = []
+
+    for name, frozen in (('Inserts while a snapshot is alive', True),
+                         ('Inserts without a snapshot', False)):
+        times = time_inserts(depq, priorities, frozen)
+        stats = get_stats(times)
+        result = ('{} result:\n==> Minimum: {}\n==> Maximum: {}\n'
+                  '==> Trimean: {}\n==> Slowest of all: {}\n\n'.format(
+                      name, stats[0], stats[1], stats[2], max(times)))
+        print(result)
+        results.append(result)
+
+    times = []
+    for _ in range(5):
+        with depq.snapshot() as snapshot:
+            start = default_timer()
+            pickle.dumps(snapshot.state, pickle.HIGHEST_PROTOCOL)
+            times.append(default_timer() - start)
+    result = ('Pickling the snapshot result:\n==> Minimum: {}\n'
+              '==> Maximum: {}\n==> Trimean: {}\n\n'.format(
+                  *get_stats(times)))
+    print(result)
+    results.append(result)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'snapshot_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+__doc__ = """Sliding window maximum and minimum over a stream. A plain DEPQ has to
+remove(item) the oldest arrival once the window is full, an O(n) scan
+comparing items, while depq.window.SlidingWindowDEPQ expires it by
+bisecting on its priority. This check streams 1000000 events with
+random priorities through SlidingWindowDEPQ(window=W) for W of 100,
+1000, 10000 and 100000, reading high() and low() after every event,
+and 2000000 events for W of 1000000 so that the window fills up and
+half of them expire. It also streams through
+SlidingWindowDEPQ(duration=...) in event time at 10000 events per
+second. The plain DEPQ loop only gets 20000 events as it is far slower.
+Each is repeated 3 times and events per second are computed from the
+fastest run.\n\n
+"""
+
+import os
+import timeit
+
+setup = '''
+from collections import deque
+from itertools import islice
+from random import Random
+from depq.depq import DEPQ
+from depq.window import SlidingWindowDEPQ
+
+random = Random(9)
+priorities = [random.random() for _ in range(2000000)]
+
+def stream(window, events=1000000):
+    insert = window.insert
+    high = window.high
+    low = window.low
+    for i, priority in enumerate(islice(priorities, events)):
+        insert(i, priority, i * 0.0001)
+        high()
+        low()
+
+def naive(size, events=20000):
+    depq = DEPQ()
+    arrivals = deque()
+    for i, priority in enumerate(priorities[:events]):
+        depq.insert(i, priority)
+        arrivals.append(i)
+        if len(arrivals) > size:
+            depq.remove(arrivals.popleft())
+        depq.high()
+        depq.low()
+'''
+
+RUNS = (
+    ('DEPQ with remove(), W=1000', 'naive(1000)', 20000),
+    ('SlidingWindowDEPQ(window=100)',
+     'stream(SlidingWindowDEPQ(window=100))', 1000000),
+    ('SlidingWindowDEPQ(window=1000)',
+     'stream(SlidingWindowDEPQ(window=1000))', 1000000),
+    ('SlidingWindowDEPQ(window=10000)',
+     'stream(SlidingWindowDEPQ(window=10000))', 1000000),
+    ('SlidingWindowDEPQ(window=100000)',
+     'stream(SlidingWindowDEPQ(window=100000))', 1000000),
+    ('SlidingWindowDEPQ(window=1000000)',
+     'stream(SlidingWindowDEPQ(window=1000000), 2000000)', 2000000),
+    ('SlidingWindowDEPQ(duration=0.1, clock=None), about 1000 events',
+     'stream(SlidingWindowDEPQ(duration=0.1, clock=None))', 1000000),
+)
+
+
+def main():
+    print(__doc__)
+    results = []
+
+    for name, statement, events in RUNS:
+        best = min(timeit.Timer(statement, setup=setup).repeat(3, 1))
+        result = ('{} result:\n==> Seconds: {}\n==> Events per second: '
+                  '{:.0f}\n\n'.format(name, best, events / best))
+        print(result)
+        results.append(result)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(here, 'window_results.txt'), 'w') as f:
+        f.write(__doc__)
+        f.write(''.join(results))
+
+if __name__ == '__main__':
+    main()